@@ -0,0 +1,81 @@
+"""Backup-then-delete: copy + rmtree vs. rename vs. hardlinks vs. cross-volume fallback.
+
+Runs AppUninstaller.remove_directories on a synthetic application folder with
+each backup mode. "link" makes the rename fail, as files in use do on
+Windows; "fallback" pretends the backup folder is on another volume. After
+each run the folder must be gone and the backup must hold the same bytes.
+
+Usage: python benchmarks/bench_backup_move.py [--files 2000] [--size-kb 256]
+"""
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from common import timed
+
+from uninstaller import AppUninstaller, MemoryRegistryBackend, RegistrySnapshot, ScanIndex
+
+
+def make_folder(root: Path, files: int, size: int, seed: int = 1) -> dict:
+    """Create the folder; returns {relative path: sha256} of its files."""
+    rng = random.Random(seed)
+    digests = {}
+    for i in range(files):
+        path = root / f"dir{i % 20}" / f"sub{i % 7}" / f"file{i}.dat"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = rng.randbytes(size)
+        path.write_bytes(data)
+        digests[str(path.relative_to(root))] = hashlib.sha256(data).hexdigest()
+    return digests
+
+
+def check(folder: Path, backup: Path, digests: dict) -> None:
+    assert not folder.exists(), f"{folder} was not removed"
+    for relative, digest in digests.items():
+        assert hashlib.sha256((backup / relative).read_bytes()).hexdigest() == digest, f"{relative} differs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    registry = RegistrySnapshot(MemoryRegistryBackend())
+    runs = [("copy", "copy", None), ("move", "move", None),
+            ("link", "move", mock.patch("os.replace", side_effect=PermissionError("in use"))),
+            ("fallback", "move", mock.patch.object(AppUninstaller, "_same_volume", return_value=False))]
+
+    print(f"{'files':>6} {'MB':>6} {'mode':>9} {'time (s)':>9} {'bytes copied (MB)':>18}")
+    for label, mode, patch in runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp, "Programs", "BenchApp")
+            digests = make_folder(folder, args.files, args.size_kb * 1024)
+            inodes = {relative: os.stat(folder / relative).st_ino for relative in digests}
+            uninstaller = AppUninstaller("BenchApp", backup=True, backup_mode=mode,
+                                         registry=registry, scan_index=ScanIndex([]))
+            uninstaller.backup_dir = Path(tmp, "backups", "BenchApp")
+            times = {}
+            with timed(label, times):
+                if patch:
+                    with patch:
+                        removed = uninstaller.remove_directories([folder])
+                else:
+                    removed = uninstaller.remove_directories([folder])
+            assert removed == 1, "folder not removed"
+            backup = uninstaller.backup_dir / "files" / folder.relative_to(folder.anchor)
+            check(folder, backup, digests)
+
+            # Data bytes that went through a copy: a renamed or linked file keeps its inode
+            copied = sum(os.path.getsize(backup / relative) for relative, inode in inodes.items()
+                         if os.stat(backup / relative).st_ino != inode)
+            total_mb = args.files * args.size_kb / 1024
+            print(f"{args.files:>6} {total_mb:>6.0f} {label:>9} {times[label]:>9.3f} {copied / 1024 / 1024:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""copytree backups vs. the deduplicating BackupStore.
+
+Every synthetic application folder holds the same shared runtime plus files
+of its own, half of them random (incompressible) and half text-like. Each
+folder is backed up as a separate uninstall session; the store's sessions are
+then restored and compared byte for byte with the originals.
+
+Usage: python benchmarks/bench_backup_store.py [--apps 5] [--runtime-mb 32] [--unique-mb 8]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+from pathlib import Path
+
+from common import WORDS, timed
+
+from uninstaller import BackupStore
+
+
+def write_files(folder: Path, total_mb: int, rng: random.Random) -> None:
+    folder.mkdir(parents=True, exist_ok=True)
+    remaining = total_mb * 1024 * 1024
+    i = 0
+    while remaining > 0:
+        size = min(remaining, rng.randint(64 * 1024, 4 * 1024 * 1024))
+        if i % 2:
+            data = rng.randbytes(size)
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(size // 6 + 1)).encode()
+            data = text[:size]
+        (folder / f"file{i}.bin").write_bytes(data)
+        remaining -= size
+        i += 1
+
+
+def make_apps(root: Path, apps: int, runtime_mb: int, unique_mb: int):
+    runtime = root / "runtime"
+    write_files(runtime, runtime_mb, random.Random(1))
+    folders = []
+    for i in range(apps):
+        folder = root / f"App{i}"
+        shutil.copytree(runtime, folder / "runtime")
+        write_files(folder / "data", unique_mb, random.Random(100 + i))
+        folders.append(folder)
+    return folders
+
+
+def tree_size(path: Path) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def same_tree(a: Path, b: Path) -> bool:
+    for directory, _, files in os.walk(a):
+        for name in files:
+            source = Path(directory, name)
+            if source.read_bytes() != (b / source.relative_to(a)).read_bytes():
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=5)
+    parser.add_argument("--runtime-mb", type=int, default=32)
+    parser.add_argument("--unique-mb", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        folders = make_apps(tmp / "apps", args.apps, args.runtime_mb, args.unique_mb)
+        source_bytes = sum(tree_size(folder) for folder in folders)
+        times = {}
+
+        with timed("copytree", times):
+            for folder in folders:
+                shutil.copytree(folder, tmp / "copies" / folder.name)
+        copy_bytes = tree_size(tmp / "copies")
+
+        store = BackupStore(tmp / "store")
+        with timed("store", times):
+            for folder in folders:
+                store.backup(folder, tmp / "sessions" / folder.name / "manifest.jsonl")
+
+        with timed("restore", times):
+            for folder in folders:
+                store.restore(tmp / "sessions" / folder.name / "manifest.jsonl", tmp / "restored")
+        for folder in folders:
+            assert same_tree(folder, tmp / "restored" / folder.relative_to(folder.anchor)), f"{folder} differs"
+
+    mb = 1024 * 1024
+    print(f"source: {source_bytes / mb:.1f} MB in {args.apps} folders")
+    print(f"{'method':>10} {'written (MB)':>13} {'time (s)':>9}")
+    print(f"{'copytree':>10} {copy_bytes / mb:>13.1f} {times['copytree']:>9.3f}")
+    print(f"{'store':>10} {store.bytes_written / mb:>13.1f} {times['store']:>9.3f}")
+    print(f"store: {store.chunks_new} chunks written, {store.chunks_reused} reused; "
+          f"restore {times['restore']:.3f} s, verified")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Application sizes for --list-only and the menu: estimated, measured serially and in parallel.
+
+The script builds a synthetic Windows layout with --apps applications and
+about --entries filler files and folders, and a registry whose
+InstallLocation values point into the layout. The first application gets
+hard links between its install and AppData folders and a symbolic link to
+the Windows folder, which must neither be counted twice nor followed. It
+times the text listing without sizes, with the EstimatedSize values, and
+with sizes measured on disk by 1 and --workers threads (the --latency-ms
+option adds a sleep to every directory listing to model slow disks), then
+once more from the cache. Every measured size is checked against a serial
+os.walk that counts each inode once, plain listing must not list a single
+folder, and the menu must only measure the applications on screen. An
+InstallLocation at the drive root or above the data locations must not be
+measured.
+
+Usage: python benchmarks/bench_disk_usage.py [--apps 200] [--entries 100000] [--workers 4] [--latency-ms 0]
+"""
+import argparse
+import builtins
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+from common import app_names, make_registry_tree, make_windows_layout, timed, windows_environment
+
+import uninstaller
+from uninstaller import (AppSizes, DiskUsage, MemoryRegistryBackend, RegistrySnapshot, display_app_selection_menu,
+                         get_installed_applications, list_installed_applications)
+
+
+class SlowDiskUsage(DiskUsage):
+    latency = 0.0
+
+    def _list(self, path):
+        time.sleep(self.latency)
+        return super()._list(path)
+
+
+def walk_size(folders):
+    """Bytes below the folders with a serial os.walk, every inode counted once."""
+    seen = set()
+    total = 0
+    for folder in folders:
+        for path, _, files in os.walk(folder):
+            for name in files:
+                st = os.lstat(os.path.join(path, name))
+                if not os.path.islink(os.path.join(path, name)) and (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino))
+                    total += st.st_size
+    return total
+
+
+def disk_sizes(workers, latency):
+    sizes = AppSizes("disk", workers=workers)
+    sizes.disk_usage = SlowDiskUsage(workers)
+    sizes.disk_usage.latency = latency
+    return sizes
+
+
+def listing(registry, **kwargs):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        list_installed_applications(registry, **kwargs)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    apps = app_names(args.apps)
+    tree = make_registry_tree(apps, entries=args.apps)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_windows_layout(Path(tmp, "C"), apps, args.entries, app_files=8, file_size=64 * 1024)
+        for i, app in enumerate(apps):
+            program_files = env["ProgramFiles(x86)" if i % 3 == 2 else "ProgramFiles"]
+            for hive in tree.values():
+                for parts in (("SOFTWARE", "Microsoft", "Windows", "CurrentVersion", "Uninstall"),
+                              ("SOFTWARE", "WOW6432Node", "Microsoft", "Windows", "CurrentVersion", "Uninstall")):
+                    node = hive
+                    for part in parts:
+                        node = node[part]
+                    for key in node.values():
+                        if key["@values"]["DisplayName"] == app:
+                            key["@values"]["InstallLocation"] = str(Path(program_files, app))
+        install = Path(env["ProgramFiles"], apps[0])
+        for path in list(install.iterdir()):
+            os.link(path, Path(env["APPDATA"], apps[0], f"link_{path.name}"))
+        os.symlink(env["SystemRoot"], install / "windows_link")
+
+        with windows_environment(env):
+            registry = RegistrySnapshot(MemoryRegistryBackend(tree)).load()
+            installed = get_installed_applications(registry)
+            times = {}
+            outputs = {}
+
+            uninstaller.enable_profiling()
+            with timed("no sizes", times):
+                outputs["no sizes"] = listing(registry)
+            assert not uninstaller.PROFILER.counters.get("scandir"), "plain listing walked folders"
+            uninstaller.PROFILER = uninstaller.NullProfiler()
+
+            with timed("estimated, by size", times):
+                outputs["estimated"] = listing(registry, sort="size")
+            estimated = sorted((app["EstimatedSize"] * 1024 for app in installed), reverse=True)
+            assert outputs["estimated"].count(" - ") == len(installed)
+            first = next(line for line in outputs["estimated"].splitlines() if line.startswith("  1. "))
+            assert first.endswith(uninstaller.format_size(estimated[0])), first
+
+            measured = {}
+            for workers in (1, args.workers):
+                sizes = disk_sizes(workers, latency)
+                with timed(f"disk, {workers} workers", times):
+                    outputs["disk"] = listing(registry, sizes=sizes, sort="size")
+                measured[workers] = {app["DisplayName"]: sizes.size(app) for app in installed}
+            assert measured[1] == measured[args.workers], "parallel sizes differ from the serial ones"
+            with timed("disk, cached", times):
+                assert listing(registry, sizes=sizes, sort="size") == outputs["disk"]
+
+            with timed("os.walk, folders known", times):
+                expected = {app["DisplayName"]: walk_size(sizes.folders(app)) for app in installed}
+            assert measured[1] == expected, "sizes differ from os.walk"
+            first_folders = sizes.folders(installed[0])
+            assert len(first_folders) == 3, first_folders  # Program Files, Roaming and Local AppData
+            # The hard links add nothing, the symbolic link is not followed
+            assert measured[1][apps[0]] == 3 * 8 * 64 * 1024, measured[1][apps[0]]
+
+            # An InstallLocation at a drive root, or above the data locations, is never walked
+            for location in (Path(tmp).anchor, tmp, str(Path(tmp, "C"))):
+                app = dict(installed[0], InstallLocation=location)
+                guarded = AppSizes("disk", workers=args.workers)
+                assert guarded.folders(app) == first_folders, (location, guarded.folders(app))
+
+            # Machine-readable output gets a Size column in bytes
+            out = io.StringIO()
+            with redirect_stdout(out):
+                list_installed_applications(registry, fmt="jsonl", fields=["DisplayName"], sizes=sizes, sort="size")
+            records = [json.loads(line) for line in out.getvalue().splitlines()]
+            assert list(records[0]) == ["DisplayName", "Size"]
+            assert [record["Size"] for record in records] == sorted(measured[1].values(), reverse=True)
+
+            # The menu measures only the page on screen; 's' then sorts everything by size
+            for inputs, expect_all in ((["q"], False), (["s", "1", "y"], True)):
+                menu_sizes = AppSizes("disk", workers=args.workers)
+                answers = iter(inputs)
+                with mock.patch.object(builtins, "input", lambda prompt="": next(answers)), \
+                        mock.patch("uninstaller.console_key_reader", return_value=None), \
+                        redirect_stdout(io.StringIO()) as menu:
+                    display_app_selection_menu(installed, menu_sizes)
+                measured_apps = len(menu_sizes._sizes)
+                assert measured_apps == len(installed) if expect_all else measured_apps <= 20, measured_apps
+            largest = max(installed, key=lambda app: measured[1][app["DisplayName"]])
+            assert menu.getvalue().split("Application Name")[-1].split("\n")[2].split()[1] == largest["DisplayName"]
+
+    print(f"{len(installed)} applications, {args.entries} filler entries, latency {args.latency_ms} ms per folder")
+    print(f"{'listing':<22} {'time (s)':>9}")
+    for label, seconds in times.items():
+        print(f"{label:<22} {seconds:>9.3f}")
+    if args.workers > 1:
+        print(f"\nparallel speedup {times['disk, 1 workers'] / times[f'disk, {args.workers} workers']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""The --list-only print loop vs. streamed jsonl/json/csv inventory output.
+
+The print loop loads the whole snapshot and sorts it before printing; the
+machine-readable formats stream records as the Uninstall keys are read.
+Output goes to os.devnull; peak memory is traced after the fixture is built.
+
+Usage: python benchmarks/bench_inventory.py [--entries 10000 50000] [--fields DisplayName,DisplayVersion]
+"""
+import argparse
+import contextlib
+import os
+import time
+import tracemalloc
+
+from common import app_names, make_registry_tree
+
+from uninstaller import (APPLICATION_FIELDS, MemoryRegistryBackend, RegistrySnapshot, get_installed_applications,
+                         iter_installed_applications, write_inventory)
+
+
+class FirstWrite:
+    """A devnull writer that remembers when the first record came out."""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.first = None
+
+    def write(self, text):
+        if self.first is None and len(text) > 2:  # Not the opening bracket of a JSON array
+            self.first = time.perf_counter()
+        return self.sink.write(text)
+
+
+def print_loop(backend, out):
+    installed_apps = get_installed_applications(RegistrySnapshot(backend).load())
+    with contextlib.redirect_stdout(out):
+        print(f"\nFound {len(installed_apps)} installed applications:")
+        for i, app in enumerate(installed_apps, 1):
+            print(f"{i:3}. {app.get('DisplayName', 'Unknown')} "
+                  f"({app.get('DisplayVersion', 'Unknown Version')})")
+    return len(installed_apps)
+
+
+def streamed(fmt, fields):
+    def run(backend, out):
+        return write_inventory(iter_installed_applications(RegistrySnapshot(backend), fields), fmt, fields, out)
+    return run
+
+
+def measure(run, backend, sink):
+    out = FirstWrite(sink)
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = run(backend, out)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, out.first - start, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--fields", default=",".join(APPLICATION_FIELDS))
+    args = parser.parse_args()
+    fields = args.fields.split(",")
+
+    runs = [("print loop", print_loop)] + [(fmt, streamed(fmt, fields)) for fmt in ("jsonl", "json", "csv")]
+    print(f"{'entries':>8} {'output':>10} {'records':>8} {'total (s)':>10} {'first (ms)':>11} {'peak (MB)':>10}")
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        for entries in args.entries:
+            backend = MemoryRegistryBackend(make_registry_tree(app_names(10), entries))
+            counts = set()
+            for label, run in runs:
+                count, elapsed, first, peak = measure(run, backend, sink)
+                counts.add(count)
+                print(f"{entries:>8} {label:>10} {count:>8} {elapsed:>10.3f} {first * 1000:>11.1f} "
+                      f"{peak / 1024 / 1024:>10.1f}")
+            assert len(counts) == 1, "record counts differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Type-to-filter search of the selection menu on a synthetic inventory.
+
+Each query is typed one character at a time (then erased again with
+backspace) against an AppSearchIndex of --entries applications, and every
+keystroke is timed (median of --repeat runs). The same keystrokes are also answered by a plain scan
+that lower-cases DisplayName, Publisher and DisplayVersion of every
+application, like a filter without an index would. Every result is checked
+against a brute-force search (substring matches, then names that contain the
+most trigrams of the query), and the script fails when the slowest
+keystroke of the index exceeds --budget-ms. It also drives the menu itself
+with scripted input, where 'all' must not select the fuzzy matches of a
+filter.
+
+Usage: python benchmarks/bench_menu_search.py [--entries 20000] [--budget-ms 5] [--repeat 5]
+"""
+import argparse
+import builtins
+import io
+import random
+import re
+import statistics
+import time
+from contextlib import redirect_stdout
+from unittest import mock
+
+from common import WORDS
+
+from uninstaller import AppSearchIndex, display_app_selection_menu, live_search
+
+VENDORS = ["Microsoft", "Adobe", "Google", "Mozilla", "Oracle", "Intel", "NVIDIA", "JetBrains", "Python Software",
+           "VideoLAN", "7-Zip", "Autodesk", "Corel", "Logitech", "Realtek", "Dell", "HP", "Lenovo", "Valve", "Zoom"]
+PRODUCTS = ["Visual Studio", "Acrobat Reader", "Chrome", "Firefox", "Java Runtime", "Graphics Driver", "PyCharm",
+            "Python", "VLC media player", "AutoCAD", "Steam", "Audio Driver", "Update Helper", "Runtime",
+            "SDK", "Tools", "Redistributable", "Language Pack", "Help Viewer", "Service"]
+QUERIES = ["visual studio", "micro", "acrobat reader", "python 3.1", "driver", "zzz", "acro read", "chrme", "x64"]
+
+
+def make_inventory(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    apps = []
+    for i in range(count):
+        vendor = rng.choice(VENDORS)
+        name = f"{vendor.split()[0]} {rng.choice(PRODUCTS)} {rng.choice(WORDS).title()}"
+        if rng.random() < 0.3:
+            name += f" {rng.randint(2008, 2025)} (x{rng.choice(['64', '86'])})"
+        apps.append({"DisplayName": f"{name} {i}", "Publisher": f"{vendor} Corporation",
+                     "DisplayVersion": f"{rng.randint(1, 20)}.{rng.randint(0, 9)}.{rng.randint(0, 9999)}"})
+    return sorted(apps, key=lambda app: app["DisplayName"].lower())
+
+
+def brute_force(apps, query):
+    """The expected matches, as (substring matches, fuzzy matches) sets."""
+    query = query.strip().lower()
+    texts = [" " + " \0 ".join(str(app.get(field, "")).lower() for field in ("DisplayName", "Publisher", "DisplayVersion"))
+             + " " for app in apps]
+    hits = {i for i, text in enumerate(texts) if query in text}
+    fuzzy = set()
+    if len(query) >= AppSearchIndex.FUZZY_MIN_LENGTH:
+        padded = f" {query} "
+        trigrams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        fuzzy = {i for i, text in enumerate(texts) if i not in hits and
+                 sum(trigram in text for trigram in trigrams) >= AppSearchIndex.FUZZY_THRESHOLD * len(trigrams)}
+    return hits, fuzzy
+
+
+def plain_scan(apps, query):
+    query = query.lower()
+    return [i for i, app in enumerate(apps)
+            if query in f"{app.get('DisplayName', '')}\0{app.get('Publisher', '')}\0{app.get('DisplayVersion', '')}"
+            .lower()]
+
+
+def keystrokes(query):
+    """The queries seen while typing query and erasing it again."""
+    typed = [query[:k] for k in range(1, len(query) + 1)]
+    return typed + typed[-2::-1]
+
+
+def run_menu(apps, inputs):
+    """Drive display_app_selection_menu with scripted input; returns its selection."""
+    answers = iter(inputs)
+    with mock.patch.object(builtins, "input", lambda prompt="": next(answers)), \
+            mock.patch("uninstaller.console_key_reader", return_value=None), redirect_stdout(io.StringIO()):
+        return display_app_selection_menu(apps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = make_inventory(args.entries)
+    start = time.perf_counter()
+    index = AppSearchIndex(apps)
+    print(f"index of {len(apps)} applications built in {time.perf_counter() - start:.3f}s "
+          f"({len(index.trigrams)} trigrams)")
+
+    print(f"{'query':<16} {'keys':>5} {'matches':>8} {'fuzzy':>6} {'index max (ms)':>15} {'median':>7} "
+          f"{'scan max (ms)':>14}")
+    slowest = 0.0
+    for query in QUERIES:
+        index_times, scan_times = [], []
+        for typed in keystrokes(query):
+            # Median of a few runs, each starting from the results of the keys typed before
+            cache, sets = dict(index._cache), dict(index._posting_sets)
+            runs = []
+            for _ in range(args.repeat):
+                index._cache, index._posting_sets = dict(cache), dict(sets)
+                start = time.perf_counter()
+                result = index.search(typed)
+                runs.append((time.perf_counter() - start) * 1000)
+            index_times.append(statistics.median(runs))
+            start = time.perf_counter()
+            plain_scan(apps, typed)
+            scan_times.append((time.perf_counter() - start) * 1000)
+
+            hits, fuzzy = brute_force(apps, typed)
+            assert len(result) == len(set(result)) == len(hits) + len(fuzzy), typed
+            assert set(result[:len(hits)]) == hits and set(result[len(hits):]) == fuzzy, typed
+        full = index.search(query)
+        names = [apps[i]["DisplayName"].lower() for i in full]
+        hits = brute_force(apps, query)[0]
+        # Names starting with the query come first
+        starts = [name.startswith(query) for name in names[:len(hits)]]
+        assert starts == sorted(starts, reverse=True), query
+        slowest = max(slowest, max(index_times))
+        print(f"{query:<16} {len(index_times):>5} {len(hits):>8} {len(full) - len(hits):>6} "
+              f"{max(index_times):>15.2f} {statistics.median(index_times):>7.2f} {max(scan_times):>14.2f}")
+
+    # The menu: filter, select all matches; filter, clear, pick a number
+    micro = sorted(brute_force(apps, "micro")[0])
+    assert run_menu(apps, ["/micro", "all"]) == micro
+    # Similar names are listed, but 'all' only takes the names containing the filter
+    browsers = [{"DisplayName": name, "Publisher": publisher, "DisplayVersion": "1.0"}
+                for name, publisher in (("Chromium", "The Chromium Authors"), ("Google Chrome", "Google LLC"),
+                                        ("Notepad++", "Notepad++ Team"))]
+    assert set(AppSearchIndex(browsers).search("chrome")) == {0, 1}
+    assert run_menu(browsers, ["/chrome", "all"]) == [1]
+    assert run_menu(apps, ["/zzzz", "//", "3", "y"]) == [2]
+    assert run_menu(apps, ["/", "chrome", "q"]) == []
+    # Type-to-filter with scripted key presses: backspace, then Enter keeps the filter, Esc cancels
+    rows = [app["DisplayName"] for app in apps]
+    with redirect_stdout(io.StringIO()):
+        assert live_search(index, rows, "header", iter("chrx\x7fome\r").__next__) == "chrome"
+        assert live_search(index, rows, "header", iter("zz\x1b").__next__) is None
+
+    print(f"\nslowest keystroke {slowest:.2f} ms (budget {args.budget_ms:.0f} ms)")
+    assert slowest <= args.budget_ms, "search exceeds the per-keystroke budget"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Per-application regex loop vs. one NameMatcher for a whole batch.
+
+Usage: python benchmarks/bench_name_matcher.py [--names 200000] [--patterns 1 10 40 100 400]
+"""
+import argparse
+import random
+import re
+
+from common import WORDS, app_names, timed
+
+from uninstaller import NameMatcher
+
+
+def make_names(count, apps, match_rate=0.01, seed=1):
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}{i}.dat"
+        if rng.random() < match_rate:
+            name = f"{rng.choice(apps)} {name}"
+        names.append(name)
+    return names
+
+
+def regex_loop(names, apps):
+    """What a batch costs today: one compiled regex and one pass per app."""
+    matches = {}
+    for app in apps:
+        pattern = re.compile(rf"{re.escape(app)}", re.IGNORECASE)
+        for name in names:
+            if pattern.search(name):
+                matches.setdefault(name, set()).add(app)
+    return matches
+
+
+def matcher_pass(names, apps):
+    matcher = NameMatcher(apps)
+    matches = {}
+    for name in names:
+        found = matcher.match(name)
+        if found:
+            matches[name] = found
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=200_000)
+    parser.add_argument("--patterns", type=int, nargs="+", default=[1, 10, 40, 100, 400])
+    args = parser.parse_args()
+
+    all_apps = app_names(max(args.patterns))
+    names = make_names(args.names, all_apps)
+    print(f"{'patterns':>8} {'regex loop (s)':>15} {'matcher (s)':>12} {'speedup':>9}")
+    for count in args.patterns:
+        apps = all_apps[:count]
+        times = {}
+        with timed("loop", times):
+            expected = regex_loop(names, apps)
+        with timed("matcher", times):
+            actual = matcher_pass(names, apps)
+        assert expected == actual, "results differ"
+        print(f"{count:>8} {times['loop']:>15.3f} {times['matcher']:>12.3f} "
+              f"{times['loop'] / times['matcher']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
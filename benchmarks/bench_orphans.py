@@ -0,0 +1,122 @@
+"""--find-orphans with the reverse index vs. checking every folder against every application.
+
+The script builds a synthetic Windows layout for --apps applications, of
+which only the first half stays in the registry (with InstallLocation
+pointing into the layout), and adds --folders extra top-level folders: half
+named after an installed application or its publisher, half after nothing
+at all. It times the OwnerIndex build plus the classification of every
+top-level folder, the complete find_orphan_folders (which also measures the
+orphans), and a brute-force pass that intersects the name keys of every
+folder with those of every application. The script checks that both find
+the same orphans, that the folders of the removed applications are among
+them and those of the installed ones are not, and that the sizes are right.
+
+Usage: python benchmarks/bench_orphans.py [--apps 1000] [--folders 4000] [--workers 4]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from common import WORDS, app_names, make_registry_tree, make_windows_layout, timed, windows_environment
+
+from uninstaller import (PUBLISHER_SUFFIXES, SYSTEM_FOLDERS, MemoryRegistryBackend, OwnerIndex, RegistrySnapshot,
+                         find_orphan_folders, get_common_data_locations, name_keys)
+
+UNINSTALL_PATHS = [("SOFTWARE", "Microsoft", "Windows", "CurrentVersion", "Uninstall"),
+                   ("SOFTWARE", "WOW6432Node", "Microsoft", "Windows", "CurrentVersion", "Uninstall")]
+
+
+def uninstall_entries(tree):
+    for hive in tree.values():
+        for parts in UNINSTALL_PATHS:
+            node = hive
+            for part in parts:
+                node = node[part]
+            yield from (key["@values"] for key in node.values())
+
+
+def brute_force(entries, folders):
+    """Orphans found by checking every folder against every application."""
+    apps = []
+    for values in entries:
+        keys = set(name_keys(values["DisplayName"])) | set(name_keys(values["Publisher"], PUBLISHER_SUFFIXES))
+        apps.append((keys, os.path.normcase(os.path.normpath(values["InstallLocation"]))))
+    orphans = []
+    for folder in folders:
+        keys = set(name_keys(os.path.basename(folder)))
+        prefix = os.path.normcase(os.path.normpath(folder))
+        if not any(keys & app_keys or location == prefix or location.startswith(prefix + os.sep)
+                   for app_keys, location in apps):
+            orphans.append(folder)
+    return orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=1000)
+    parser.add_argument("--folders", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    apps = app_names(args.apps)
+    installed, removed = apps[:args.apps // 2], apps[args.apps // 2:]
+    tree = make_registry_tree(installed, entries=len(installed))
+    entries = list(uninstall_entries(tree))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_windows_layout(Path(tmp, "C"), apps, 2000, app_files=2, file_size=1024)
+        for values in entries:
+            i = apps.index(values["DisplayName"])
+            values["InstallLocation"] = str(Path(env["ProgramFiles(x86)" if i % 3 == 2 else "ProgramFiles"],
+                                                 values["DisplayName"]))
+        locations = [Path(env[name]) for name in ("APPDATA", "LOCALAPPDATA", "ProgramData")]
+        for i in range(args.folders):
+            if i % 2:
+                values = rng.choice(entries)
+                name = rng.choice([f"{values['DisplayName']} {rng.choice(WORDS)}",
+                                   values["Publisher"].replace(" Software", "") + f" {values['DisplayName']}"])
+            else:
+                name = f"Leftover{rng.choice(WORDS).title()}{i}"
+            folder = rng.choice(locations) / name
+            folder.mkdir(exist_ok=True)
+            (folder / "data.bin").write_bytes(b"x" * (i % 7) * 512)
+
+        with windows_environment(env):
+            registry = RegistrySnapshot(MemoryRegistryBackend(tree)).load()
+            roots = get_common_data_locations()
+            root_keys = {os.path.normcase(os.path.normpath(str(root))) for root in roots}
+            folders = [entry.path for root in roots if root.is_dir() for entry in os.scandir(root)
+                       if entry.is_dir() and entry.name.lower() not in SYSTEM_FOLDERS
+                       and os.path.normcase(entry.path) not in root_keys]
+
+            times = {}
+            with timed("reverse index", times):
+                owners = OwnerIndex.build(registry)
+                indexed = [folder for folder in folders if owners.owner(folder) is None]
+            with timed("find_orphan_folders", times):
+                records = find_orphan_folders(registry, workers=args.workers)
+            with timed("apps x folders", times):
+                expected = brute_force(entries, folders)
+
+    found = [record["Path"] for record in records]
+    assert sorted(found) == sorted(indexed) == sorted(expected), "the orphans differ from the brute-force ones"
+    names = {os.path.basename(path) for path in found}
+    assert names.issuperset(removed), "folders of removed applications were not reported"
+    assert not names & set(installed), "folders of installed applications were reported"
+    assert all(name.startswith("Leftover") or name.split("_")[0] in removed or name.startswith(("dir_", "file_"))
+               for name in names), sorted(names)[:10]
+    sizes = {os.path.basename(record["Path"]): record["Size"] for record in records}
+    assert all(sizes[app] == 2 * 1024 for app in removed if app in sizes)
+    assert [record["Size"] for record in records] == sorted((record["Size"] for record in records), reverse=True)
+
+    print(f"{len(entries)} installed applications, {len(folders)} top-level folders, {len(found)} orphans")
+    print(f"{'method':<22} {'time (s)':>9}")
+    for label, seconds in times.items():
+        print(f"{label:<22} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""shutil.rmtree vs. the ParallelDeleter on a generated tree of small files.
+
+The tree looks like a package cache: many folders of a few dozen small files.
+Some files are made read-only. Each variant deletes its own fresh copy and
+the root must be gone afterwards. (Creating the default 200k files takes a
+while; use --files to try smaller trees.) A last check deletes a tree with
+symbolic links (and on Windows a junction) to a folder and a file outside
+it, and a link handed over as the root: the links must be removed, and what
+they point to must be left untouched.
+
+Usage: python benchmarks/bench_parallel_delete.py [--files 200000] [--per-dir 40] [--workers 4 8 16]
+"""
+import argparse
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+from common import timed
+
+from uninstaller import ParallelDeleter
+
+
+def make_tree(root: Path, files: int, per_dir: int) -> None:
+    for i in range(0, files, per_dir):
+        folder = root / f"pkg{i // per_dir // 100}" / f"mod{i // per_dir}" / "lib"
+        folder.mkdir(parents=True, exist_ok=True)
+        for j in range(min(per_dir, files - i)):
+            path = folder / f"f{j}.js"
+            path.write_bytes(b"x" * 200)
+            if j == 0:
+                os.chmod(path, stat.S_IREAD)
+
+
+def check_links(tmp: Path, workers: int) -> None:
+    """Links below the root, and a link as the root, are unlinked without touching their targets."""
+    target = tmp / "target"
+    (target / "sub").mkdir(parents=True)
+    (target / "sub" / "keep.txt").write_text("keep")
+    (target / "keep.dat").write_text("keep")
+    root = tmp / "links"
+    (root / "app").mkdir(parents=True)
+    (root / "app" / "f.txt").write_text("x")
+    os.symlink(target, root / "app" / "dir_link", target_is_directory=True)
+    os.symlink(target / "keep.dat", root / "file_link")
+    links = 2
+    if sys.platform == "win32":
+        import _winapi
+        _winapi.CreateJunction(str(target), str(root / "app" / "junction"))
+        links += 1
+    os.symlink(target, tmp / "root_link", target_is_directory=True)
+
+    deleter = ParallelDeleter(workers)
+    assert deleter.delete_tree(root) == [], "errors while deleting the tree with links"
+    assert deleter.delete_tree(tmp / "root_link") == [], "errors while deleting the link root"
+    assert not root.exists() and not os.path.lexists(tmp / "root_link"), "links not removed"
+    assert deleter.files_removed == 1 + links + 1, deleter.files_removed
+    assert sorted(str(path.relative_to(target)) for path in target.rglob("*")) == \
+        ["keep.dat", "sub", os.path.join("sub", "keep.txt")], "a link target was touched"
+    assert (target / "sub" / "keep.txt").read_text() == "keep"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200000)
+    parser.add_argument("--per-dir", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'method':>14} {'time (s)':>9} {'files':>8} {'dirs':>6} {'errors':>7}")
+    for workers in [1] + args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp, "node_modules")
+            make_tree(root, args.files, args.per_dir)
+            label = "shutil.rmtree" if workers == 1 else f"{workers} workers"
+            times = {}
+            with timed(label, times):
+                if workers == 1:
+                    shutil.rmtree(root)
+                    files = dirs = errors = "-"
+                else:
+                    deleter = ParallelDeleter(workers)
+                    errors = len(deleter.delete_tree(root))
+                    files, dirs = deleter.files_removed, deleter.dirs_removed
+            assert not root.exists(), "tree not removed"
+            print(f"{label:>14} {times[label]:>9.3f} {files:>8} {dirs:>6} {errors:>7}")
+
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            check_links(Path(tmp), workers)
+    print("\nlinks removed, their targets kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Serial directory walk vs. the ParallelWalker at several worker counts.
+
+Local SSDs and tmpfs answer scandir almost instantly, so the --latency-ms
+option adds a sleep to every directory listing to model spinning disks and
+network-redirected AppData folders.
+
+Usage: python benchmarks/bench_parallel_walk.py [--entries 200000] [--workers 2 4 8] [--latency-ms 0]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from common import app_names, make_tree, timed
+
+import uninstaller
+from uninstaller import ScanIndex
+
+
+def snapshot(index):
+    return index._names, list(index._parents), bytes(index._flags), index._haystack
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.latency_ms:
+        scan_directory = uninstaller.scan_directory
+
+        def slow_scan_directory(path):
+            time.sleep(args.latency_ms / 1000)
+            return scan_directory(path)
+
+        uninstaller.scan_directory = slow_scan_directory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.entries} entries...")
+        roots = make_tree(Path(tmp), args.entries, app_names(10))
+
+        times = {}
+        with timed("serial", times):
+            expected = snapshot(ScanIndex.build(roots))
+        print(f"{'workers':>8} {'time (s)':>10} {'speedup':>9}")
+        print(f"{1:>8} {times['serial']:>10.3f} {1:>8.1f}x")
+        for workers in args.workers:
+            with timed(workers, times):
+                actual = snapshot(ScanIndex.build(roots, workers=workers))
+            assert actual == expected, f"parallel walk with {workers} workers differs"
+            print(f"{workers:>8} {times[workers]:>10.3f} {times['serial'] / times[workers]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Cost and output of --profile on a thorough uninstall.
+
+Each run builds the same synthetic tree and in-memory registry, then
+uninstalls one application in thorough mode; its official uninstaller is a
+Python one-liner. The uninstall runs once without and once with the
+profiler. The script checks that the trace file is valid JSON with one
+complete event per step and one counter event per counter, that the
+counters are nonzero and that the report lists them, and prints the time of
+both runs. A last run uninstalls two applications side by side (--jobs 2):
+the counters of each must be its own, adding up to the totals of the run,
+and must also be on its "uninstall" span in the trace.
+
+Usage: python benchmarks/bench_profiler.py [--entries 20000] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+from common import app_names, make_registry_tree, make_tree, redirect_backups, timed
+
+import uninstaller
+from uninstaller import AppUninstaller, MemoryRegistryBackend, Profiler, RegistrySnapshot, ScanIndex, UninstallScheduler
+
+
+def fixture(tmp: Path, entries: int):
+    """Return (application names, registry tree, data roots) of a fresh fixture."""
+    apps = app_names(5)
+    tree = make_registry_tree(apps, entries=200, vendors=50)
+    for hive in tree.values():
+        for parts in (("SOFTWARE", "Microsoft", "Windows", "CurrentVersion", "Uninstall"),
+                      ("SOFTWARE", "WOW6432Node", "Microsoft", "Windows", "CurrentVersion", "Uninstall")):
+            node = hive
+            for part in parts:
+                node = node[part]
+            for key in node.values():
+                key["@values"]["UninstallString"] = f'"{sys.executable}" -c "pass"'
+    roots = make_tree(tmp, entries, apps, match_rate=0.02)
+    for root in roots:
+        for app in apps[:2]:
+            for path in root.rglob(f"*{app}*"):
+                if path.is_file():
+                    path.write_bytes(os.urandom(4096))
+    return apps, tree, roots
+
+
+def run(entries: int, profile: bool):
+    """Uninstall the first application of a fresh fixture; returns (seconds, results, report, profiler)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        apps, tree, roots = fixture(Path(tmp), entries)
+        if profile:
+            uninstaller.enable_profiling()
+        else:
+            uninstaller.PROFILER = uninstaller.NullProfiler()
+        app = AppUninstaller(apps[0], thorough=True, backup=True,
+                             registry=RegistrySnapshot(MemoryRegistryBackend(tree)), scan_index=ScanIndex.build(roots))
+        redirect_backups(app, Path(tmp, "backups", apps[0]))
+        times = {}
+        with timed("uninstall", times):
+            results = app.uninstall()
+        return times["uninstall"], results, app.generate_report(results), uninstaller.PROFILER
+
+
+def run_batch(entries: int):
+    """Uninstall two applications with two jobs; returns (results per application, run totals, trace)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        apps, tree, roots = fixture(Path(tmp), entries)
+        profiler = uninstaller.enable_profiling()
+        registry = RegistrySnapshot(MemoryRegistryBackend(tree))
+        scan_index = ScanIndex.build(roots)
+        batch = []
+        for app in apps[:2]:
+            batch.append(AppUninstaller(app, thorough=True, backup=True, registry=registry, scan_index=scan_index))
+            redirect_backups(batch[-1], Path(tmp, "backups", app))
+        scheduler = UninstallScheduler(batch, jobs=2)
+        scheduler.plan()  # The claims are read before any application starts
+        before = dict(profiler.counters)
+        outcomes = list(scheduler.run())
+        assert not scheduler.errors, scheduler.errors
+        totals = {name: value - before.get(name, 0) for name, value in profiler.counters.items()}
+        path = os.path.join(tmp, "trace.json")
+        profiler.export(path)
+        with open(path, encoding="utf-8") as f:
+            trace = json.load(f)
+    return {u.app_name: results for u, results, _ in outcomes}, totals, trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    plain, profiled = [], []
+    for _ in range(args.runs):
+        plain.append(run(args.entries, profile=False)[0])
+        seconds, results, report, profiler = run(args.entries, profile=True)
+        profiled.append(seconds)
+    assert "profile_phases" not in run(args.entries, profile=False)[1], "phases reported without --profile"
+
+    counters = results["profile_counters"]
+    for name, label in Profiler.COUNTERS.items():
+        assert counters.get(name), f"counter {name} stayed at zero"
+        assert f"- {label}: {counters[name]}" in report, f"{label} missing from the report"
+    assert "- Step Times:" in report
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.json")
+        profiler.export(path)
+        with open(path, encoding="utf-8") as f:
+            trace = json.load(f)
+    events = trace["traceEvents"]
+    spans = {event["name"] for event in events if event["ph"] == "X"}
+    for name in ["uninstall", *results["profile_phases"]]:
+        assert name in spans, f"span {name} missing from the trace"
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in events if event["ph"] == "X")
+    assert {event["name"] for event in events if event["ph"] == "C"} == set(counters) | set(trace["otherData"]["counters"])
+
+    # Side by side, every application counts only its own work
+    batch, totals, trace = run_batch(args.entries)
+    summed = {}
+    for results in batch.values():
+        for name, value in results["profile_counters"].items():
+            summed[name] = summed.get(name, 0) + value
+    assert summed == {name: value for name, value in totals.items() if value}, (summed, totals)
+    uninstall_spans = {event["args"]["app"]: event["args"] for event in trace["traceEvents"]
+                       if event["ph"] == "X" and event["name"] == "uninstall"}
+    for app, results in batch.items():
+        assert all(uninstall_spans[app].get(name) == value for name, value in results["profile_counters"].items()), app
+
+    print(f"{'entries':>8} {'off (s)':>8} {'on (s)':>8} {'overhead':>9} {'spans':>6}")
+    off, on = statistics.median(plain), statistics.median(profiled)
+    print(f"{args.entries:>8} {off:>8.3f} {on:>8.3f} {(on - off) / off:>8.1%} {len(spans):>6}")
+    print()
+    print("\n".join(f"{name}: {seconds:.3f}s" for name, seconds in results["profile_phases"].items()))
+    print(", ".join(f"{name} {value}" for name, value in counters.items()))
+
+
+if __name__ == "__main__":
+    main()
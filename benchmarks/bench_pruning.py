@@ -0,0 +1,178 @@
+"""Paths inside folders that are being removed: skipped, not backed up or deleted twice.
+
+The script builds two data locations with nested folders and files of one
+application (NestApp), an application file outside its folders and
+unrelated files, and checks for every combination of a shared ScanIndex or
+a walk, dry run or real removal, and streaming on or off:
+
+  - which paths reach the delete step (only the top folders and the file
+    outside them),
+  - the pruned counters of the results,
+  - what is left on disk and what went into the backup.
+
+It also hands remove_directories() nested candidates directly, and checks
+that a drive root ("/" or "C:\\") covers every path below it. With
+--copies the layout is repeated that many times inside each folder to time
+the thorough file pass on a larger tree.
+
+Usage: python benchmarks/bench_pruning.py [--copies 200]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from common import redirect_backups, windows_environment
+
+import uninstaller
+from uninstaller import AppUninstaller, MemoryRegistryBackend, PathTrie, RegistrySnapshot, ScanIndex
+
+APP = "NestApp"
+
+# Files of the fixture, relative to the folder holding the two data locations
+LAYOUT = [
+    "root0/NestApp/a.dat",
+    "root0/NestApp/NestApp.log",
+    "root0/NestApp/NestApp_cache/NestApp_1.tmp",
+    "root0/NestApp/NestApp_cache/NestApp_2.tmp",
+    "root0/NestApp/deep/x/NestApp.cfg",
+    "root0/Other/NestApp.ini",
+    "root0/Other/keep.txt",
+    "root1/NestAppData/NestApp.db",
+    "root1/NestAppData/sub/NestApp_settings.json",
+    "root1/Unrelated/keep.dat",
+]
+
+TOP_FOLDERS = ["root0/NestApp", "root1/NestAppData"]
+OUTSIDE_FILE = "root0/Other/NestApp.ini"
+# Files matching the name inside the top folders, which the thorough pass must skip
+INSIDE_FILES = 6
+
+
+def build(root: Path, copies: int) -> None:
+    for relative in LAYOUT:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+    # Bulk inside the application folders, to give the file pass something to skip
+    for folder in TOP_FOLDERS:
+        for i in range(copies):
+            bulk = root / folder / f"bulk{i}"
+            bulk.mkdir()
+            (bulk / f"{APP}_{i}.tmp").write_text("x")
+            (bulk / f"other{i}.dat").write_text("x")
+
+
+def files_left(root: Path):
+    return sorted(os.path.relpath(os.path.join(path, name), root).replace(os.sep, "/")
+                  for path, _, files in os.walk(root) for name in files)
+
+
+def run(tmp: Path, copies: int, indexed: bool, dry_run: bool, streaming: bool):
+    """Uninstall NestApp from a fresh fixture; returns (results, deleted paths, files left, backed-up files, seconds)."""
+    root = Path(tempfile.mkdtemp(dir=tmp))
+    build(root, copies)
+    roots = [root / "root0", root / "root1"]
+    env = {"APPDATA": str(roots[0]), "LOCALAPPDATA": str(roots[1]), "USERNAME": "",
+           "SystemRoot": str(root / "Windows")}
+    with windows_environment(env):
+        scan_index = ScanIndex.build(roots) if indexed else None
+        u = AppUninstaller(APP, thorough=True, dry_run=dry_run, registry=RegistrySnapshot(MemoryRegistryBackend()),
+                           scan_index=scan_index)
+        u.streaming = streaming
+        backups = root.parent / f"{root.name}-backups"
+        redirect_backups(u, backups)
+        deleted = []
+        for name in ("_delete_directory", "_delete_file"):
+            step = getattr(u, name)
+            setattr(u, name, lambda path, step=step: deleted.append(path) or step(path))
+        start = time.perf_counter()
+        results = u.uninstall()
+        seconds = time.perf_counter() - start
+    deleted = sorted(os.path.relpath(path, root).replace(os.sep, "/") for path in deleted)
+    backed_up = files_left(backups) if backups.exists() else []
+    return results, deleted, files_left(root), backed_up, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    uninstaller.PROFILER = uninstaller.NullProfiler()
+
+    everything = sorted(LAYOUT)
+    removed = [path for path in everything if path == OUTSIDE_FILE or any(path.startswith(folder + "/")
+                                                                          for folder in TOP_FOLDERS)]
+    kept = [path for path in everything if path not in removed]
+    inside = INSIDE_FILES + len(TOP_FOLDERS) * args.copies
+
+    print(f"{'index':<8} {'mode':<8} {'streaming':<10} {'pruned files':>13} {'subtrees':>9} {'time (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for indexed in (True, False):
+            for dry_run in (True, False):
+                for streaming in (True, False):
+                    results, deleted, left, backed_up, seconds = run(Path(tmp), args.copies, indexed, dry_run,
+                                                                     streaming)
+                    case = (indexed, dry_run, streaming)
+                    # Only the top folders and the file outside them reach the delete step
+                    assert deleted == sorted(TOP_FOLDERS + [OUTSIDE_FILE]), (case, deleted)
+                    assert results["directories_removed"] == len(TOP_FOLDERS), case
+                    assert results["files_removed"] == 1, case
+                    assert results["pruned_directories"] == 0, case
+                    if indexed:
+                        # The index lists the files inside the folders, each is skipped
+                        assert results["pruned_files"] == inside, (case, results["pruned_files"])
+                        assert results["pruned_subtrees"] == 0, case
+                    elif dry_run:
+                        # The walk does not enter the folders it would remove
+                        assert results["pruned_files"] == 0, case
+                        assert results["pruned_subtrees"] == len(TOP_FOLDERS), case
+                    else:
+                        # The folders are gone before the file pass walks the locations
+                        assert results["pruned_files"] == results["pruned_subtrees"] == 0, case
+                    if dry_run:
+                        assert set(everything) <= set(left) and len(left) == len(everything) + 4 * args.copies, case
+                        assert backed_up == [], case
+                    else:
+                        assert [path for path in left if not path.split("/")[-2].startswith("bulk")] == kept, \
+                            (case, left)
+                        assert not any(path.split("/")[1] in ("NestApp", "NestAppData") for path in left), case
+                        # Every removed file was backed up exactly once
+                        names = sorted(path.rsplit("/", 1)[-1] for path in backed_up if not path.endswith(".reg"))
+                        expected = sorted(path.rsplit("/", 1)[-1] for path in removed) + \
+                            sorted(f"{prefix}{i}{ext}" for i in range(args.copies)
+                                   for prefix, ext in ((f"{APP}_", ".tmp"), ("other", ".dat"))
+                                   for _ in TOP_FOLDERS)
+                        assert names == sorted(expected), case
+                    print(f"{'yes' if indexed else 'no':<8} {'dry run' if dry_run else 'removal':<8} "
+                          f"{'on' if streaming else 'off':<10} {results['pruned_files']:>13} "
+                          f"{results['pruned_subtrees']:>9} {seconds:>9.3f}")
+
+        # Nested candidates handed over directly: only the outermost folders are removed
+        root = Path(tempfile.mkdtemp(dir=tmp))
+        build(root, 0)
+        u = AppUninstaller(APP, backup=False, registry=RegistrySnapshot(MemoryRegistryBackend()),
+                           scan_index=ScanIndex.build([root / "root0", root / "root1"]))
+        deleted = []
+        step = u._delete_directory
+        u._delete_directory = lambda path: deleted.append(path) or step(path)
+        candidates = [root / "root0/NestApp/NestApp_cache", root / "root0/NestApp", root / "root1/NestAppData/sub",
+                      root / "root1/NestAppData", root / "root0/NestApp/deep/x"]
+        assert u.remove_directories(candidates) == 2
+        assert sorted(deleted) == sorted(root / folder for folder in TOP_FOLDERS), deleted
+        assert u.pruned["directories"] == 3, u.pruned
+        assert files_left(root) == ["root0/Other/NestApp.ini", "root0/Other/keep.txt", "root1/Unrelated/keep.dat"]
+
+        # A drive root covers everything on the drive, not only itself
+        anchor = Path(root.anchor)
+        assert PathTrie([anchor]).covers(root / "root0/NestApp") and PathTrie([anchor]).covers(anchor)
+        assert PathTrie.minimal_roots([root / "root0", anchor, root]) == [anchor]
+        assert not PathTrie([root / "root0"]).covers(anchor) and not PathTrie([root / "root"]).covers(root / "root0")
+    print("\nall checks passed")
+
+
+if __name__ == "__main__":
+    main()
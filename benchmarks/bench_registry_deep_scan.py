@@ -0,0 +1,174 @@
+"""Thorough registry scan: one recursive OpenKey scan per app vs. one shared key-name index.
+
+Builds a large in-memory registry: vendor keys under Software (some named
+after the batch's applications), a big Microsoft\\Windows subtree, and
+Software\\Classes with file extensions, ProgIDs and tens of thousands of
+CLSID, Interface and TypeLib entries. The old scan opens every key down to
+depth 2 for every application; the index enumerates each root once, opens
+only keys whose children it needs and skips the pruned subtrees. Both must
+find the same keys outside the pruned subtrees. Finally the plan and apply
+phases of a thorough uninstall run on the same registry: a dry run must
+leave every planned key in place, a real run must remove all of them.
+
+Usage: python benchmarks/bench_registry_deep_scan.py [--apps 1 10] [--clsids 30000] [--vendors 500] [--latency 0]
+"""
+import argparse
+import random
+import threading
+
+from common import app_names, timed
+
+from uninstaller import (DEEP_SCAN_ROOTS, DEFAULT_DEEP_SCAN_PRUNE, AppUninstaller, MemoryRegistryBackend,
+                         NameMatcher, RegistryKeyIndex, RegistrySnapshot, ScanIndex)
+
+
+class CountingBackend(MemoryRegistryBackend):
+    """MemoryRegistryBackend that also counts the keys opened."""
+
+    def __init__(self, tree, latency=0.0):
+        super().__init__(tree, latency)
+        self.opened = 0
+        self._open_lock = threading.Lock()
+
+    def open_key(self, key, sub_key):
+        with self._open_lock:
+            self.opened += 1
+        return super().open_key(key, sub_key)
+
+
+def guid(rng):
+    return "{%08X-%04X-%04X-%04X-%012X}" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16),
+                                             rng.getrandbits(16), rng.getrandbits(48))
+
+
+def make_registry(apps, vendors, clsids, seed=1):
+    rng = random.Random(seed)
+    tree = {}
+    for hive in ("HKEY_CURRENT_USER", "HKEY_LOCAL_MACHINE"):
+        software = {}
+        for i in range(vendors):
+            vendor = software.setdefault(f"Vendor{i}", {})
+            for j in range(rng.randint(1, 5)):
+                product = apps[rng.randrange(len(apps))] if rng.random() < 0.05 else f"Product{j}"
+                vendor[product] = {"Settings": {"@values": {"Version": j}}, "Recent": {}}
+        for app in apps[::3]:
+            software[app] = {"Settings": {}}
+        windows = {}
+        for i in range(clsids // 20):
+            windows[f"Component{i}"] = {"Settings": {}}
+        # The Uninstall keys the application lookup reads, empty in this fixture
+        windows["Uninstall"] = {}
+        software["Microsoft"] = {"Windows": {"CurrentVersion": windows}, "Office": {"16.0": {}}}
+        software["Wow6432Node"] = {f"Vendor{i}": {"Product0": {}} for i in range(vendors // 5)}
+        software["Wow6432Node"]["Microsoft"] = {"Windows": {"CurrentVersion": {"Uninstall": {}}}}
+
+        classes = {}
+        for i in range(clsids):
+            classes.setdefault("CLSID", {})[guid(rng)] = {"InprocServer32": {}}
+        for i in range(clsids // 2):
+            classes.setdefault("Interface", {})[guid(rng)] = {"ProxyStubClsid32": {}}
+        for i in range(clsids // 4):
+            classes.setdefault("TypeLib", {})[guid(rng)] = {"1.0": {}}
+        for i in range(vendors):
+            classes[f".ext{i}"] = {"OpenWithProgids": {}}
+            name = apps[rng.randrange(len(apps))] if rng.random() < 0.05 else f"Vendor{i}"
+            classes[f"{name}.Document.{i}"] = {"shell": {"open": {"command": {}}}}
+        software["Classes"] = classes
+        tree[hive] = {"Software": software}
+    return tree
+
+
+def legacy_scan(backend, hkey, path, matcher, depth=0, max_depth=2):
+    """The recursive scan the index replaces: every key down to max_depth is opened."""
+    if depth > max_depth:
+        return []
+    found = []
+    try:
+        with backend.open_key(hkey, path) as key:
+            if matcher.match(path.split("\\")[-1]):
+                return [f"{hkey}\\{path}"]
+            for i in range(backend.query_info_key(key)[0]):
+                try:
+                    found.extend(legacy_scan(backend, hkey, f"{path}\\{backend.enum_key(key, i)}", matcher,
+                                             depth + 1, max_depth))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return found
+
+
+def pruned(key_path):
+    """Whether a key lies inside a subtree the index does not enumerate."""
+    lowered = key_path.lower()
+    # Relative to the deepest root: Software\Classes is pruned below Software only
+    prefixes = [f"{hive}\\{root}\\".lower() for hive, root in DEEP_SCAN_ROOTS]
+    prefix = max((prefix for prefix in prefixes if lowered.startswith(prefix)), key=len)
+    relative = lowered[len(prefix):]
+    return any(relative.startswith(skipped.lower() + "\\") for skipped in DEFAULT_DEEP_SCAN_PRUNE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--clsids", type=int, default=30000)
+    parser.add_argument("--vendors", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every registry call")
+    args = parser.parse_args()
+
+    names = app_names(max(args.apps))
+    tree = make_registry(names, args.vendors, args.clsids)
+    print(f"{'apps':>5} {'legacy (s)':>11} {'opened':>8} {'calls':>9} {'index (s)':>10} {'opened':>7} "
+          f"{'calls':>7} {'keys indexed':>13} {'matches':>8}")
+    for count in args.apps:
+        apps = names[:count]
+        times = {}
+
+        backend = CountingBackend(tree, args.latency)
+        legacy = {}
+        with timed("legacy", times):
+            for app in apps:
+                matcher = NameMatcher([app])
+                found = []
+                for hkey, path in DEEP_SCAN_ROOTS:
+                    found.extend(legacy_scan(backend, hkey, path, matcher))
+                legacy[app] = set(found)
+        legacy_opened, legacy_calls = backend.opened, backend.calls
+
+        backend = CountingBackend(tree, args.latency)
+        with timed("index", times):
+            index = RegistryKeyIndex.build(backend)
+            index.prime(NameMatcher(apps))
+            indexed = {app: set(index.find(app)) for app in apps}
+        assert index.handles_opened == backend.opened
+
+        for app in apps:
+            expected = {key for key in legacy[app] if not pruned(key)}
+            assert indexed[app] == expected, (app, indexed[app] ^ expected)
+        matches = sum(len(found) for found in indexed.values())
+        print(f"{count:>5} {times['legacy']:>11.3f} {legacy_opened:>8} {legacy_calls:>9} {times['index']:>10.3f} "
+              f"{backend.opened:>7} {backend.calls:>7} {len(index):>13} {matches:>8}")
+
+    # Plan, then apply, as a thorough uninstall of the first application does
+    backend = CountingBackend(tree)
+    for dry_run in (True, False):
+        app = AppUninstaller(names[0], thorough=True, dry_run=dry_run, backup=False,
+                             registry=RegistrySnapshot(backend), scan_index=ScanIndex([]))
+        results = app.uninstall()
+        plan = results["registry_cleanup_plan"]
+        assert plan and results["registry_keys_applied"] == len(plan), results
+        remaining = 0
+        for entry in plan:
+            try:
+                backend.open_key(entry["hive"], entry["path"]).Close()
+                remaining += 1
+            except FileNotFoundError:
+                pass
+        assert remaining == (len(plan) if dry_run else 0), (dry_run, remaining)
+        print(f"{'dry run' if dry_run else 'uninstall'} of {names[0]}: {len(plan)} keys planned in "
+              f"{results['registry_plan_seconds']:.3f}s, {results['registry_keys_applied']} applied in "
+              f"{results['registry_apply_seconds']:.3f}s, {remaining} left")
+
+
+if __name__ == "__main__":
+    main()
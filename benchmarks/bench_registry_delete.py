@@ -0,0 +1,85 @@
+"""One `reg delete` process per key vs. the in-process RegistryDeleter batch.
+
+The subprocess side starts a trivial Python process per key as a stand-in for
+`cmd.exe` + `reg.exe` (process creation is the cost being removed), then
+deletes the key from the in-memory tree. The in-memory backend refuses to
+delete keys that still have subkeys, so a clean run also checks the
+bottom-up order.
+
+Usage: python benchmarks/bench_registry_delete.py [--keys 50 200] [--depth 3] [--fanout 3] [--spawn-limit 100]
+"""
+import argparse
+import subprocess
+import sys
+
+from common import timed
+
+from uninstaller import MemoryRegistryBackend, RegistryDeleter
+
+
+def make_tree(keys: int, depth: int, fanout: int) -> dict:
+    def subtree(level):
+        node = {"@values": {"Level": level}}
+        if level < depth:
+            for i in range(fanout):
+                node[f"Sub{i}"] = subtree(level + 1)
+        return node
+
+    software = {f"Vendor{i % 10}": {} for i in range(10)}
+    for i in range(keys):
+        software[f"Vendor{i % 10}"][f"App{i}"] = subtree(1)
+    software["Keep"] = subtree(1)
+    return {"HKEY_CURRENT_USER": {"Software": software}, "HKEY_LOCAL_MACHINE": {"Software": {}}}
+
+
+def key_paths(keys: int):
+    return [f"HKEY_CURRENT_USER\\Software\\Vendor{i % 10}\\App{i}" for i in range(keys)]
+
+
+def check(backend, paths, outcomes):
+    assert all(error is None for error in outcomes.values()), "deletion failed"
+    for path in paths:
+        hive, _, sub_key = path.partition("\\")
+        try:
+            backend.open_key(hive, sub_key).Close()
+        except FileNotFoundError:
+            continue
+        raise AssertionError(f"{path} still exists")
+    backend.open_key("HKEY_CURRENT_USER", "Software\\Keep").Close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--spawn-limit", type=int, default=100,
+                        help="Largest batch timed with one process per key")
+    args = parser.parse_args()
+
+    print(f"{'keys':>6} {'subkeys':>8} {'per-key process (s)':>20} {'batch (s)':>10} {'calls':>7}")
+    for keys in args.keys:
+        paths = key_paths(keys)
+        times = {}
+
+        spawn = "-"
+        if keys <= args.spawn_limit:
+            backend = MemoryRegistryBackend(make_tree(keys, args.depth, args.fanout))
+            outcomes = {}
+            with timed("spawn", times):
+                for path in paths:
+                    subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+                    outcomes.update(RegistryDeleter(backend).delete([path]))
+            check(backend, paths, outcomes)
+            spawn = f"{times['spawn']:.3f}"
+
+        backend = MemoryRegistryBackend(make_tree(keys, args.depth, args.fanout))
+        deleter = RegistryDeleter(backend)
+        with timed("batch", times):
+            outcomes = deleter.delete(paths)
+        check(backend, paths, outcomes)
+        print(f"{keys:>6} {deleter.keys_deleted:>8} {spawn:>20} {times['batch']:>10.4f} {backend.calls:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""One `reg export` process per key vs. the in-process RegistryBackupFile.
+
+The subprocess side starts a trivial Python process per key as a stand-in for
+`cmd.exe` + `reg.exe` and writes one .reg file per key; the in-process side
+appends every key to one consolidated file. The consolidated backup is then
+restored into an empty in-memory registry, as a whole and key by key through
+the offset index, and compared with the original tree.
+
+Usage: python benchmarks/bench_registry_export.py [--keys 50 200] [--depth 3] [--fanout 3] [--spawn-limit 100]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import timed
+
+from uninstaller import (REG_BINARY, REG_EXPAND_SZ, REG_MULTI_SZ, REG_QWORD, MemoryRegistryBackend,
+                         RegistryBackupFile)
+
+
+def make_tree(keys: int, depth: int, fanout: int) -> dict:
+    def subtree(level, i):
+        node = {"@values": {
+            "": f"Default {i}",
+            "DisplayName": f'App "{i}" in C:\\Program Files\\App{i}\\',
+            "Level": level,
+            "Paths": ["C:\\One", "D:\\Two", f"Level {level}"],
+            "Expand": ["%ProgramFiles%\\App", REG_EXPAND_SZ],
+            "Notes": "line one\r\nline two",
+        }}
+        if level < depth:
+            for j in range(fanout):
+                node[f"Sub{j}"] = subtree(level + 1, i)
+        return node
+
+    software = {f"App{i}": subtree(1, i) for i in range(keys)}
+    return {"HKEY_CURRENT_USER": {"Software": software}}
+
+
+def add_binary(backend, keys):
+    """Add the value types the JSON fixture format cannot express."""
+    for i in range(keys):
+        with backend.open_key("HKEY_CURRENT_USER", f"Software\\App{i}") as key:
+            backend.set_value(key, "Blob", REG_BINARY, bytes(range(i % 7, 120)))
+            backend.set_value(key, "Size", REG_QWORD, 2 ** 40 + i)
+
+
+def dump(backend, hive, sub_key):
+    """Return a key and its subkeys as nested tuples, for comparison."""
+    with backend.open_key(hive, sub_key) as key:
+        node = key.node
+        return (node["name"], sorted(node["values"].items()),
+                sorted(dump(backend, hive, f"{sub_key}\\{child['name']}") for child in node["keys"].values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--spawn-limit", type=int, default=100,
+                        help="Largest batch timed with one process per key")
+    args = parser.parse_args()
+
+    print(f"{'keys':>6} {'exported':>9} {'per-key process (s)':>20} {'files':>6} {'in-process (s)':>15} "
+          f"{'size (KB)':>10} {'restore (s)':>12}")
+    for keys in args.keys:
+        backend = MemoryRegistryBackend(make_tree(keys, args.depth, args.fanout))
+        add_binary(backend, keys)
+        paths = [f"HKEY_CURRENT_USER\\Software\\App{i}" for i in range(keys)]
+        times = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            spawn = files = "-"
+            if keys <= args.spawn_limit:
+                with timed("spawn", times):
+                    for i, path in enumerate(paths):
+                        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+                        RegistryBackupFile(Path(tmp, "per-key", f"{i}.reg"), backend).export(path)
+                spawn = f"{times['spawn']:.3f}"
+                files = len(list(Path(tmp, "per-key").glob("*.reg")))
+
+            backup = RegistryBackupFile(Path(tmp, "registry.reg"), backend)
+            with timed("export", times):
+                exported = sum(backup.export(path) for path in paths)
+            size = backup.path.stat().st_size
+
+            restored = MemoryRegistryBackend()
+            with timed("restore", times):
+                backup.restore(backend=restored)
+            for path in paths:
+                sub_key = path.split("\\", 1)[1]
+                assert dump(restored, "HKEY_CURRENT_USER", sub_key) == dump(backend, "HKEY_CURRENT_USER", sub_key), \
+                    f"{path} differs after restore"
+
+            # Single keys through the index
+            for path in (paths[0], paths[-1] + "\\Sub0"):
+                single = MemoryRegistryBackend()
+                backup.restore(path, backend=single)
+                sub_key = path.split("\\", 1)[1]
+                assert dump(single, "HKEY_CURRENT_USER", sub_key) == dump(backend, "HKEY_CURRENT_USER", sub_key), \
+                    f"{path} differs after single-key restore"
+                assert len(single.hives["HKEY_CURRENT_USER"]["keys"]["software"]["keys"]) == 1
+
+        print(f"{keys:>6} {exported:>9} {spawn:>20} {files:>6} {times['export']:>15.4f} "
+              f"{size / 1024:>10.1f} {times['restore']:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
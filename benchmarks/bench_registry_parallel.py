@@ -0,0 +1,50 @@
+"""Sequential vs. concurrent enumeration of the registry roots.
+
+Every backend call sleeps for --latency-ms to model a slow registry (remote
+hives, roaming profiles, antivirus hooks); the four Uninstall keys and the
+four thorough-scan roots are then read with 1 and with N workers.
+
+Usage: python benchmarks/bench_registry_parallel.py [--entries 2000] [--vendors 100] [--workers 1 2 4] [--latency-ms 0.2]
+"""
+import argparse
+import logging
+
+from common import app_names, make_registry_tree, timed
+
+from uninstaller import AppUninstaller, MemoryRegistryBackend, RegistrySnapshot, ScanIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--vendors", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.getLogger("uninstaller").setLevel(logging.WARNING)  # Keep dry-run messages out of the table
+
+    names = app_names(10)
+    backend = MemoryRegistryBackend(make_registry_tree(names, args.entries, vendors=args.vendors),
+                                    latency=args.latency_ms / 1000)
+
+    print(f"{'workers':>7} {'snapshot (s)':>13} {'deep scan (s)':>14} {'keys':>5} {'calls':>9}")
+    expected = None
+    for workers in args.workers:
+        times = {}
+        backend.calls = 0
+        with timed("snapshot", times):
+            snapshot = RegistrySnapshot(backend, workers=workers).load()
+        uninstaller = AppUninstaller(names[0], thorough=True, dry_run=True, backup=False,
+                                     registry=snapshot, scan_index=ScanIndex([]))
+        with timed("deep", times):
+            found = uninstaller.clean_registry()
+
+        result = ([e["Registry"] for e in snapshot.entries], found)
+        if expected is None:
+            expected = result
+        assert result == expected, "results differ"
+        print(f"{workers:>7} {times['snapshot']:>13.3f} {times['deep']:>14.3f} {found:>5} {backend.calls:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Per-application registry walks vs. one RegistrySnapshot for a batch.
+
+The "legacy" functions reproduce the previous lookups (one QueryValueEx per
+value, and a full walk of the Uninstall keys for every application) on top
+of the same in-memory backend, so both sides pay the same per-call cost.
+
+Usage: python benchmarks/bench_registry_snapshot.py [--entries 2000] [--apps 1 10 40] [--fixture registry.json]
+"""
+import argparse
+
+from common import app_names, make_registry_tree, timed
+
+from uninstaller import (UNINSTALL_HIVES, UNINSTALL_KEY_PATHS, AppUninstaller, MemoryRegistryBackend,
+                         RegistrySnapshot, ScanIndex, get_installed_applications)
+
+
+def legacy_walk(backend, app_name=None):
+    found = []
+    for hive in UNINSTALL_HIVES:
+        for reg_path in UNINSTALL_KEY_PATHS:
+            try:
+                with backend.open_key(hive, reg_path) as key:
+                    for i in range(backend.query_info_key(key)[0]):
+                        subkey_name = backend.enum_key(key, i)
+                        with backend.open_key(key, subkey_name) as subkey:
+                            try:
+                                display_name = backend.query_value(subkey, "DisplayName")[0]
+                            except OSError:
+                                continue
+                            if app_name is not None and app_name.lower() not in display_name.lower():
+                                continue
+                            entry = {"DisplayName": display_name}
+                            for value_name in ["UninstallString", "InstallLocation", "Publisher", "DisplayVersion"]:
+                                try:
+                                    entry[value_name] = backend.query_value(subkey, value_name)[0]
+                                except OSError:
+                                    pass
+                            found.append(entry)
+            except OSError:
+                continue
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--apps", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--fixture", help="JSON registry fixture to use instead of a generated one")
+    args = parser.parse_args()
+
+    names = app_names(max(args.apps))
+    if args.fixture:
+        backend = MemoryRegistryBackend.from_json(args.fixture)
+    else:
+        backend = MemoryRegistryBackend(make_registry_tree(names, args.entries))
+
+    print(f"{'apps':>5} {'legacy (s)':>11} {'calls':>9} {'snapshot (s)':>13} {'calls':>9}")
+    for count in args.apps:
+        batch = names[:count]
+        times = {}
+        backend.calls = 0
+        with timed("legacy", times):
+            legacy_walk(backend)
+            expected = [legacy_walk(backend, name) for name in batch]
+        legacy_calls = backend.calls
+
+        backend.calls = 0
+        with timed("snapshot", times):
+            snapshot = RegistrySnapshot(backend).load()
+            get_installed_applications(snapshot)
+            no_folders = ScanIndex([])
+            actual = [AppUninstaller(name, registry=snapshot, scan_index=no_folders).find_uninstall_string()
+                      for name in batch]
+        snapshot_calls = backend.calls
+
+        for old, new in zip(expected, actual):
+            assert [e["DisplayName"] for e in old] == [e["DisplayName"] for e in new], "results differ"
+        print(f"{count:>5} {times['legacy']:>11.3f} {legacy_calls:>9} {times['snapshot']:>13.3f} {snapshot_calls:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Cold vs. warm scan with the persistent ScanCache.
+
+The --latency-ms option adds a sleep to every real directory listing to
+model slow disks (a cache hit only costs one stat). The warm run must reuse
+every folder, with any number of workers.
+
+Usage: python benchmarks/bench_scan_cache.py [--entries 500000] [--workers 1] [--latency-ms 0]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from common import app_names, make_tree, timed
+
+import uninstaller
+from uninstaller import ScanCache, ScanIndex
+
+
+def snapshot(index):
+    return index._names, list(index._parents), bytes(index._flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.latency_ms:
+        scan_directory = uninstaller.scan_directory
+
+        def slow_scan_directory(path):
+            time.sleep(args.latency_ms / 1000)
+            return scan_directory(path)
+
+        uninstaller.scan_directory = slow_scan_directory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.entries} entries...")
+        roots = make_tree(Path(tmp) / "tree", args.entries, app_names(10))
+        # Directories touched in the last two seconds are never cached
+        past = time.time() - 60
+        folders = 0
+        for root in roots:
+            for dirpath, _, _ in os.walk(root):
+                os.utime(dirpath, (past, past))
+                folders += 1
+        cache_path = Path(tmp) / "scan_cache.bin"
+
+        times = {}
+        with timed("no cache", times):
+            expected = snapshot(ScanIndex.build(roots, workers=args.workers))
+        with timed("cold", times):
+            cache = ScanCache.load(cache_path)
+            cold = snapshot(ScanIndex.build(roots, workers=args.workers, cache=cache))
+            cache.save()
+        with timed("warm", times):
+            cache = ScanCache.load(cache_path)
+            warm = snapshot(ScanIndex.build(roots, workers=args.workers, cache=cache))
+            cache.save()
+        assert cold == expected and warm == expected, "cached scan differs"
+        # Every folder is listed once per run, whatever thread counts it
+        assert (cache.hits, cache.misses) == (folders, 0), (cache.hits, cache.misses, folders)
+        print(f"cache file: {cache_path.stat().st_size / 1024 / 1024:.1f} MB, "
+              f"{cache.hits} folders reused, {cache.misses} rescanned on the warm run")
+        for label in ("no cache", "cold", "warm"):
+            print(f"{label:>9}: {times[label]:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-application rglob crawl vs. one shared ScanIndex walk.
+
+Usage: python benchmarks/bench_scan_index.py [--entries 1000000] [--apps 1 10 50]
+"""
+import argparse
+import re
+import tempfile
+from pathlib import Path
+
+from common import app_names, make_tree, timed
+
+from uninstaller import NameMatcher, ScanIndex
+
+
+def rglob_scan(roots, app_name):
+    """The original find_app_directories + find_app_files crawl for one app."""
+    pattern = re.compile(rf"{re.escape(app_name)}", re.IGNORECASE)
+    dirs, files = [], []
+    for location in roots:
+        for path in location.glob("*"):
+            if pattern.search(path.name) and path.is_dir():
+                dirs.append(path)
+        for path in location.rglob("*"):
+            if pattern.search(path.name) and path.is_file():
+                files.append(path)
+    return dirs, files
+
+
+def index_scan(index, app_name):
+    return (index.find(app_name, ScanIndex.DIR, max_depth=1),
+            index.find(app_name, ScanIndex.FILE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--apps", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    names = app_names(max(args.apps))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.entries} entries...")
+        roots = make_tree(Path(tmp), args.entries, names)
+
+        print(f"{'apps':>5} {'rglob (s)':>12} {'index (s)':>12} {'speedup':>9}")
+        for count in args.apps:
+            batch = names[:count]
+            times = {}
+            with timed("rglob", times):
+                expected = [rglob_scan(roots, name) for name in batch]
+            with timed("index", times):
+                index = ScanIndex.build(roots)
+                index.prime(NameMatcher(batch))
+                actual = [index_scan(index, name) for name in batch]
+            for (d1, f1), (d2, f2) in zip(expected, actual):
+                assert sorted(d1) == sorted(d2) and sorted(f1) == sorted(f2), "results differ"
+            print(f"{count:>5} {times['rglob']:>12.3f} {times['index']:>12.3f} "
+                  f"{times['rglob'] / times['index']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Sequential vs. concurrent batch uninstalls with fake uninstallers.
+
+Each fake claims a few paths of a fake filesystem (some applications share
+a folder, some names contain others), "runs" its official uninstaller for
+--official-ms under OFFICIAL_UNINSTALLER_LOCK, like AppUninstaller does, and
+then spends --cleanup-ms on its cleanup. While running, the fakes check
+that no other running application holds an overlapping claim and that only
+one official uninstaller runs at a time; with one job no claims may be
+collected. A real AppUninstaller in thorough mode must also claim the
+registry keys its deep scan will delete.
+
+Usage: python benchmarks/bench_scheduler.py [--apps 40] [--jobs 1 4 8] [--official-ms 20] [--cleanup-ms 100]
+"""
+import argparse
+import random
+import threading
+import time
+
+from common import make_registry_tree, timed
+
+from uninstaller import (OFFICIAL_UNINSTALLER_LOCK, AppUninstaller, MemoryRegistryBackend, RegistryKeyIndex,
+                         RegistrySnapshot, UninstallScheduler)
+
+
+class Tracker:
+    """Claims of the running fakes, and the number of official uninstallers running."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.official = 0
+        self.max_official = 0
+        self.max_running = 0
+
+    def start(self, name, claims):
+        parts = [UninstallScheduler._claim_parts(claim) for claim in claims]
+        with self.lock:
+            for other, other_parts in self.active.items():
+                for a in parts:
+                    for b in other_parts:
+                        shorter = min(len(a), len(b))
+                        assert a[:shorter] != b[:shorter], f"{name} and {other} overlap on {a} / {b}"
+            self.active[name] = parts
+            self.max_running = max(self.max_running, len(self.active))
+
+    def stop(self, name):
+        with self.lock:
+            del self.active[name]
+
+
+class FakeUninstaller:
+    def __init__(self, app_name, claims, tracker, official, cleanup):
+        self.app_name = app_name
+        self.claims = claims
+        self.tracker = tracker
+        self.official = official
+        self.cleanup = cleanup
+        self.claimed = 0
+
+    def claimed_paths(self):
+        self.claimed += 1
+        return self.claims
+
+    def uninstall(self):
+        with OFFICIAL_UNINSTALLER_LOCK:
+            self.tracker.official += 1
+            self.tracker.max_official = max(self.tracker.max_official, self.tracker.official)
+            time.sleep(self.official)
+            self.tracker.official -= 1
+        self.tracker.start(self.app_name, self.claims)
+        time.sleep(self.cleanup)
+        self.tracker.stop(self.app_name)
+        return {"registry_entries_removed": 1, "directories_removed": len(self.claims) - 1,
+                "files_removed": 0, "uninstaller_executed": True}
+
+    def generate_report(self, results):
+        return f"{self.app_name}: {results}"
+
+
+def make_fakes(apps, tracker, official, cleanup, seed=1):
+    rng = random.Random(seed)
+    fakes = []
+    for i in range(apps):
+        name = f"App{i:03d}"
+        if i % 10 == 9:
+            name = f"{fakes[-1].app_name} Helper"  # Name contains the previous one
+        claims = [f"HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\{name}",
+                  f"C:\\Program Files\\{name}",
+                  f"C:\\Users\\bench\\AppData\\Local\\{name}"]
+        if rng.random() < 0.2:
+            claims.append("C:\\Program Files\\Common Files\\SharedRuntime")
+        fakes.append(FakeUninstaller(name, claims, tracker, official, cleanup))
+    return fakes
+
+
+def check_registry_claims() -> None:
+    """The thorough claims include the keys of the deep registry scan."""
+    apps = ["Alpha Editor", "Beta Player"]
+    registry = RegistrySnapshot(MemoryRegistryBackend(make_registry_tree(apps, entries=50, vendors=200))).load()
+    registry_index = RegistryKeyIndex.build(registry.backend)
+    for app in apps:
+        u = AppUninstaller(app, thorough=True, dry_run=True, registry=registry, registry_index=registry_index)
+        u.find_app_directories = u.find_app_files = lambda: []  # Registry only
+        keys = [f"{entry['hive']}\\{entry['path']}" for entry in u.plan_registry_cleanup()]
+        assert keys, f"no deep-scan keys for {app}"
+        assert set(keys) <= set(u.claimed_paths()), f"deep-scan keys of {app} are not claimed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=40)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--official-ms", type=float, default=20)
+    parser.add_argument("--cleanup-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    print(f"{'jobs':>5} {'ordered pairs':>14} {'time (s)':>9} {'max running':>12} {'max official':>13}")
+    for jobs in args.jobs:
+        tracker = Tracker()
+        fakes = make_fakes(args.apps, tracker, args.official_ms / 1000, args.cleanup_ms / 1000)
+        scheduler = UninstallScheduler(fakes, jobs=jobs)
+        times = {}
+        with timed("run", times):
+            outcomes = list(scheduler.run())
+        assert all(error is None for _, _, error in outcomes), "an uninstall failed"
+        assert len(outcomes) == args.apps and tracker.max_official == 1
+        assert all(fake.claimed == (jobs > 1) for fake in fakes), "claims collected for a single job"
+        print(f"{jobs:>5} {sum(map(len, scheduler.waits_for or [])):>14} {times['run']:>9.3f} {tracker.max_running:>12} "
+              f"{tracker.max_official:>13}")
+    check_registry_claims()
+    print()
+    print(scheduler.generate_report())
+
+
+if __name__ == "__main__":
+    main()
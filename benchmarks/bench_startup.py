@@ -0,0 +1,77 @@
+"""Cold-start budget for the --list-only path, measured with -X importtime.
+
+Each run starts a fresh interpreter that imports uninstaller.py and lists the
+applications of an empty in-memory registry. The script fails (exit code 1)
+when the median import time of the module exceeds --budget-ms, or when the
+list-only path loads one of the modules that are meant to be imported lazily.
+The budget depends on the machine; set it from a few runs on the machine that
+checks it.
+
+Usage: python benchmarks/bench_startup.py [--runs 15] [--budget-ms 80]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import REPO_ROOT
+
+# Modules the list-only path must not import
+DEFERRED = ["shutil", "subprocess", "ctypes", "json", "argparse", "hashlib"]
+
+LIST_ONLY = f"""
+import sys
+import uninstaller
+uninstaller.list_installed_applications(uninstaller.RegistrySnapshot(uninstaller.MemoryRegistryBackend()))
+loaded = [name for name in {DEFERRED!r} if name in sys.modules]
+print("LOADED", ",".join(loaded), file=sys.stderr)
+"""
+
+
+def run_once(workdir: str):
+    """Return (import time of uninstaller in ms, deferred modules that were loaded)."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", LIST_ONLY],
+                            cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    import_ms, loaded = None, []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.rstrip().endswith("| uninstaller"):
+            import_ms = int(line.split("|")[1]) / 1000
+        elif line.startswith("LOADED"):
+            loaded = [name for name in line[len("LOADED"):].strip().split(",") if name]
+    return import_ms, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    # Time the cached bytecode, as every run after the first one does
+    subprocess.run([sys.executable, "-m", "py_compile", str(REPO_ROOT / "uninstaller.py")], check=True)
+
+    times, loaded = [], set()
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            import_ms, run_loaded = run_once(workdir)
+            times.append(import_ms)
+            loaded.update(run_loaded)
+
+    median = statistics.median(times)
+    print(f"import uninstaller: median {median:.1f} ms, min {min(times):.1f} ms, "
+          f"max {max(times):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAIL: startup exceeds the budget by {median - args.budget_ms:.1f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: the list-only path imported {', '.join(sorted(loaded))}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Streaming removal vs. the batch path: same plan, same counters, same result.
+
+Each case builds the same synthetic Windows layout and registry (vendor keys
+included, for the thorough registry scan) and uninstalls --apps applications
+in thorough mode, once with AppUninstaller.streaming on and once off, with
+and without a shared ScanIndex. In dry-run mode the "DRY RUN: Would ..."
+log lines (deletions, backups and registry keys) and the results of both
+paths must be identical; for real removals (on a fresh copy of the layout
+each) the results and the files left on disk must be. The script prints the
+time of every run.
+
+Usage: python benchmarks/bench_streaming.py [--apps 3] [--entries 20000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from common import app_names, make_registry_tree, make_windows_layout, redirect_backups, windows_environment
+
+import uninstaller
+from uninstaller import AppUninstaller, MemoryRegistryBackend, RegistrySnapshot, ScanIndex, get_common_data_locations
+
+
+class DryRunLog(logging.Handler):
+    """Collects the "DRY RUN:" messages of the uninstaller."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.lines = Counter()
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("DRY RUN:"):
+            self.lines[message] += 1
+
+
+def comparable(results):
+    """The results without timings, which differ between runs."""
+    return {key: value for key, value in results.items() if not key.endswith("_seconds")}
+
+
+def run(tmp: Path, apps, entries: int, streaming: bool, indexed: bool, dry_run: bool):
+    """Uninstall apps from a fresh layout; returns (dry-run lines, results per app, files left, seconds)."""
+    root = Path(tempfile.mkdtemp(dir=tmp))
+    tree = make_registry_tree(apps, entries=300, vendors=100)
+    env = make_windows_layout(root / "C", apps, entries, match_rate=0.02)
+    log = DryRunLog()
+    logger = logging.getLogger("uninstaller")
+    logger.addHandler(log)
+    try:
+        with windows_environment(env):
+            registry = RegistrySnapshot(MemoryRegistryBackend(tree)).load()
+            scan_index = ScanIndex.build(get_common_data_locations()) if indexed else None
+            results = {}
+            start = time.perf_counter()
+            for app in apps:
+                u = AppUninstaller(app, thorough=True, dry_run=dry_run, backup=dry_run, registry=registry,
+                                   scan_index=scan_index)
+                u.streaming = streaming
+                # The same backup folder in both runs, so the dry-run lines can be compared
+                redirect_backups(u, root.parent / "backups" / app)
+                results[app] = comparable(u.uninstall())
+            seconds = time.perf_counter() - start
+    finally:
+        logger.removeHandler(log)
+    left = sorted(os.path.relpath(os.path.join(path, name), root)
+                  for path, dirs, files in os.walk(root) for name in dirs + files)
+    lines = Counter({line.replace(str(root), "<root>"): count for line, count in log.lines.items()})
+    return lines, results, left, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=3)
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+    logging.getLogger("uninstaller").setLevel(logging.INFO)
+    logging.getLogger("uninstaller").propagate = False  # Keep the console quiet
+    uninstaller.PROFILER = uninstaller.NullProfiler()
+    apps = app_names(args.apps)
+
+    print(f"{'mode':<10} {'index':<8} {'streaming (s)':>14} {'batch (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dry_run in (True, False):
+            for indexed in (True, False):
+                streamed = run(Path(tmp), apps, args.entries, True, indexed, dry_run)
+                batched = run(Path(tmp), apps, args.entries, False, indexed, dry_run)
+                case = f"{'dry run' if dry_run else 'removal'}, {'indexed' if indexed else 'walked'}"
+                assert streamed[1] == batched[1], f"{case}: results differ"
+                if dry_run:
+                    assert streamed[0] == batched[0], \
+                        f"{case}: dry-run output differs: {(streamed[0] - batched[0]) + (batched[0] - streamed[0])}"
+                    deletions = [line for line in streamed[0] if "Would remove" in line or "Would delete" in line]
+                    assert any("Would remove directory" in line for line in deletions), case
+                    assert any("Would delete registry key (deep scan)" in line for line in deletions), case
+                else:
+                    assert streamed[2] == batched[2], f"{case}: different files left on disk"
+                    assert sum(r["directories_removed"] for r in streamed[1].values()) >= 2 * len(apps), case
+                print(f"{'dry run' if dry_run else 'removal':<10} {'yes' if indexed else 'no':<8} "
+                      f"{streamed[3]:>14.3f} {batched[3]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
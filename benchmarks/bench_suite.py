@@ -0,0 +1,195 @@
+"""Hot paths of an uninstall at several scales, stored per commit.
+
+Each scale builds a synthetic Windows layout (see make_windows_layout) and a
+matching in-memory registry with Uninstall entries and Software/Classes
+vendor keys, points the environment at the layout, and times:
+
+  get_installed_applications   load the Uninstall keys and build the list
+  find_app_directories         per app, without and with the shared ScanIndex
+  find_app_files               per app, without and with the shared ScanIndex
+  _scan_registry_recursively   per app, under HKLM\\SOFTWARE
+  remove_registry_entries      with a .reg backup
+  remove_directories           with a copy backup
+  remove_files                 with a copy backup
+
+The read-only cases keep the median of --repeat runs; the removals run once
+at the end. Results are written to benchmarks/results/<commit>.json and
+compared with the previous results file (or --baseline); with --check the
+script exits with 1 when a case got slower than --threshold times the
+baseline (and by more than a few milliseconds). Timings depend on the machine, so only compare results from the
+same machine.
+
+Usage: python benchmarks/bench_suite.py [--scales small medium] [--repeat 3] [--baseline PATH] [--check]
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import REPO_ROOT, app_names, make_registry_tree, make_windows_layout, redirect_backups, windows_environment
+
+from uninstaller import (AppUninstaller, MemoryRegistryBackend, NameMatcher, RegistrySnapshot, ScanIndex,
+                         get_common_data_locations, get_installed_applications)
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# apps, filesystem entries, Uninstall entries, vendor keys per Software/Classes key
+SCALES = {
+    "small": dict(apps=20, entries=5000, registry=500, vendors=100),
+    "medium": dict(apps=100, entries=50000, registry=2000, vendors=500),
+    "large": dict(apps=300, entries=200000, registry=5000, vendors=2000),
+}
+
+# Applications looked up per case
+TARGETS = 3
+
+# A case only counts as a regression when it also got slower by this many seconds
+NOISE_FLOOR = 0.005
+
+
+def median_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_scale(scale: dict, repeat: int) -> dict:
+    """Build the fixture of one scale and return {case: seconds}."""
+    apps = app_names(scale["apps"])
+    targets = apps[:TARGETS]
+    tree = make_registry_tree(apps, entries=scale["registry"], vendors=scale["vendors"])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_windows_layout(Path(tmp, "C"), apps, scale["entries"])
+        with windows_environment(env):
+            locations = get_common_data_locations()
+            assert all(location.is_dir() for location in locations), locations
+
+            def snapshot():
+                return RegistrySnapshot(MemoryRegistryBackend(tree))
+
+            installed = []
+            results["get_installed_applications"] = median_time(
+                lambda: installed.append(get_installed_applications(snapshot())), repeat)
+            assert len(installed[-1]) == scale["registry"], len(installed[-1])
+
+            registry = snapshot().load()
+            walked = {app: AppUninstaller(app, registry=registry) for app in targets}
+            dirs = {}
+            results["find_app_directories"] = median_time(
+                lambda: dirs.update((app, u.find_app_directories()) for app, u in walked.items()), repeat)
+            files = {}
+            results["find_app_files"] = median_time(
+                lambda: files.update((app, u.find_app_files()) for app, u in walked.items()), repeat)
+
+            index = []
+            results["ScanIndex.build"] = median_time(lambda: index.append(ScanIndex.build(locations)), repeat)
+            indexed = {app: AppUninstaller(app, registry=registry, scan_index=index[-1]) for app in targets}
+            results["find_app_directories (indexed)"] = median_time(
+                lambda: [u.find_app_directories() for u in indexed.values()], repeat)
+            results["find_app_files (indexed)"] = median_time(
+                lambda: [u.find_app_files() for u in indexed.values()], repeat)
+            for app, u in indexed.items():
+                assert sorted(u.find_app_directories()) == sorted(dirs[app]), app
+                assert sorted(u.find_app_files()) == sorted(files[app]), app
+                assert len(dirs[app]) >= 2, (app, dirs[app])  # Install and AppData folders
+
+            keys = {}
+            results["_scan_registry_recursively"] = median_time(
+                lambda: keys.update((app, u._scan_registry_recursively("HKEY_LOCAL_MACHINE", "SOFTWARE",
+                                                                       NameMatcher([app])))
+                                    for app, u in walked.items()), repeat)
+
+            # The removals change the fixture, so they run once, with backups
+            removers = {app: AppUninstaller(app, registry=registry, scan_index=index[-1]) for app in targets}
+            for app, u in removers.items():
+                redirect_backups(u, Path(tmp, "backups", app))
+            start = time.perf_counter()
+            removed = sum(u.remove_registry_entries(registry.find(app)) for app, u in removers.items())
+            results["remove_registry_entries"] = time.perf_counter() - start
+            assert removed == len(targets), removed
+            start = time.perf_counter()
+            removed = sum(u.remove_directories(dirs[app]) for app, u in removers.items())
+            results["remove_directories"] = time.perf_counter() - start
+            assert all(not path.exists() for app in targets for path in dirs[app])
+            start = time.perf_counter()
+            removed = sum(u.remove_files([path for path in files[app] if path.exists()])
+                          for app, u in removers.items())
+            results["remove_files"] = time.perf_counter() - start
+            assert all(not path.exists() for app in targets for path in files[app])
+    return results
+
+
+def commit_id() -> str:
+    """Short hash of HEAD, with "-dirty" when the working tree has changes."""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{commit}-dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def previous_results(current: Path):
+    """The most recently written results file of another commit, else the last run of this one."""
+    others = [path for path in RESULTS_DIR.glob("*.json") if path != current]
+    return max(others, key=lambda path: path.stat().st_mtime, default=current if current.exists() else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, help="Results file to compare with (default: the previous one)")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--check", action="store_true", help="Exit with 1 when a case regressed")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # The removals log every deleted path
+
+    commit = commit_id()
+    output = RESULTS_DIR / f"{commit}.json"
+    baseline_path = args.baseline or previous_results(output)
+    baseline = json.loads(baseline_path.read_text())["scales"] if baseline_path else {}
+
+    measured = {name: run_scale(SCALES[name], args.repeat) for name in args.scales}
+
+    regressions = []
+    print(f"commit {commit}" + (f", compared with {baseline_path.name}" if baseline_path else ""))
+    for name, cases in measured.items():
+        print(f"\n{name}: {SCALES[name]}")
+        print(f"{'case':<32} {'seconds':>9} {'baseline':>9} {'ratio':>6}")
+        for case, seconds in cases.items():
+            before = baseline.get(name, {}).get(case)
+            line = f"{case:<32} {seconds:>9.4f}"
+            if before:
+                ratio = seconds / before
+                line += f" {before:>9.4f} {ratio:>6.2f}"
+                if ratio > args.threshold and seconds - before > NOISE_FLOOR:
+                    regressions.append(f"{name}/{case}")
+                    line += "  REGRESSION"
+            print(line)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scales": measured,
+    }, indent=2))
+    print(f"\nResults saved to {output}")
+    if regressions:
+        print(f"Slower than {args.threshold}x the baseline: {', '.join(regressions)}")
+    sys.exit(1 if args.check and regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
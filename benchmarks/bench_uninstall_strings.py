@@ -0,0 +1,207 @@
+"""Uninstall-string parsing: command-line tokenizer, installer detection and silent switches.
+
+Builds a corpus of uninstall strings in the shapes real installers write to
+the registry (MSI, NSIS, Inno Setup, InstallShield, WiX burn bundles,
+Squirrel, ClickOnce, QuietUninstallString), with quoted and unquoted paths
+and the product names of common applications, plus fixed strings with
+NSIS _?= folders, cmd /c wrappers and %SystemRoot% references. Every
+string is checked against the expected arguments and technology (and the
+fixed ones against the command line that is run), the tokenizer is checked
+against subprocess.list2cmdline on random arguments, and both are timed.
+The old split on '" ' is scored on the same corpus.
+
+Usage: python benchmarks/bench_uninstall_strings.py [--corpus 3000] [--rounds 5]
+"""
+import argparse
+import random
+import subprocess
+import time
+
+from common import windows_environment
+
+from uninstaller import SILENT_SWITCHES, build_uninstall_command, format_command_line, split_command_line
+
+PRODUCTS = [
+    "7-Zip", "Notepad++", "Git", "VLC media player", "Mozilla Firefox", "Discord", "Slack", "Zoom",
+    "Python 3.11.4 (64-bit)", "Adobe Acrobat Reader DC", "WinRAR", "Audacity", "GIMP 2.10", "Steam",
+    "Spotify", "KeePass Password Safe 2", "paint.net", "OBS Studio", "Inkscape", "PuTTY", "FileZilla Client",
+    "Visual Studio Code", "Node.js", "Docker Desktop", "TeamViewer", "Microsoft Teams", "GitHub Desktop",
+    "Postman", "Blender", "HandBrake", "qBittorrent", "LibreOffice 7.5", "Greenshot", "ShareX", "WinSCP",
+]
+USERS = ["alice", "bob", "Jean Dupont", "dev", "Administrator"]
+ENVIRONMENT = {"SystemRoot": "C:\\Windows", "ProgramFiles": "C:\\Program Files"}
+ISSETUP = "C:\\Program Files (x86)\\InstallShield Installation Information\\{9F1A2B3C-0000-0000-0000-4D5E6F708192}\\setup.exe"
+
+# Strings with their own quoting rules: (entry, expected argv, technology, command line that is run)
+FIXED = [
+    # NSIS reads the rest of the line after _?= as the install folder, so it stays last and unquoted
+    ({"UninstallString": '"C:\\Program Files\\x\\uninst.exe" _?=C:\\Program Files\\x'},
+     ["C:\\Program Files\\x\\uninst.exe", "/S", "_?=C:\\Program Files\\x"], "nsis",
+     '"C:\\Program Files\\x\\uninst.exe" /S _?=C:\\Program Files\\x'),
+    ({"UninstallString": "%ProgramFiles%\\x\\Uninstall.exe /S _?=%ProgramFiles%\\x"},
+     ["C:\\Program Files\\x\\Uninstall.exe", "/S", "_?=C:\\Program Files\\x"], "nsis",
+     '"C:\\Program Files\\x\\Uninstall.exe" /S _?=C:\\Program Files\\x'),
+    # rundll32 without the InstallShield Ctor.dll entry point gets no InstallShield switch
+    ({"UninstallString": f'%SystemRoot%\\System32\\rundll32.exe "{ISSETUP}" -runfromtemp'},
+     ["C:\\Windows\\System32\\rundll32.exe", ISSETUP, "-runfromtemp"], "unknown",
+     f'C:\\Windows\\System32\\rundll32.exe "{ISSETUP}" -runfromtemp'),
+    # cmd.exe strips the outer quotes of what follows /c itself
+    ({"UninstallString": 'cmd /c ""C:\\x y\\u.bat""'}, ["cmd", "/c", "C:\\x y\\u.bat"], "unknown",
+     'cmd /c ""C:\\x y\\u.bat""'),
+    ({"UninstallString": '%SystemRoot%\\System32\\cmd.exe /c ""C:\\x y\\u.bat" /remove "all users""'},
+     ["C:\\Windows\\System32\\cmd.exe", "/c", "C:\\x y\\u.bat", "/remove", "all users"], "unknown",
+     'C:\\Windows\\System32\\cmd.exe /c ""C:\\x y\\u.bat" /remove "all users""'),
+    ({"UninstallString": 'cmd.exe /c "C:\\x y\\u.bat"'}, ["cmd.exe", "/c", "C:\\x y\\u.bat"], "unknown",
+     'cmd.exe /c ""C:\\x y\\u.bat""'),
+    # REG_EXPAND_SZ program paths are expanded before they are split
+    ({"UninstallString": "%SystemRoot%\\System32\\msiexec.exe /x {9F1A2B3C-0000-0000-0000-4D5E6F708192}"},
+     ["C:\\Windows\\System32\\msiexec.exe", "/x", "{9F1A2B3C-0000-0000-0000-4D5E6F708192}", "/qn",
+      "/norestart"], "msi",
+     "C:\\Windows\\System32\\msiexec.exe /x {9F1A2B3C-0000-0000-0000-4D5E6F708192} /qn /norestart"),
+]
+
+
+def guid(rng):
+    return "{%08X-%04X-%04X-%04X-%012X}" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16),
+                                             rng.getrandbits(16), rng.getrandbits(48))
+
+
+def program_files(rng):
+    return rng.choice(["C:\\Program Files", "C:\\Program Files (x86)", "D:\\Program Files"])
+
+
+def make_entry(rng):
+    """Return (registry entry, expected argv, expected technology)."""
+    product = rng.choice(PRODUCTS)
+    folder = f"{program_files(rng)}\\{product}"
+    kind = rng.randrange(12)
+    if kind == 0:
+        code = guid(rng)
+        return {"UninstallString": f"MsiExec.exe /X{code}"}, ["MsiExec.exe", f"/X{code}", "/qn", "/norestart"], "msi"
+    if kind == 1:
+        # Many MSI products register /I, which only opens the maintenance dialog
+        code = guid(rng)
+        return ({"UninstallString": f"MsiExec.exe /I{code}"},
+                ["MsiExec.exe", f"/X{code}", "/qn", "/norestart"], "msi")
+    if kind == 2:
+        code = guid(rng)
+        return ({"UninstallString": f"msiexec.exe /x {code} /qb REBOOT=ReallySuppress"},
+                ["msiexec.exe", "/x", code, "/qb", "REBOOT=ReallySuppress", "/norestart"], "msi")
+    if kind == 3:
+        program = f"{folder}\\unins{rng.randrange(3):03d}.exe"
+        return ({"UninstallString": f'"{program}"', "Registry": f"HKEY_LOCAL_MACHINE\\...\\{product}_is1"},
+                [program, "/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART"], "inno")
+    if kind == 4:
+        program = f"{folder}\\{rng.choice(['uninstall.exe', 'uninst.exe', 'Uninstall.exe'])}"
+        quoted = rng.random() < 0.5
+        string = f'"{program}"' if quoted else program
+        return {"UninstallString": string}, [program, "/S"], "nsis"
+    if kind == 5:
+        program = f"C:\\Users\\{rng.choice(USERS)}\\AppData\\Local\\Programs\\{product}\\Uninstall {product}.exe"
+        return ({"UninstallString": f'"{program}" /currentuser'},
+                [program, "/currentuser", "/S"], "nsis")
+    if kind == 6:
+        code = guid(rng)
+        setup = f"C:\\Program Files (x86)\\InstallShield Installation Information\\{code}\\setup.exe"
+        ctor = "C:\\PROGRA~2\\COMMON~1\\INSTAL~1\\Driver\\11\\INTEL3~1\\Ctor.dll,LaunchSetup"
+        if rng.random() < 0.5:
+            return ({"UninstallString": f'RunDll32 {ctor} "{setup}" -l0x9 -removeonly'},
+                    ["RunDll32", ctor, setup, "-l0x9", "-removeonly", "-s"], "installshield")
+        return ({"UninstallString": f'"{setup}" -runfromtemp -l0x0409 -removeonly'},
+                [setup, "-runfromtemp", "-l0x0409", "-removeonly", "-s"], "installshield")
+    if kind == 7:
+        code = guid(rng)
+        bundle = f"C:\\ProgramData\\Package Cache\\{code}\\{product.replace(' ', '_')}_setup.exe"
+        return ({"UninstallString": f'"{bundle}"  /uninstall', "BundleCachePath": bundle},
+                [bundle, "/uninstall", "/quiet", "/norestart"], "wix-burn")
+    if kind == 8:
+        update = f"C:\\Users\\{rng.choice(USERS)}\\AppData\\Local\\{product.replace(' ', '')}\\Update.exe"
+        return ({"UninstallString": f'"{update}" --uninstall'}, [update, "--uninstall", "-s"], "squirrel")
+    if kind == 9:
+        token = "%016x" % rng.getrandbits(64)
+        name = product.replace(" ", "")
+        string = (f"rundll32.exe dfshim.dll,ShArpMaintain {name}.application, Culture=neutral, "
+                  f"PublicKeyToken={token}, processorArchitecture=msil")
+        return ({"UninstallString": string},
+                ["rundll32.exe", "dfshim.dll,ShArpMaintain", f"{name}.application,", "Culture=neutral,",
+                 f"PublicKeyToken={token},", "processorArchitecture=msil"], "clickonce")
+    if kind == 10:
+        # The publisher's own silent command is run exactly as registered
+        program = f"{folder}\\uninstall.exe"
+        return ({"UninstallString": f'"{program}"', "QuietUninstallString": f'"{program}" /S /quiet-mode="full"'},
+                [program, "/S", "/quiet-mode=full"], "nsis")
+    program = f"{folder}\\{product.split()[0].lower()}.exe"
+    return ({"UninstallString": f'"{program}" --remove --config "{folder}\\app.ini"'},
+            [program, "--remove", "--config", f"{folder}\\app.ini"], "unknown")
+
+
+def old_command(uninstall_string):
+    """The arguments the old split on '" ' produced."""
+    if not uninstall_string.startswith('"'):
+        return uninstall_string.split()
+    parts = uninstall_string.split('" ', 1)
+    args = parts[1] if len(parts) > 1 else ""
+    if "/S" not in args and "/SILENT" not in args and "/VERYSILENT" not in args and "/quiet" not in args:
+        args += " /S"
+    return [parts[0].strip('"'), args]
+
+
+def random_argument(rng):
+    alphabet = 'ab \t"\\\\/=x{}'
+    return "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    corpus = [make_entry(rng) for _ in range(args.corpus)] + [case[:3] for case in FIXED]
+    with windows_environment(ENVIRONMENT):
+        for entry, expected_argv, expected_technology in corpus:
+            argv, technology = build_uninstall_command(entry)
+            assert (argv, technology) == (expected_argv, expected_technology), (entry, argv, technology)
+        for entry, _, _, expected_line in FIXED:
+            command_line = format_command_line(build_uninstall_command(entry)[0])
+            assert command_line == expected_line, (entry, command_line)
+
+    # The tokenizer must undo the quoting the standard library applies on Windows
+    for _ in range(args.corpus):
+        argv = ["C:\\Program Files\\App\\setup.exe"] + [random_argument(rng) for _ in range(rng.randrange(1, 6))]
+        assert split_command_line(subprocess.list2cmdline(argv)) == argv, argv
+
+    # The old splitter: commands that miss the technology's silent switches would wait for input
+    prompting = 0
+    for entry, expected_argv, technology in corpus:
+        old = old_command(entry["UninstallString"])
+        silent = SILENT_SWITCHES[technology]
+        if silent and not all(switch.lower() in " ".join(old).lower().split() for switch in silent):
+            prompting += 1
+
+    strings = [entry["UninstallString"] for entry, _, _ in corpus]
+    timings = {}
+    for label, func, items in [("split_command_line", split_command_line, strings),
+                               ("build_uninstall_command", build_uninstall_command, [e for e, _, _ in corpus])]:
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            for item in items:
+                func(item)
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best
+
+    counts = {}
+    for _, _, technology in corpus:
+        counts[technology] = counts.get(technology, 0) + 1
+    print(f"corpus: {len(corpus)} strings, " + ", ".join(f"{t} {n}" for t, n in sorted(counts.items())))
+    print(f"all strings parsed as expected ({len(FIXED)} with their command lines); "
+          "tokenizer round-trips list2cmdline")
+    print(f"old '\" ' split: {prompting} of {len(corpus)} commands without the silent switches they need")
+    for label, best in timings.items():
+        print(f"{label:>24}: {best * 1e6 / len(corpus):6.2f} us per string (best of {args.rounds})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Official uninstaller runner against stub executables that sleep, spam output, fail or hang.
+
+Every stub is registered as the UninstallString of an application in an
+in-memory registry and run through AppUninstaller.uninstall(), so the
+filesystem pre-scan overlaps with it. The script checks that the output is
+logged line by line, that a hanging stub and the child it started are killed
+after --timeout, and that the pre-scan ran while the stub was running. It
+also cancels an uninstall that waits for OFFICIAL_UNINSTALLER_LOCK, which
+must be free again once its holder lets go. The
+peak memory is measured with tracemalloc, which also slows the spam run down.
+POSIX only: the stubs are Python scripts started through their shebang line.
+
+Usage: python benchmarks/bench_uninstaller_runner.py [--timeout 5] [--spam-lines 50000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import timed
+
+import uninstaller
+from uninstaller import OFFICIAL_UNINSTALLER_LOCK, AppUninstaller, MemoryRegistryBackend, RegistrySnapshot, ScanIndex
+
+STUBS = {
+    "sleep": """
+import time
+time.sleep(1)
+print("done")
+""",
+    "spam": """
+import sys
+for i in range({lines}):
+    print(f"removing file {{i}}")
+    if i % 1000 == 0:
+        print(f"warning {{i}}", file=sys.stderr)
+sys.stdout.write("x" * (1024 * 1024))
+""",
+    "fail": """
+import sys
+print("cannot uninstall", file=sys.stderr)
+sys.exit(3)
+""",
+    "hang": """
+import subprocess, sys, time
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"])
+with open({pid_file!r}, "w") as f:
+    f.write(str(child.pid))
+print("waiting for a dialog nobody will click")
+sys.stdout.flush()
+time.sleep(3600)
+""",
+}
+
+
+class LineCounter(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = {"output": 0, "error": 0}
+
+    def emit(self, record):
+        message = record.getMessage()
+        for label in self.lines:
+            if message.startswith(f"Uninstaller {label}: "):
+                self.lines[label] += 1
+
+
+def write_stub(folder: Path, name: str, body: str) -> Path:
+    path = folder / f"{name}_uninstall"
+    path.write_text(f"#!{sys.executable}\n{body}")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child of init can stay a zombie for a moment
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+def check_cancelled_wait(stub: Path) -> None:
+    """An uninstall cancelled while another one holds the lock must not keep the lock."""
+    app = AppUninstaller("StubCancelled", backup=False, registry=RegistrySnapshot(MemoryRegistryBackend()))
+    app.prescan = lambda: ([], [])
+    OFFICIAL_UNINSTALLER_LOCK.acquire()
+    try:
+        waiting = app.run_official_uninstallers([{"UninstallString": f'"{stub}"'}])
+        try:
+            asyncio.run(asyncio.wait_for(waiting, 0.2))
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("the uninstaller ran while the lock was held")
+    finally:
+        OFFICIAL_UNINSTALLER_LOCK.release()
+    assert OFFICIAL_UNINSTALLER_LOCK.acquire(timeout=2), "the cancelled wait kept the official uninstaller lock"
+    OFFICIAL_UNINSTALLER_LOCK.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--spam-lines", type=int, default=50000)
+    args = parser.parse_args()
+    if sys.platform == "win32":
+        sys.exit("The stubs need a POSIX shebang; run this on Linux or macOS")
+
+    counter = LineCounter()
+    uninstaller.logger.addHandler(counter)
+    uninstaller.logger.setLevel(logging.INFO)
+    uninstaller.logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pid_file = tmp / "child.pid"
+        stubs = {name: write_stub(tmp, name, body.format(lines=args.spam_lines, pid_file=str(pid_file)))
+                 for name, body in STUBS.items()}
+        data = tmp / "AppData"
+
+        print(f"{'stub':>6} {'time (s)':>9} {'executed':>9} {'killed':>7} {'stdout':>8} {'stderr':>7} "
+              f"{'peak MB':>8} {'scan overlap':>13}")
+        for name, stub in stubs.items():
+            app_name = f"Stub{name.title()}"
+            (data / app_name).mkdir(parents=True)
+            backend = MemoryRegistryBackend({"HKEY_LOCAL_MACHINE": {"SOFTWARE": {"Microsoft": {"Windows": {
+                "CurrentVersion": {"Uninstall": {app_name: {"@values": {
+                    "DisplayName": app_name, "UninstallString": f'"{stub}"'}}}}}}}}})
+            app = AppUninstaller(app_name, backup=False, registry=RegistrySnapshot(backend),
+                                 scan_index=ScanIndex.build([data]), uninstaller_timeout=args.timeout)
+
+            # Record when the pre-scan starts and when the stub exits
+            spans = {}
+            prescan, run = app.prescan, app.run_uninstaller_async
+
+            def traced_prescan(prescan=prescan):
+                spans["scan"] = time.perf_counter()
+                return prescan()
+
+            async def traced_run(entry, run=run):
+                try:
+                    return await run(entry)
+                finally:
+                    spans["end"] = time.perf_counter()
+
+            app.prescan, app.run_uninstaller_async = traced_prescan, traced_run
+            counter.lines = {"output": 0, "error": 0}
+            times = {}
+            tracemalloc.start()
+            with timed(name, times):
+                results = app.uninstall()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            # Run one after the other, the scan would only start once the stub has exited
+            overlap = spans["scan"] < spans["end"]
+            print(f"{name:>6} {times[name]:>9.2f} {str(results['uninstaller_executed']):>9} "
+                  f"{results['uninstallers_timed_out']:>7} {counter.lines['output']:>8} "
+                  f"{counter.lines['error']:>7} {peak / 1024 / 1024:>8.1f} {str(overlap):>13}")
+
+            assert overlap, "the pre-scan did not run while the uninstaller was running"
+            assert results["directories_removed"] == 1, "the pre-scanned folder was not removed"
+            if name == "sleep":
+                assert results["uninstaller_executed"] and counter.lines["output"] == 1
+            elif name == "spam":
+                assert results["uninstaller_executed"]
+                # Every line, plus the unterminated megabyte logged in pieces
+                assert counter.lines["output"] == args.spam_lines + 16, counter.lines
+                assert counter.lines["error"] == (args.spam_lines + 999) // 1000, counter.lines
+            elif name == "fail":
+                assert not results["uninstaller_executed"] and counter.lines["error"] == 1
+            elif name == "hang":
+                assert results["uninstallers_timed_out"] == 1 and not results["uninstaller_executed"]
+                assert times[name] < args.timeout + 5, "the timeout was not enforced"
+                child = int(pid_file.read_text())
+                deadline = time.monotonic() + 2
+                while alive(child) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                assert not alive(child), f"child process {child} survived the kill"
+
+        check_cancelled_wait(stubs["sleep"])
+        print("\na cancelled wait for the official uninstaller lock leaves it free")
+
+
+if __name__ == "__main__":
+    main()
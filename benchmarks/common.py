@@ -0,0 +1,204 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks run on any platform: they build synthetic directory trees in a
+temporary folder and import uninstaller.py from the repository root.
+"""
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+WORDS = [
+    "cache", "data", "config", "logs", "temp", "plugins", "update", "assets",
+    "profile", "shared", "runtime", "locale", "themes", "extensions", "store",
+]
+
+
+def app_names(count: int) -> List[str]:
+    """Return deterministic, distinct application names."""
+    return [f"BenchApp{i:03d}" for i in range(count)]
+
+
+def make_tree(root: Path, entries: int, apps: List[str], fanout: int = 20,
+              dir_ratio: float = 0.1, match_rate: float = 0.01, seed: int = 1) -> List[Path]:
+    """Create a synthetic tree of roughly `entries` files and folders.
+
+    The tree is split over seven top-level roots, like the data locations of
+    the uninstaller. A `match_rate` fraction of the names contain one of the
+    application names. Returns the list of roots.
+    """
+    rng = random.Random(seed)
+    roots = [root / f"root{i}" for i in range(7)]
+    for r in roots:
+        r.mkdir(parents=True, exist_ok=True)
+
+    def name(prefix: str, i: int) -> str:
+        base = f"{prefix}{rng.choice(WORDS)}{i}"
+        if apps and rng.random() < match_rate:
+            base = f"{rng.choice(apps)}_{base}"
+        return base
+
+    frontier = list(roots)
+    created = 0
+    while created < entries:
+        next_frontier = []
+        for parent in frontier:
+            for i in range(fanout):
+                if created >= entries:
+                    break
+                if rng.random() < dir_ratio:
+                    d = parent / name("dir_", created)
+                    d.mkdir()
+                    next_frontier.append(d)
+                else:
+                    fd = os.open(parent / name("file_", created), os.O_CREAT | os.O_WRONLY)
+                    os.close(fd)
+                created += 1
+        frontier = next_frontier or frontier
+    return roots
+
+
+# Data locations of the synthetic Windows layout: environment variable -> folder on the drive
+WINDOWS_LOCATIONS = {
+    "APPDATA": "Users/bench/AppData/Roaming",
+    "LOCALAPPDATA": "Users/bench/AppData/Local",
+    "ProgramData": "ProgramData",
+    "ProgramFiles": "Program Files",
+    "ProgramFiles(x86)": "Program Files (x86)",
+}
+
+
+def make_windows_layout(drive: Path, apps: List[str], entries: int, depth: int = 4, fanout: int = 12,
+                        match_rate: float = 0.01, app_files: int = 8, file_size: int = 4096,
+                        seed: int = 1) -> Dict[str, str]:
+    """Create a synthetic system drive with the data locations of Windows.
+
+    Every application gets an install folder under Program Files (every
+    third one under Program Files (x86)) and a data folder under AppData,
+    each with `app_files` files of `file_size` bytes. About `entries` empty
+    files and folders are spread over all the data locations: the number of
+    children of a folder is drawn between 1 and 2 * `fanout`, subfolders get
+    rarer with depth and none are created below `depth`, and a `match_rate`
+    fraction of the names contain an application name. Returns the
+    environment that points get_common_data_locations() at the layout.
+    """
+    rng = random.Random(seed)
+    env = {name: str(drive / folder) for name, folder in WINDOWS_LOCATIONS.items()}
+    env.update(USERNAME="bench", SystemDrive=str(drive), SystemRoot=str(drive / "Windows"))
+    roots = [drive / folder for folder in WINDOWS_LOCATIONS.values()]
+    roots += [drive / "Users/bench/AppData/Local/Temp", drive / "Windows/Temp"]
+    for root in roots:
+        root.mkdir(parents=True, exist_ok=True)
+
+    payload = os.urandom(file_size)
+    for i, app in enumerate(apps):
+        program_files = env["ProgramFiles(x86)" if i % 3 == 2 else "ProgramFiles"]
+        for folder in (Path(program_files, app), Path(env["APPDATA"], app), Path(env["LOCALAPPDATA"], app, "cache")):
+            folder.mkdir(parents=True)
+            for j in range(app_files):
+                (folder / f"{rng.choice(WORDS)}{j}.dat").write_bytes(payload)
+
+    def name(prefix: str, i: int) -> str:
+        base = f"{prefix}{rng.choice(WORDS)}{i}"
+        if apps and rng.random() < match_rate:
+            base = f"{rng.choice(apps)}_{base}"
+        return base
+
+    created = 0
+    frontier = [(root, 0) for root in roots]
+    while created < entries:
+        next_frontier = []
+        for parent, level in frontier:
+            # Shallow folders hold mostly folders, deep ones mostly files
+            dir_ratio = 0.5 / (level + 1) if level + 1 < depth else 0.0
+            for _ in range(rng.randint(1, 2 * fanout)):
+                if created >= entries:
+                    break
+                if rng.random() < dir_ratio:
+                    child = parent / name("dir_", created)
+                    child.mkdir()
+                    next_frontier.append((child, level + 1))
+                else:
+                    fd = os.open(parent / name("file_", created), os.O_CREAT | os.O_WRONLY)
+                    os.close(fd)
+                created += 1
+        frontier = next_frontier or [(root, 0) for root in roots]
+    return env
+
+
+@contextmanager
+def windows_environment(env: Dict[str, str]):
+    """Point get_common_data_locations() at a synthetic layout for the block."""
+    with mock.patch.dict(os.environ, env):
+        yield
+
+
+def redirect_backups(uninstaller, folder: Path) -> None:
+    """Write the file and registry backups of an AppUninstaller to folder instead of ./backups."""
+    from uninstaller import RegistryBackupFile
+    uninstaller.backup_dir = folder
+    uninstaller.registry_backup = RegistryBackupFile(folder / "registry" / "registry.reg", uninstaller.registry.backend)
+
+
+@contextmanager
+def timed(label: str, results: dict):
+    """Store the wall time of the block in results[label]."""
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def make_registry_tree(apps: List[str], entries: int = 2000, seed: int = 1, vendors: int = 0) -> dict:
+    """Return a registry fixture with `entries` Uninstall subkeys.
+
+    The fixture has the nested-dict format of MemoryRegistryBackend; the
+    given application names are spread over the entries, the rest are
+    filler applications. With `vendors`, Software and Software\\Classes of
+    both hives also get that many vendor keys with a few product subkeys,
+    for the thorough registry scan.
+    """
+    rng = random.Random(seed)
+    hives = {"HKEY_CURRENT_USER": {}, "HKEY_LOCAL_MACHINE": {}}
+    uninstall_paths = [
+        ["SOFTWARE", "Microsoft", "Windows", "CurrentVersion", "Uninstall"],
+        ["SOFTWARE", "WOW6432Node", "Microsoft", "Windows", "CurrentVersion", "Uninstall"],
+    ]
+    keys = []
+    for hive in hives.values():
+        for parts in uninstall_paths:
+            node = hive
+            for part in parts:
+                node = node.setdefault(part, {})
+            keys.append(node)
+    for i in range(entries):
+        name = apps[i] if i < len(apps) else f"{rng.choice(WORDS).title()} Tool {i}"
+        guid = "{%08X-0000-0000-0000-%012X}" % (i, rng.getrandbits(48))
+        rng.choice(keys)[guid] = {"@values": {
+            "DisplayName": name,
+            "DisplayVersion": f"{rng.randint(1, 20)}.{rng.randint(0, 9)}.{i}",
+            "Publisher": f"{rng.choice(WORDS).title()} Software",
+            "InstallLocation": f"C:\\Program Files\\{name}",
+            "UninstallString": f"MsiExec.exe /X{guid}",
+            "EstimatedSize": rng.randint(100, 500000),
+            "NoModify": 1,
+            "NoRepair": 1,
+        }}
+    for hive in hives.values():
+        for parts in (["SOFTWARE"], ["SOFTWARE", "Classes"]):
+            node = hive
+            for part in parts:
+                node = node.setdefault(part, {})
+            for i in range(vendors):
+                vendor = node.setdefault(f"{rng.choice(WORDS).title()}Soft{i}", {})
+                for j in range(rng.randint(1, 4)):
+                    product = apps[rng.randrange(len(apps))] if apps and rng.random() < 0.05 else f"Product{j}"
+                    vendor[product] = {"Settings": {"@values": {"Version": j}}}
+    return hives
@@ -1,21 +1,35 @@
 #!/usr/bin/env python3
 import os
 import sys
-import shutil
-import winreg
-import subprocess
+try:
+    import winreg
+except ImportError:  # Not on Windows (e.g. running the benchmarks)
+    winreg = None
 import logging
-import argparse
 from pathlib import Path
-import ctypes
-import json
 import re
-from typing import List, Dict, Optional, Tuple, Set
+from typing import List, Dict, Optional, Tuple, Set, Iterator, Iterable, Callable
 import time
+import queue
+import threading
+import contextvars
+import mmap
+import struct
+import math
+import operator
+from array import array
+from itertools import accumulate, compress, filterfalse
+from collections import Counter, defaultdict
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+# shutil, subprocess, ctypes, json, argparse and hashlib are imported where
+# they are used: `--list-only` never needs them and runs far more often than
+# an uninstall, so its startup should not pay for them.
 
 # Check if running with admin privileges
 def is_admin() -> bool:
     try:
+        import ctypes
         return ctypes.windll.shell32.IsUserAnAdmin() != 0
     except:
         return False
@@ -23,73 +37,887 @@ def is_admin() -> bool:
 # Request admin privileges if needed
 def request_admin():
     if not is_admin():
+        import ctypes
         ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
         sys.exit(0)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("uninstaller_log.txt"),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging; called by main() so importing the module has no side effects
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("uninstaller_log.txt", delay=True),  # Opened on the first record
+            logging.StreamHandler()
+        ]
+    )
+
 logger = logging.getLogger(__name__)
 
+# Counters of the profile scope the current code runs in (see ProfileScope)
+PROFILE_SCOPE: "contextvars.ContextVar[Optional[Dict[str, int]]]" = contextvars.ContextVar("profile_scope",
+                                                                                          default=None)
+
+class ProfileScope:
+    """Counts, besides the totals of the run, the operations of a block.
+    
+    Work the block hands to other threads is included when the function is
+    wrapped with in_profile_scope(), so concurrent blocks (the applications
+    of a --jobs batch) each get their own numbers.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+
+    def __enter__(self) -> Dict[str, int]:
+        self._token = PROFILE_SCOPE.set(self.counters)
+        return self.counters
+
+    def __exit__(self, *exc) -> None:
+        PROFILE_SCOPE.reset(self._token)
+
+# Wrap func so that it counts into the profile scope of the caller on any thread
+def in_profile_scope(func: Callable) -> Callable:
+    scope = PROFILE_SCOPE.get()
+    if scope is None:
+        return func
+        
+    def run(*args, **kwargs):
+        token = PROFILE_SCOPE.set(scope)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            PROFILE_SCOPE.reset(token)
+    return run
+
+class ProfileSpan:
+    """Times a block and records it as a complete event of its profiler."""
+
+    def __init__(self, profiler: "Profiler", name: str, args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "ProfileSpan":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        self.elapsed = end - self.start
+        self.profiler._record(self.name, self.start, end, self.args)
+
+class Profiler:
+    """Timing spans and operation counters of a run, exported in the Chrome trace-event format.
+    
+    Spans become complete ("X") events of the thread that ran them. Counters
+    stand in for system calls: directory listings, stats, registry handles
+    opened, processes started and bytes copied to backups. The exported
+    file opens in chrome://tracing or ui.perfetto.dev.
+    """
+
+    enabled = True
+    
+    # Counter names and how reports describe them
+    COUNTERS = {
+        "scandir": "Directory listings (scandir)",
+        "stat": "Stat calls",
+        "registry_handles": "Registry keys opened",
+        "subprocesses": "Processes started",
+        "bytes_copied": "Bytes copied to backups",
+    }
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.events: List[Dict] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def span(self, name: str, **args) -> ProfileSpan:
+        return ProfileSpan(self, name, args)
+
+    def scope(self) -> ProfileScope:
+        return ProfileScope()
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        scope = PROFILE_SCOPE.get()
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+            if scope is not None:
+                scope[counter] = scope.get(counter, 0) + amount
+
+    def _record(self, name: str, start: float, end: float, args: Dict) -> None:
+        tid = threading.get_ident()
+        event = {"name": name, "ph": "X", "ts": round((start - self._origin) * 1e6, 1),
+                 "dur": round((end - start) * 1e6, 1), "pid": os.getpid(), "tid": tid}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+
+    def export(self, path) -> None:
+        """Write the spans and the final counter values as a trace-event JSON file."""
+        import json
+        pid = os.getpid()
+        end = round((time.perf_counter() - self._origin) * 1e6, 1)
+        with self._lock:
+            events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                      for tid, name in self._threads.items()]
+            events.extend(self.events)
+            events.extend({"name": counter, "ph": "C", "ts": end, "pid": pid, "tid": 0, "args": {counter: value}}
+                          for counter, value in sorted(self.counters.items()))
+            trace = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": dict(self.counters)}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+
+class NullProfiler(Profiler):
+    """The profiler used without --profile: spans and counters do nothing."""
+
+    enabled = False
+
+    class _Span:
+        elapsed = 0.0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc) -> None:
+            pass
+
+    _SPAN = _Span()
+
+    class _Scope:
+        def __enter__(self) -> Dict[str, int]:
+            return {}
+
+        def __exit__(self, *exc) -> None:
+            pass
+
+    _SCOPE = _Scope()
+
+    def span(self, name: str, **args):
+        return self._SPAN
+
+    def scope(self):
+        return self._SCOPE
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        pass
+
+# The profiler of the run; replaced by enable_profiling() for --profile
+PROFILER: Profiler = NullProfiler()
+
+# Collect spans and counters for the rest of the run
+def enable_profiling() -> Profiler:
+    global PROFILER
+    PROFILER = Profiler()
+    return PROFILER
+
+# Registry value types (same numbers as the winreg constants)
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+# Root key names accepted in key paths, and their short forms
+REGISTRY_HIVES = {
+    "HKEY_CURRENT_USER": "HKEY_CURRENT_USER", "HKCU": "HKEY_CURRENT_USER",
+    "HKEY_LOCAL_MACHINE": "HKEY_LOCAL_MACHINE", "HKLM": "HKEY_LOCAL_MACHINE",
+    "HKEY_CLASSES_ROOT": "HKEY_CLASSES_ROOT", "HKCR": "HKEY_CLASSES_ROOT",
+    "HKEY_USERS": "HKEY_USERS", "HKU": "HKEY_USERS",
+}
+
+# Registry keys that list the installed applications
+UNINSTALL_HIVES = ["HKEY_CURRENT_USER", "HKEY_LOCAL_MACHINE"]
+UNINSTALL_KEY_PATHS = [
+    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+]
+
+# Threads used to enumerate independent registry roots
+DEFAULT_REGISTRY_WORKERS = 4
+
+# Run a function over independent items on a thread pool
+def map_concurrently(func: Callable, items: List, workers: int) -> List:
+    """Return [func(item) for item in items], computed by up to `workers` threads."""
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(in_profile_scope(func), items))
+
+class RegistryBackend:
+    """The registry operations the uninstaller needs, modelled on winreg.
+
+    Keys are opened relative to another key handle or to a hive given by name
+    ("HKEY_LOCAL_MACHINE"). Handles work as context managers and every
+    failure is reported as an OSError, like winreg does.
+    """
+
+    def open_key(self, key, sub_key: str):
+        raise NotImplementedError
+
+    def query_info_key(self, key) -> Tuple[int, int, int]:
+        """Return (number of subkeys, number of values, last write time)."""
+        raise NotImplementedError
+
+    def enum_key(self, key, index: int) -> str:
+        raise NotImplementedError
+
+    def enum_value(self, key, index: int) -> Tuple[str, object, int]:
+        raise NotImplementedError
+
+    def query_value(self, key, name: str) -> Tuple[object, int]:
+        raise NotImplementedError
+
+    def delete_key(self, key, sub_key: str) -> None:
+        """Delete a key that has no subkeys, like winreg.DeleteKey."""
+        raise NotImplementedError
+
+    def create_key(self, key, sub_key: str):
+        """Open a key, creating it and any missing parents, like winreg.CreateKey."""
+        raise NotImplementedError
+
+    def set_value(self, key, name: str, value_type: int, data) -> None:
+        raise NotImplementedError
+
+class WinRegBackend(RegistryBackend):
+    """RegistryBackend for the real Windows registry."""
+
+    def open_key(self, key, sub_key: str):
+        PROFILER.count("registry_handles")
+        if isinstance(key, str):
+            key = getattr(winreg, key)
+        return winreg.OpenKey(key, sub_key)
+
+    def query_info_key(self, key) -> Tuple[int, int, int]:
+        return winreg.QueryInfoKey(key)
+
+    def enum_key(self, key, index: int) -> str:
+        return winreg.EnumKey(key, index)
+
+    def enum_value(self, key, index: int) -> Tuple[str, object, int]:
+        return winreg.EnumValue(key, index)
+
+    def query_value(self, key, name: str) -> Tuple[object, int]:
+        return winreg.QueryValueEx(key, name)
+
+    def delete_key(self, key, sub_key: str) -> None:
+        if isinstance(key, str):
+            key = getattr(winreg, key)
+        winreg.DeleteKey(key, sub_key)
+
+    def create_key(self, key, sub_key: str):
+        PROFILER.count("registry_handles")
+        if isinstance(key, str):
+            key = getattr(winreg, key)
+        return winreg.CreateKey(key, sub_key)
+
+    def set_value(self, key, name: str, value_type: int, data) -> None:
+        winreg.SetValueEx(key, name, 0, value_type, data)
+
+class MemoryRegistryKey:
+    """Handle to a key of a MemoryRegistryBackend."""
+
+    def __init__(self, node: Dict, path: str):
+        self.node = node
+        self.path = path
+
+    def __enter__(self) -> "MemoryRegistryKey":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Close()
+
+    def Close(self) -> None:
+        pass
+
+class MemoryRegistryBackend(RegistryBackend):
+    """RegistryBackend holding a registry tree in memory.
+
+    A tree is built from nested dicts, usually loaded from a JSON fixture:
+    every key is an object whose members are its subkeys, except "@values",
+    which maps value names to their data. Data is stored as a string, an
+    integer (REG_DWORD), a list of strings (REG_MULTI_SZ) or an explicit
+    [data, type] pair. Key names are case-insensitive as in the registry.
+    """
+
+    VALUES = "@values"
+
+    def __init__(self, tree: Optional[Dict] = None, latency: float = 0.0):
+        self.hives: Dict[str, Dict] = {}
+        self.calls = 0
+        self.latency = latency  # Seconds added to every call, to model a slow registry
+        self._lock = threading.Lock()
+        for hive, key in (tree or {}).items():
+            self.hives[hive.upper()] = self._load_key(hive.upper(), key)
+
+    @classmethod
+    def from_json(cls, path) -> "MemoryRegistryBackend":
+        import json
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def _load_key(cls, name: str, fixture: Dict) -> Dict:
+        node = {"name": name, "keys": {}, "values": {}}
+        for value_name, data in fixture.get(cls.VALUES, {}).items():
+            node["values"][value_name] = cls._typed_value(data)
+        for sub_name, sub_fixture in fixture.items():
+            if sub_name != cls.VALUES:
+                node["keys"][sub_name.lower()] = cls._load_key(sub_name, sub_fixture)
+        return node
+
+    @staticmethod
+    def _typed_value(data) -> Tuple[object, int]:
+        if isinstance(data, list) and len(data) == 2 and isinstance(data[1], int) and not isinstance(data[0], int):
+            return data[0], data[1]
+        if isinstance(data, bool) or isinstance(data, int):
+            return int(data), REG_DWORD if 0 <= data < 2 ** 32 else REG_QWORD
+        if isinstance(data, list):
+            return data, REG_MULTI_SZ
+        return data, REG_SZ
+
+    def _call(self) -> None:
+        """Hook called once per registry operation."""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def open_key(self, key, sub_key: str) -> MemoryRegistryKey:
+        self._call()
+        PROFILER.count("registry_handles")
+        return self._open(key, sub_key)
+
+    def _open(self, key, sub_key: str) -> MemoryRegistryKey:
+        if isinstance(key, str):
+            node = self.hives.get(key.upper())
+            if node is None:
+                raise FileNotFoundError(f"Unknown hive {key}")
+            key = MemoryRegistryKey(node, key.upper())
+        node = key.node
+        path = key.path
+        for part in filter(None, sub_key.split("\\")):
+            node = node["keys"].get(part.lower())
+            if node is None:
+                raise FileNotFoundError(f"Registry key not found: {path}\\{part}")
+            path = f"{path}\\{node['name']}"
+        return MemoryRegistryKey(node, path)
+
+    def query_info_key(self, key: MemoryRegistryKey) -> Tuple[int, int, int]:
+        self._call()
+        return len(key.node["keys"]), len(key.node["values"]), 0
+
+    def enum_key(self, key: MemoryRegistryKey, index: int) -> str:
+        self._call()
+        # Subkey names are listed once per change, so enumerating a big key stays linear
+        names = key.node.get("order")
+        if names is None:
+            names = key.node["order"] = [child["name"] for child in key.node["keys"].values()]
+        try:
+            return names[index]
+        except IndexError:
+            raise OSError("No more data is available") from None
+
+    def enum_value(self, key: MemoryRegistryKey, index: int) -> Tuple[str, object, int]:
+        self._call()
+        try:
+            name, (data, value_type) = list(key.node["values"].items())[index]
+        except IndexError:
+            raise OSError("No more data is available") from None
+        return name, data, value_type
+
+    def query_value(self, key: MemoryRegistryKey, name: str) -> Tuple[object, int]:
+        self._call()
+        try:
+            return key.node["values"][name]
+        except KeyError:
+            raise FileNotFoundError(f"Registry value not found: {name}") from None
+
+    def delete_key(self, key, sub_key: str) -> None:
+        self._call()
+        parent_path, _, name = sub_key.rpartition("\\")
+        parent = self._open(key, parent_path)
+        node = parent.node["keys"].get(name.lower())
+        if node is None:
+            raise FileNotFoundError(f"Registry key not found: {parent.path}\\{name}")
+        if node["keys"]:
+            raise PermissionError(f"Access is denied, key has subkeys: {parent.path}\\{node['name']}")
+        del parent.node["keys"][name.lower()]
+        parent.node.pop("order", None)
+
+    def create_key(self, key, sub_key: str) -> MemoryRegistryKey:
+        self._call()
+        PROFILER.count("registry_handles")
+        if isinstance(key, str):
+            node = self.hives.setdefault(key.upper(), {"name": key.upper(), "keys": {}, "values": {}})
+            key = MemoryRegistryKey(node, key.upper())
+        node = key.node
+        path = key.path
+        for part in filter(None, sub_key.split("\\")):
+            if part.lower() not in node["keys"]:
+                node["keys"][part.lower()] = {"name": part, "keys": {}, "values": {}}
+                node.pop("order", None)
+            node = node["keys"][part.lower()]
+            path = f"{path}\\{node['name']}"
+        return MemoryRegistryKey(node, path)
+
+    def set_value(self, key: MemoryRegistryKey, name: str, value_type: int, data) -> None:
+        self._call()
+        key.node["values"][name] = (data, value_type)
+
+class RegistrySnapshot:
+    """Every Uninstall entry of the registry, read once and kept in memory.
+
+    Each subkey of the Uninstall keys is opened once and all of its values are
+    pulled with a single EnumValue loop. The installed application list and
+    the per-application lookups of a batch are all answered from here.
+    """
+
+    def __init__(self, backend: Optional[RegistryBackend] = None, workers: int = DEFAULT_REGISTRY_WORKERS):
+        self.backend = backend or WinRegBackend()
+        self.workers = workers  # Uninstall keys enumerated concurrently
+        self.entries: List[Dict] = []  # {"Registry": key path, "Values": {name: data}}
+        self.timings: Dict[str, float] = {}  # Seconds spent per Uninstall key
+        self.loaded = False
+        self._lock = threading.Lock()  # forget() is called by concurrent uninstalls
+
+    def load(self) -> "RegistrySnapshot":
+        """Enumerate all Uninstall keys; failures are logged and skipped.
+        
+        The keys are independent, so they are read concurrently, each worker
+        with its own handles. Results are merged in the fixed key order, which
+        keeps the entry order identical to a sequential read.
+        """
+        roots = [(hive, reg_path) for hive in UNINSTALL_HIVES for reg_path in UNINSTALL_KEY_PATHS]
+        results = map_concurrently(lambda root: self._read_uninstall_key(*root), roots, self.workers)
+        self.entries = []
+        self.timings = {}
+        for (hive, reg_path), (entries, elapsed) in zip(roots, results):
+            self.entries.extend(entries)
+            self.timings[f"{hive}\\{reg_path}"] = elapsed
+            logger.debug(f"Read {len(entries)} entries from {hive}\\{reg_path} in {elapsed:.3f}s")
+        self.loaded = True
+        return self
+
+    def iter_entries(self) -> Iterator[Dict]:
+        """Yield the Uninstall entries in snapshot order.
+        
+        A loaded snapshot yields its entries; otherwise they are read from the
+        registry one subkey at a time and not kept, so memory stays flat.
+        """
+        if self.loaded:
+            yield from self.entries
+            return
+        for hive in UNINSTALL_HIVES:
+            for reg_path in UNINSTALL_KEY_PATHS:
+                yield from self._iter_uninstall_key(hive, reg_path)
+
+    def _read_uninstall_key(self, hive: str, reg_path: str) -> Tuple[List[Dict], float]:
+        start = time.perf_counter()
+        with PROFILER.span("read Uninstall key", root=f"{hive}\\{reg_path}"):
+            entries = list(self._iter_uninstall_key(hive, reg_path))
+        return entries, time.perf_counter() - start
+
+    def _iter_uninstall_key(self, hive: str, reg_path: str) -> Iterator[Dict]:
+        backend = self.backend
+        try:
+            logger.debug(f"Scanning {reg_path} in {hive}...")
+            with backend.open_key(hive, reg_path) as key:
+                for i in range(backend.query_info_key(key)[0]):
+                    try:
+                        subkey_name = backend.enum_key(key, i)
+                        with backend.open_key(key, subkey_name) as subkey:
+                            entry = {
+                                "Registry": f"{hive}\\{reg_path}\\{subkey_name}",
+                                "Values": self._read_values(subkey)
+                            }
+                    except OSError:
+                        continue
+                    yield entry
+        except OSError as e:
+            logger.warning(f"Error accessing {reg_path}: {e}")
+
+    def _read_values(self, key) -> Dict:
+        values = {}
+        backend = self.backend
+        for i in range(backend.query_info_key(key)[1]):
+            try:
+                name, data, _ = backend.enum_value(key, i)
+            except OSError:
+                break
+            values[name] = data
+        return values
+
+    def ensure_loaded(self) -> "RegistrySnapshot":
+        return self if self.loaded else self.load()
+
+    def find(self, app_name: str) -> List[Dict]:
+        """Return the entries whose DisplayName contains app_name (case-insensitive)."""
+        needle = app_name.lower()
+        return [entry for entry in self.ensure_loaded().entries
+                if isinstance(entry["Values"].get("DisplayName"), str)
+                and needle in entry["Values"]["DisplayName"].lower()]
+
+    def forget(self, registry_path: str) -> None:
+        """Drop an entry whose key has been removed from the registry."""
+        with self._lock:
+            self.entries = [entry for entry in self.entries if entry["Registry"] != registry_path]
+
+class RegistryDeleter:
+    """Deletes a batch of registry keys in-process, subkeys first.
+    
+    Keys are grouped per hive and parent key so every parent is opened once;
+    each key is then removed bottom-up with DeleteKey, which only deletes
+    keys without subkeys. Keys below another key of the batch are covered by
+    that key's deletion.
+    """
+
+    def __init__(self, backend: RegistryBackend):
+        self.backend = backend
+        self.keys_deleted = 0  # Including subkeys
+
+    def delete(self, key_paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Delete the keys; returns {key path: None if deleted, else the error}."""
+        outcomes: Dict[str, Optional[str]] = {}
+        groups: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        covered: Dict[str, str] = {}  # Key path -> path of the batch key it is below
+        
+        parsed = []
+        for key_path in dict.fromkeys(key_paths):
+            root, _, sub_key = key_path.strip("\\").partition("\\")
+            hive = REGISTRY_HIVES.get(root.upper())
+            if hive is None or not sub_key:
+                outcomes[key_path] = f"Invalid registry key path: {key_path}"
+                continue
+            parsed.append((f"{hive}\\{sub_key}".lower(), hive, sub_key, key_path))
+        
+        # Sorted by path components, a key comes right before the keys below it
+        top = None  # (lowered path, key path) of the last key that is deleted itself
+        for lowered, hive, sub_key, key_path in sorted(parsed, key=lambda item: item[0].split("\\")):
+            if top and (lowered == top[0] or lowered.startswith(top[0] + "\\")):
+                covered[key_path] = top[1]
+                continue
+            top = (lowered, key_path)
+            parent, _, name = sub_key.rpartition("\\")
+            groups.setdefault((hive, parent), []).append((name, key_path))
+        
+        for (hive, parent), children in groups.items():
+            try:
+                with self.backend.open_key(hive, parent) as parent_key:
+                    for name, key_path in children:
+                        try:
+                            self._delete_tree(parent_key, name)
+                            outcomes[key_path] = None
+                        except OSError as e:
+                            outcomes[key_path] = str(e)
+            except OSError as e:
+                for name, key_path in children:
+                    outcomes[key_path] = str(e)
+        
+        for key_path, parent_path in covered.items():
+            outcomes[key_path] = outcomes[parent_path]
+        return outcomes
+
+    def _delete_tree(self, parent_key, name: str) -> None:
+        backend = self.backend
+        with backend.open_key(parent_key, name) as key:
+            # Collect the names first: deleting shifts the enumeration indexes
+            subkeys = [backend.enum_key(key, i) for i in range(backend.query_info_key(key)[0])]
+            for subkey in subkeys:
+                self._delete_tree(key, subkey)
+        backend.delete_key(parent_key, name)
+        self.keys_deleted += 1
+
+# .reg file format (REGEDIT5): UTF-16 with a BOM, CRLF line ends
+REG_FILE_HEADER = "Windows Registry Editor Version 5.00\r\n\r\n"
+REG_FILE_WIDTH = 80  # Hex data is wrapped like regedit does
+
+def _reg_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+# Serialize one value as a .reg line (without the line end)
+def format_reg_value(name: str, data, value_type: int) -> str:
+    prefix = "@=" if name == "" else f'"{_reg_escape(name)}"='
+    if value_type == REG_SZ and isinstance(data, str) and "\r" not in data and "\n" not in data:
+        return f'{prefix}"{_reg_escape(data)}"'
+    if value_type == REG_DWORD and isinstance(data, int):
+        return f"{prefix}dword:{data & 0xFFFFFFFF:08x}"
+    
+    # Everything else is written as hex bytes
+    if value_type == REG_MULTI_SZ:
+        raw = "".join(f"{item}\0" for item in (data or [])).encode("utf-16-le") + b"\0\0"
+    elif value_type == REG_QWORD:
+        raw = int(data).to_bytes(8, "little")
+    elif value_type == REG_DWORD:
+        raw = int(data).to_bytes(4, "little")
+    elif isinstance(data, str):
+        raw = (data + "\0").encode("utf-16-le")  # REG_EXPAND_SZ, and REG_SZ with line breaks
+    else:
+        raw = bytes(data or b"")
+    line = prefix + ("hex:" if value_type == REG_BINARY else f"hex({value_type:x}):")
+    
+    # Wrap after a comma once a line would pass the width, continuing with "\"
+    text = raw.hex(",")
+    first = max(1, (REG_FILE_WIDTH - 1 - len(line)) // 3) * 3  # "xx," per byte
+    lines = [line + text[:first]]
+    step = (REG_FILE_WIDTH - 3) // 3 * 3
+    for start in range(first, len(text), step):
+        lines[-1] += "\\"
+        lines.append("  " + text[start:start + step])
+    return "\r\n".join(lines)
+
+def _reg_unescape(text: str, start: int) -> Tuple[str, int]:
+    """Read a quoted string starting after its opening quote; returns (text, index after the closing quote)."""
+    chars = []
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and i + 1 < len(text):
+            chars.append(text[i + 1])
+            i += 2
+            continue
+        if char == '"':
+            return "".join(chars), i + 1
+        chars.append(char)
+        i += 1
+    raise ValueError(f"Unterminated string: {text}")
+
+def _parse_reg_data(text: str) -> Tuple[object, int]:
+    if text.startswith('"'):
+        return _reg_unescape(text, 1)[0], REG_SZ
+    if text.startswith("dword:"):
+        return int(text[6:], 16), REG_DWORD
+    kind, _, hex_data = text.partition(":")
+    value_type = REG_BINARY if kind == "hex" else int(kind[4:-1], 16)
+    raw = bytes(int(item, 16) for item in hex_data.replace(" ", "").split(",") if item)
+    if value_type in (REG_SZ, REG_EXPAND_SZ):
+        return raw.decode("utf-16-le").split("\0", 1)[0], value_type
+    if value_type == REG_MULTI_SZ:
+        items = raw.decode("utf-16-le").split("\0")
+        while items and items[-1] == "":
+            items.pop()
+        return items, value_type
+    if value_type in (REG_DWORD, REG_QWORD):
+        return int.from_bytes(raw, "little"), value_type
+    return raw, value_type
+
+# Parse the text of a .reg file
+def parse_reg_file(text: str) -> Iterator[Tuple[str, List[Tuple[str, object, int]]]]:
+    """Yield (key path, [(value name, data, type)]) for every key of a .reg file.
+    
+    Deleted keys ("[-key]") and deleted values ("name"=-) are skipped.
+    """
+    key_path = None
+    values: List[Tuple[str, object, int]] = []
+    pending = ""
+    for line in text.lstrip("\ufeff").splitlines():
+        line = pending + (line.strip() if pending else line.rstrip())
+        if line.endswith("\\") and not line.startswith("["):
+            pending = line[:-1]
+            continue
+        pending = ""
+        if not line or line.startswith(";") or line.startswith("Windows Registry Editor") or line == "REGEDIT4":
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            if key_path is not None:
+                yield key_path, values
+            key_path = None if line.startswith("[-") else line[1:-1]
+            values = []
+            continue
+        if key_path is None:
+            continue
+        if line.startswith("@="):
+            name, rest = "", line[2:]
+        elif line.startswith('"'):
+            name, end = _reg_unescape(line, 1)
+            rest = line[end + 1:]
+        else:
+            raise ValueError(f"Unexpected line in .reg file: {line}")
+        if rest == "-":
+            continue
+        data, value_type = _parse_reg_data(rest)
+        values.append((name, data, value_type))
+    if key_path is not None:
+        yield key_path, values
+
+# Write parsed .reg keys into a registry backend
+def import_reg_keys(backend: RegistryBackend, keys: Iterable[Tuple[str, List[Tuple[str, object, int]]]]) -> int:
+    """Create the keys and set their values; returns the number of keys written."""
+    count = 0
+    for key_path, values in keys:
+        root, _, sub_key = key_path.partition("\\")
+        hive = REGISTRY_HIVES.get(root.upper())
+        if hive is None:
+            raise ValueError(f"Invalid registry key path: {key_path}")
+        with backend.create_key(hive, sub_key) as key:
+            for name, data, value_type in values:
+                backend.set_value(key, name, value_type, data)
+        count += 1
+    return count
+
+class RegistryBackupFile:
+    """All the registry keys backed up by one uninstall, in a single .reg file.
+    
+    Keys are exported in-process with EnumKey/EnumValue and appended to the
+    file as REGEDIT5 text, so the file can be imported with regedit. Next to
+    it, an index (one JSON line per exported key: path, byte offset, length)
+    lets restore() import a single key and its subkeys without parsing the
+    rest of the file.
+    """
+
+    ENCODING = "utf-16-le"  # After the BOM written at the start of the file
+
+    def __init__(self, path, backend: Optional[RegistryBackend] = None):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.backend = backend or WinRegBackend()
+
+    def export(self, key_path: str) -> int:
+        """Append a key and its subkeys to the file; returns the number of keys written.
+        
+        Raises OSError (FileNotFoundError for a missing key) when the key cannot be read.
+        """
+        import json
+        root, _, sub_key = key_path.strip("\\").partition("\\")
+        hive = REGISTRY_HIVES.get(root.upper())
+        if hive is None or not sub_key:
+            raise FileNotFoundError(f"Invalid registry key path: {key_path}")
+        
+        # Serialize first, so a key that fails half-way leaves the file untouched
+        blocks: List[Tuple[str, str]] = []  # (key path, text of its own block)
+        with self.backend.open_key(hive, sub_key) as key:
+            self._export_key(key, f"{hive}\\{sub_key}", blocks)
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f, open(self.index_path, "a", encoding="utf-8") as index:
+            if f.tell() == 0:
+                f.write(b"\xff\xfe" + REG_FILE_HEADER.encode(self.ENCODING))
+            offsets = []
+            for path, block in blocks:
+                offsets.append(f.tell())
+                f.write(block.encode(self.ENCODING))
+            end = f.tell()
+            
+            # A key's subkeys follow it, so its subtree ends where the next key at its depth starts
+            stops = [end] * len(blocks)
+            open_keys: List[int] = []
+            for i, (path, _) in enumerate(blocks):
+                depth = path.count("\\")
+                while open_keys and blocks[open_keys[-1]][0].count("\\") >= depth:
+                    stops[open_keys.pop()] = offsets[i]
+                open_keys.append(i)
+            for (path, _), offset, stop in zip(blocks, offsets, stops):
+                index.write(json.dumps({"key": path, "offset": offset, "length": stop - offset}) + "\n")
+        return len(blocks)
+
+    def _export_key(self, key, path: str, blocks: List[Tuple[str, str]]) -> None:
+        backend = self.backend
+        subkey_count, value_count, _ = backend.query_info_key(key)
+        lines = [f"[{path}]"]
+        for i in range(value_count):
+            name, data, value_type = backend.enum_value(key, i)
+            lines.append(format_reg_value(name, data, value_type))
+        blocks.append((path, "\r\n".join(lines) + "\r\n\r\n"))
+        for i in range(subkey_count):
+            name = backend.enum_key(key, i)
+            with backend.open_key(key, name) as subkey:
+                self._export_key(subkey, f"{path}\\{name}", blocks)
+
+    def keys(self) -> Dict[str, Tuple[int, int]]:
+        """Return {lowercased key path: (offset, length)}; a later export of a key wins."""
+        import json
+        index = {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                index[record["key"].lower()] = (record["offset"], record["length"])
+        return index
+
+    def read(self, key_path: Optional[str] = None) -> str:
+        """Return the .reg text of the whole file, or of one key and its subkeys."""
+        with open(self.path, "rb") as f:
+            if key_path is None:
+                return f.read().decode("utf-16")
+            root, _, sub_key = key_path.strip("\\").partition("\\")
+            hive = REGISTRY_HIVES.get(root.upper(), root)
+            offset, length = self.keys()[f"{hive}\\{sub_key}".lower()]
+            f.seek(offset)
+            return f.read(length).decode(self.ENCODING)
+
+    def restore(self, key_path: Optional[str] = None, backend: Optional[RegistryBackend] = None) -> int:
+        """Import the whole backup, or one key with its subkeys; returns the number of keys written."""
+        return import_reg_keys(backend or self.backend, parse_reg_file(self.read(key_path)))
+
+# Fields of an application record, in output order
+APPLICATION_FIELDS = ["DisplayName", "DisplayVersion", "Publisher", "InstallLocation", "UninstallString", "Registry"]
+
+# Turn an Uninstall entry into an application record; None for unnamed entries and updates
+def application_record(entry: Dict, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    values = entry["Values"]
+    display_name = values.get("DisplayName")
+    if not isinstance(display_name, str):
+        return None
+    logger.debug(f"Found: {display_name}")
+    
+    # Skip entries that look like Windows components or updates
+    if ("KB" in display_name and any(x in display_name for x in ["Update", "Security Update", "Hotfix"])) or \
+       any(x in display_name for x in ["Security Update for", "Update for"]):
+        return None
+    
+    if fields is None:
+        app_info = {
+            "DisplayName": display_name,
+            "Registry": entry["Registry"]
+        }
+        
+        # Get other useful information
+        for value_name in ["UninstallString", "InstallLocation", "Publisher", "DisplayVersion", "EstimatedSize"]:
+            if value_name in values:
+                app_info[value_name] = values[value_name]
+        return app_info
+    
+    # Projection: only the requested fields; any registry value name can be asked for
+    return {field: entry["Registry"] if field == "Registry" else values.get(field) for field in fields}
+
+# Stream the installed applications as they are enumerated
+def iter_installed_applications(snapshot: Optional[RegistrySnapshot] = None,
+                                fields: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Yield application records in registry order, skipping duplicate names.
+    
+    Unlike get_installed_applications nothing is sorted, so the first record
+    is available as soon as its key has been read.
+    """
+    seen = set()
+    for entry in (snapshot or RegistrySnapshot()).iter_entries():
+        record = application_record(entry, fields)
+        if record is None:
+            continue
+        display_name = entry["Values"]["DisplayName"]
+        if display_name in seen:
+            continue
+        seen.add(display_name)
+        yield record
+
 # Function to get list of all installed applications
-def get_installed_applications() -> List[Dict]:
+def get_installed_applications(snapshot: Optional[RegistrySnapshot] = None) -> List[Dict]:
     """Get a list of all installed applications from the registry."""
     applications = []
-    registry_locations = [
-        winreg.HKEY_CURRENT_USER,
-        winreg.HKEY_LOCAL_MACHINE
-    ]
-    registry_paths = [
-        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-    ]
     
     logger.info("Scanning registry for installed applications...")
+    snapshot = (snapshot or RegistrySnapshot()).ensure_loaded()
     
-    for hkey in registry_locations:
-        for reg_path in registry_paths:
-            try:
-                logger.debug(f"Scanning {reg_path} in {'HKEY_CURRENT_USER' if hkey == winreg.HKEY_CURRENT_USER else 'HKEY_LOCAL_MACHINE'}...")
-                with winreg.OpenKey(hkey, reg_path) as key:
-                    for i in range(winreg.QueryInfoKey(key)[0]):
-                        try:
-                            subkey_name = winreg.EnumKey(key, i)
-                            with winreg.OpenKey(key, subkey_name) as subkey:
-                                try:
-                                    display_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                                    logger.debug(f"Found: {display_name}")
-                                    
-                                    # Skip entries that look like Windows components or updates
-                                    if ("KB" in display_name and any(x in display_name for x in ["Update", "Security Update", "Hotfix"])) or \
-                                       any(x in display_name for x in ["Security Update for", "Update for"]):
-                                        continue
-                                    
-                                    app_info = {
-                                        "DisplayName": display_name,
-                                        "Registry": f"{hkey}\\{reg_path}\\{subkey_name}"
-                                    }
-                                    
-                                    # Get other useful information
-                                    for value_name in ["UninstallString", "InstallLocation", "Publisher", "DisplayVersion"]:
-                                        try:
-                                            app_info[value_name] = winreg.QueryValueEx(subkey, value_name)[0]
-                                        except:
-                                            pass
-                                            
-                                    applications.append(app_info)
-                                except (WindowsError, TypeError, ValueError) as e:
-                                    pass
-                        except WindowsError as e:
-                            continue
-            except WindowsError as e:
-                logger.warning(f"Error accessing {reg_path}: {e}")
-                continue
+    for entry in snapshot.entries:
+        app_info = application_record(entry)
+        if app_info is not None:
+            applications.append(app_info)
     
     logger.info(f"Found {len(applications)} applications before filtering.")
     
@@ -104,281 +932,2084 @@ def get_installed_applications() -> List[Dict]:
     
     return sorted_apps
 
+# Registry data as plain text for CSV cells and JSON values that have no JSON type
+def _plain_value(data):
+    if isinstance(data, bytes):
+        return data.hex()
+    if isinstance(data, list):
+        return ";".join(str(item) for item in data)
+    return data
+
+# Write application records as JSON Lines, a JSON array or CSV, one record at a time
+def write_inventory(records: Iterable[Dict], fmt: str, fields: List[str], out=None) -> int:
+    """Serialize records to `out` (stdout by default) as they arrive; returns the count."""
+    out = out or sys.stdout
+    count = 0
+    if fmt == "csv":
+        import csv
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow({field: _plain_value(record.get(field)) for field in fields})
+            count += 1
+        return count
+    
+    import json
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_plain_value)
+    if fmt == "jsonl":
+        for record in records:
+            out.write(encoder.encode(record))
+            out.write("\n")
+            count += 1
+    else:
+        # A JSON array written element by element, so the records are never all in memory
+        out.write("[")
+        for record in records:
+            out.write(",\n" if count else "\n")
+            out.write(encoder.encode(record))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    return count
+
+# Environment variables naming the folders where applications leave data behind
+DATA_LOCATION_VARIABLES = ["APPDATA", "LOCALAPPDATA", "ProgramData", "ProgramFiles", "ProgramFiles(x86)"]
+
+# Folders where applications usually leave data behind
+def get_common_data_locations() -> List[Path]:
+    """Return the filesystem roots that are searched for leftover files.
+    
+    Locations whose environment variable is not set are skipped, so this also
+    works outside Windows, e.g. on a synthetic layout for the benchmarks.
+    """
+    environ = os.environ
+    locations = [Path(environ[name]) for name in DATA_LOCATION_VARIABLES if environ.get(name)]
+    system_drive = environ.get("SystemDrive", "C:")
+    if environ.get("USERNAME"):
+        locations.append(Path(f"{system_drive}/Users") / environ["USERNAME"] / "AppData/Local/Temp")
+    locations.append(Path(environ.get("SystemRoot", f"{system_drive}/Windows")) / "Temp")
+    return locations
+
+class NameMatcher:
+    """Case-insensitive substring matcher for many application names at once.
+
+    All names are compiled into one alternation, so a path or registry key
+    name that matches none of them (the common case) is rejected with a single
+    regex search instead of one search per application.
+    """
+
+    def __init__(self, app_names: List[str]):
+        self.app_names = list(app_names)
+        self._needles: Dict[str, List[str]] = {}
+        for app_name in self.app_names:
+            self._needles.setdefault(app_name.lower(), []).append(app_name)
+        # Longest first so the alternation prefers the most specific name
+        alternatives = sorted(self._needles, key=len, reverse=True)
+        self.regex = re.compile("|".join(re.escape(needle) for needle in alternatives))
+
+    def match_lowered(self, lowered: str) -> Set[str]:
+        """Return the applications matching an already lower-cased name."""
+        if not self.regex.search(lowered):
+            return set()
+        if len(self._needles) == 1:
+            return set(next(iter(self._needles.values())))
+        return {app for needle, apps in self._needles.items() if needle in lowered for app in apps}
+
+    def match(self, name: str) -> Set[str]:
+        """Return the set of applications whose name occurs in name."""
+        return self.match_lowered(name.lower())
+
+# List a single directory, keeping the type information returned by scandir
+def scan_directory(path: str) -> List[Tuple[str, bool, bool]]:
+    """Return (name, is_dir, is_file) for every entry of a directory."""
+    entries = []
+    PROFILER.count("scandir")
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    is_dir = is_file = False
+                entries.append((entry.name, is_dir, is_file))
+    except OSError as e:
+        logger.debug(f"Error scanning directory {path}: {e}")
+    return entries
+
+class PathTrie:
+    """Set of paths stored as a trie of their case-normalised components.
+
+    Used to answer "is this path inside something already scheduled for
+    removal?" in time proportional to the depth of the path, and to fold a
+    list of candidates down to the minimal roots that cover all of them.
+    """
+
+    _END = None
+
+    def __init__(self, paths: Iterable = ()):
+        self._root: Dict = {}
+        for path in paths:
+            self.add(path)
+
+    @staticmethod
+    def _parts(path) -> List[str]:
+        # normpath keeps the separator of a root ("C:\\", "/"), which would leave an
+        # empty last component; only the leading one marks an absolute path
+        parts = os.path.normcase(os.path.normpath(str(path))).split(os.sep)
+        return parts[:1] + [part for part in parts[1:] if part]
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    def add(self, path) -> bool:
+        """Add a path; returns False if it was already covered."""
+        node = self._root
+        for part in self._parts(path):
+            if self._END in node:
+                return False
+            node = node.setdefault(part, {})
+        if self._END in node:
+            return False
+        node.clear()  # Everything below is covered by the new path now
+        node[self._END] = True
+        return True
+
+    def covers(self, path) -> bool:
+        """Check whether path or one of its ancestors is in the trie."""
+        node = self._root
+        if not node:
+            return False
+        for part in self._parts(path):
+            if self._END in node:
+                return True
+            node = node.get(part)
+            if node is None:
+                return False
+        return self._END in node
+
+    @classmethod
+    def minimal_roots(cls, paths: Iterable[Path]) -> List[Path]:
+        """Drop every path that lies inside another path of the list."""
+        trie = cls()
+        return [path for path in sorted(paths, key=lambda p: len(cls._parts(p))) if trie.add(path)]
+
+# Threads used to list directories while scanning for leftovers
+DEFAULT_SCAN_WORKERS = 4
+
+class ParallelWalker:
+    """Directory walker that lists many directories concurrently.
+
+    Roots are grouped per volume and every volume gets its own thread pool of
+    at most `workers` threads. Pending directories sit on a LIFO stack per
+    volume that any idle worker of that volume takes from, and at most
+    `max_in_flight` directories per volume are being listed at once so the
+    stacks stay shallow.
+    """
+
+    def __init__(self, workers: int = 4, max_in_flight: Optional[int] = None,
+                 lister: Optional[Callable[[str], List[Tuple[str, bool, bool]]]] = None):
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.lister = lister or scan_directory
+
+    def iter_listings(self, roots: List[Path], max_depth: Optional[int] = None,
+                      prune: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, int, List[Tuple[str, bool, bool]]]]:
+        """Yield (directory, depth, scan_directory() output) as listings complete.
+        
+        Subdirectories for which prune(path) is true are not listed.
+        """
+        if max_depth is not None and max_depth <= 0:
+            return
+        pending: Dict[str, List[Tuple[str, int]]] = {}
+        for root in reversed(roots):
+            volume = os.path.splitdrive(os.path.abspath(str(root)))[0].lower()
+            pending.setdefault(volume, []).append((str(root), 0))
+        
+        pools = {volume: ThreadPoolExecutor(max_workers=self.workers) for volume in pending}
+        lister = in_profile_scope(self.lister)
+        in_flight = {}
+        busy = dict.fromkeys(pending, 0)
+        try:
+            while in_flight or any(pending.values()):
+                for volume, stack in pending.items():
+                    while stack and busy[volume] < self.max_in_flight:
+                        path, depth = stack.pop()
+                        in_flight[pools[volume].submit(lister, path)] = (volume, path, depth)
+                        busy[volume] += 1
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    volume, path, depth = in_flight.pop(future)
+                    busy[volume] -= 1
+                    entries = future.result()
+                    if max_depth is None or depth + 1 < max_depth:
+                        subdirs = (os.path.join(path, name) for name, is_dir, _ in entries if is_dir)
+                        pending[volume].extend((subdir, depth + 1) for subdir in subdirs
+                                               if prune is None or not prune(subdir))
+                    yield path, depth, entries
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def walk(self, roots: List[Path], max_depth: Optional[int] = None,
+             prune: Optional[Callable[[str], bool]] = None) -> Dict[str, List[Tuple[str, bool, bool]]]:
+        """List every directory below the roots, down to max_depth."""
+        return {path: entries for path, _, entries in self.iter_listings(roots, max_depth, prune)}
+
+# Skip directories that are walked as roots of their own (e.g. the user's Temp
+# folder, which sits inside LOCALAPPDATA)
+def nested_root_pruner(roots: List[Path]) -> Optional[Callable[[str], bool]]:
+    """Return a prune callback for roots nested in other roots, or None."""
+    normalized = {os.path.normcase(os.path.normpath(str(root))) for root in roots}
+    nested = {root for root in normalized
+              if PathTrie(other for other in normalized if other != root).covers(root)}
+    if not nested:
+        return None
+    return lambda path: os.path.normcase(os.path.normpath(path)) in nested
+
+# Walk directory trees, serially or with a ParallelWalker
+def iter_directory_listings(roots: List[Path], max_depth: Optional[int] = None, workers: int = 1,
+                            prune: Optional[Callable[[str], bool]] = None,
+                            lister: Optional[Callable[[str], List[Tuple[str, bool, bool]]]] = None) -> Iterator[Tuple[str, int, List[Tuple[str, bool, bool]]]]:
+    """Yield (directory, depth, entries) for every directory below the roots."""
+    lister = lister or scan_directory
+    if workers > 1:
+        yield from ParallelWalker(workers, lister=lister).iter_listings(roots, max_depth, prune)
+        return
+    for root in roots:
+        stack = [(str(root), 0)]
+        while stack:
+            path, depth = stack.pop()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            entries = lister(path)
+            yield path, depth, entries
+            subdirs = (os.path.join(path, name) for name, is_dir, _ in reversed(entries) if is_dir)
+            stack.extend((subdir, depth + 1) for subdir in subdirs if prune is None or not prune(subdir))
+
+# Windows file attribute of junctions and symbolic links
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+
+class DiskUsage:
+    """Bytes used by directory trees, measured like du with a parallel scandir walk.
+
+    Every directory is listed once (by a ParallelWalker with more than one
+    worker) and file sizes come from the stat data of the listing. Files with
+    more than one hard link are counted once per (device, inode); symbolic
+    links and junctions are not followed. The totals of every listed
+    directory are kept, so measuring a folder again, or a folder inside one
+    already measured, does not touch the disk.
+    """
+
+    def __init__(self, workers: int = DEFAULT_SCAN_WORKERS):
+        self.workers = max(1, workers)
+        # Directory -> (bytes of its files with one link, {(device, inode): bytes} of its hard-linked files)
+        self._dirs: Dict[str, Tuple[int, Dict[Tuple[int, int], int]]] = {}
+        self._keys: Optional[List[str]] = None  # Sorted self._dirs keys, for subtree lookups
+        self._walked = PathTrie()
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.normcase(os.path.normpath(str(path)))
+
+    def _list(self, path: str) -> List[Tuple[str, bool, bool]]:
+        """scan_directory() that also records the sizes of the files it sees."""
+        entries = []
+        size = 0
+        linked: Dict[Tuple[int, int], int] = {}
+        PROFILER.count("scandir")
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            # Junctions look like directories; their stat data is free on Windows
+                            if os.name == "nt" and \
+                                    entry.stat(follow_symlinks=False).st_file_attributes & FILE_ATTRIBUTE_REPARSE_POINT:
+                                continue
+                            entries.append((entry.name, True, False))
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        entries.append((entry.name, False, True))
+                        PROFILER.count("stat")
+                        st = entry.stat(follow_symlinks=False)
+                        if not st.st_nlink:
+                            # Windows listings carry no link counts
+                            PROFILER.count("stat")
+                            st = os.stat(entry.path, follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1:
+                        linked[(st.st_dev, st.st_ino)] = st.st_size
+                    else:
+                        size += st.st_size
+        except OSError as e:
+            logger.debug(f"Error scanning directory {path}: {e}")
+        self._dirs[self._key(path)] = (size, linked)
+        return entries
+
+    def walk(self, paths: Iterable) -> None:
+        """List the folders among paths that have not been measured yet."""
+        roots = [root for root in PathTrie.minimal_roots(Path(path) for path in paths)
+                 if not self._walked.covers(root) and os.path.isdir(root)]
+        if not roots:
+            return
+        with PROFILER.span("measure folders", roots=len(roots), workers=self.workers):
+            for _ in iter_directory_listings(roots, workers=self.workers, lister=self._list):
+                pass
+        for root in roots:
+            self._walked.add(root)
+        self._keys = None
+
+    def _subtree(self, path) -> Iterator[str]:
+        """Yield the listed directories at or below a path."""
+        if self._keys is None:
+            self._keys = sorted(self._dirs)
+        keys = self._keys
+        key = self._key(path)
+        prefix = key if key.endswith(os.sep) else key + os.sep
+        if key != prefix:
+            pos = bisect_left(keys, key)
+            if pos < len(keys) and keys[pos] == key:
+                yield key
+        yield from keys[bisect_left(keys, prefix):bisect_left(keys, prefix + "\U0010ffff")]
+
+    def measure(self, paths: Iterable) -> int:
+        """Return the bytes used by the files below the paths, each file counted once."""
+        roots = PathTrie.minimal_roots(Path(path) for path in paths)
+        self.walk(roots)
+        total = 0
+        linked: Dict[Tuple[int, int], int] = {}
+        for root in roots:
+            for key in self._subtree(root):
+                size, links = self._dirs[key]
+                total += size
+                linked.update(links)
+        return total + sum(linked.values())
+
+# Defaults for the persistent scan cache
+DEFAULT_SCAN_CACHE = "scan_cache.bin"
+DEFAULT_SCAN_CACHE_MAX_MB = 64
+
+class ScanCache:
+    """On-disk cache of directory listings, validated by directory mtime.
+
+    Adding, removing or renaming an entry updates the mtime of its directory,
+    so a directory whose mtime is unchanged can reuse its cached listing with
+    one stat instead of a full scandir. The file is a sorted table of
+    (path hash, mtime, offset, length) slots followed by the listings, and is
+    memory-mapped so a lookup only touches the records it needs.
+    """
+
+    MAGIC = b"AUSC"
+    VERSION = 1
+    _HEADER = struct.Struct("<4sIII")   # magic, version, slot count, reserved
+    # The slot table is stored column by column: path hashes (sorted, so they
+    # can be bisected in place), mtimes, record offsets and record lengths
+    _SLOT_SIZE = 8 + 8 + 8 + 4
+    _RECORD = struct.Struct("<IqII")    # key length, mtime_ns, entry count, names length
+    # Directories modified this recently may still change within the same
+    # timestamp tick, so their listings are not stored
+    RACY_NS = 2_000_000_000
+
+    def __init__(self, path, max_bytes: int = DEFAULT_SCAN_CACHE_MAX_MB * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._file = None
+        self._map = None
+        self._hashes = None
+        self._count = 0
+        self._fresh: Dict[str, Tuple[int, List[Tuple[str, bool, bool]]]] = {}
+        self._reused: Dict[int, Tuple[int, int]] = {}  # path hash -> (offset, length)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # scan_directory() runs on the walker threads
+
+    @classmethod
+    def load(cls, path, max_bytes: int = DEFAULT_SCAN_CACHE_MAX_MB * 1024 * 1024) -> "ScanCache":
+        """Open an existing cache file; a missing or invalid file gives an empty cache."""
+        cache = cls(path, max_bytes)
+        try:
+            cache._file = open(cache.path, "rb")
+            cache._map = mmap.mmap(cache._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, _ = cls._HEADER.unpack_from(cache._map, 0)
+            if magic != cls.MAGIC or version != cls.VERSION or len(cache._map) < cls._HEADER.size + count * cls._SLOT_SIZE:
+                raise ValueError("unsupported scan cache format")
+            cache._count = count
+            start = cls._HEADER.size
+            cache._hashes = memoryview(cache._map)[start:start + count * 8].cast("Q")
+        except (OSError, ValueError, struct.error) as e:
+            logger.debug(f"Scan cache {cache.path} not used: {e}")
+            cache.close()
+        return cache
+
+    def close(self) -> None:
+        if self._hashes is not None:
+            self._hashes.release()
+            self._hashes = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._count = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        import hashlib
+        digest = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _slot(self, i: int) -> Tuple[int, int, int, int]:
+        """Return (path hash, mtime, offset, length) of slot i."""
+        base = self._HEADER.size
+        n = self._count
+        mtime, = struct.unpack_from("<q", self._map, base + n * 8 + i * 8)
+        offset, = struct.unpack_from("<Q", self._map, base + n * 16 + i * 8)
+        length, = struct.unpack_from("<I", self._map, base + n * 24 + i * 4)
+        return self._hashes[i], mtime, offset, length
+
+    def _find_slot(self, key_hash: int) -> Optional[Tuple[int, int, int, int]]:
+        i = bisect_left(self._hashes, key_hash)
+        if i < self._count and self._hashes[i] == key_hash:
+            return self._slot(i)
+        return None
+
+    def _decode(self, offset: int) -> Tuple[str, List[Tuple[str, bool, bool]]]:
+        key_len, _, count, names_len = self._RECORD.unpack_from(self._map, offset)
+        pos = offset + self._RECORD.size
+        key = self._map[pos:pos + key_len].decode("utf-8", "surrogatepass")
+        pos += key_len
+        flags = self._map[pos:pos + count]
+        pos += count
+        names = self._map[pos:pos + names_len].decode("utf-8", "surrogatepass").split("\0") if count else []
+        return key, [(name, bool(flag & 1), bool(flag & 2)) for name, flag in zip(names, flags)]
+
+    @classmethod
+    def _encode(cls, key: str, mtime: int, entries: List[Tuple[str, bool, bool]]) -> bytes:
+        key_bytes = key.encode("utf-8", "surrogatepass")
+        flags = bytes((1 if is_dir else 0) | (2 if is_file else 0) for _, is_dir, is_file in entries)
+        names = "\0".join(name for name, _, _ in entries).encode("utf-8", "surrogatepass")
+        return cls._RECORD.pack(len(key_bytes), mtime, len(entries), len(names)) + key_bytes + flags + names
+
+    def scan_directory(self, path: str) -> List[Tuple[str, bool, bool]]:
+        """Drop-in replacement for scan_directory() that consults the cache."""
+        PROFILER.count("stat")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return scan_directory(path)
+            
+        key = self._key(path)
+        key_hash = self._hash(key)
+        if self._map is not None:
+            slot = self._find_slot(key_hash)
+            if slot and slot[1] == mtime:
+                cached_key, entries = self._decode(slot[2])
+                if cached_key == key:
+                    with self._lock:
+                        self.hits += 1
+                        self._reused[key_hash] = (slot[2], slot[3])
+                    return entries
+                    
+        with self._lock:
+            self.misses += 1
+        entries = scan_directory(path)
+        if time.time_ns() - mtime > self.RACY_NS:
+            with self._lock:
+                self._fresh[key] = (mtime, entries)
+        return entries
+
+    def save(self) -> None:
+        """Write the listings seen in this run, plus older ones while they fit."""
+        records: Dict[int, Tuple[int, bytes]] = {}
+        size = self._HEADER.size
+        
+        def add(key_hash: int, mtime: int, data: bytes) -> bool:
+            nonlocal size
+            if key_hash in records:
+                return True
+            if size + self._SLOT_SIZE + len(data) > self.max_bytes:
+                return False
+            records[key_hash] = (mtime, data)
+            size += self._SLOT_SIZE + len(data)
+            return True
+            
+        # Fresh listings first, then reused ones, then whatever is left from
+        # earlier runs (for example the deep levels of a thorough scan)
+        for key, (mtime, entries) in self._fresh.items():
+            if not add(self._hash(key), mtime, self._encode(key, mtime, entries)):
+                break
+        if self._map is not None:
+            for key_hash, (offset, length) in self._reused.items():
+                mtime = self._RECORD.unpack_from(self._map, offset)[1]
+                add(key_hash, mtime, self._map[offset:offset + length])
+            for i in range(self._count):
+                key_hash, mtime, offset, length = self._slot(i)
+                if not add(key_hash, mtime, self._map[offset:offset + length]):
+                    break
+        # The mapping has to be released before the file can be replaced on Windows
+        self.close()
+        
+        ordered = sorted(records.items())
+        offsets = array("Q")
+        offset = self._HEADER.size + len(ordered) * self._SLOT_SIZE
+        for _, (_, data) in ordered:
+            offsets.append(offset)
+            offset += len(data)
+        columns = [
+            array("Q", (key_hash for key_hash, _ in ordered)),
+            array("q", (mtime for _, (mtime, _) in ordered)),
+            offsets,
+            array("I", (len(data) for _, (_, data) in ordered)),
+        ]
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            os.makedirs(self.path.parent, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(self._HEADER.pack(self.MAGIC, self.VERSION, len(ordered), 0))
+                for column in columns:
+                    if sys.byteorder != "little":
+                        column.byteswap()
+                    f.write(column.tobytes())
+                for _, (_, data) in ordered:
+                    f.write(data)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Saved {len(ordered)} directory listings to {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not save scan cache {self.path}: {e}")
+        self._fresh.clear()
+        self._reused.clear()
+
+class NameIndex:
+    """Entry names joined into one lower-cased string for substring searches.
+    
+    Subclasses fill _names and _parents, then call _finish(); an application
+    name is then matched with str.find over the haystack instead of a loop
+    over the entries.
+    """
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._parents = array("l")
+        self._offsets = array("q")
+        self._haystack = ""
+        self._primed: Dict[str, List[int]] = {}  # lower-cased app name -> entry indices
+
+    def _finish(self) -> None:
+        lowered = [name.lower() for name in self._names]
+        self._offsets = array("q", accumulate((len(name) + 1 for name in lowered[:-1]), initial=0))
+        self._haystack = "\n".join(lowered)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _entry_name(self, idx: int) -> str:
+        end = self._offsets[idx + 1] - 1 if idx + 1 < len(self._offsets) else len(self._haystack)
+        return self._haystack[self._offsets[idx]:end]
+
+    def _search(self, needle: str) -> List[int]:
+        haystack = self._haystack
+        offsets = self._offsets
+        hits = []
+        pos = haystack.find(needle)
+        while pos != -1:
+            idx = bisect_right(offsets, pos) - 1
+            hits.append(idx)
+            # Continue with the next entry, one hit per entry is enough
+            if idx + 1 >= len(offsets):
+                break
+            pos = haystack.find(needle, offsets[idx + 1])
+        return hits
+
+    def _hits(self, name: str) -> List[int]:
+        needle = name.lower()
+        hits = self._primed.get(needle)
+        return self._search(needle) if hits is None else hits
+
+    def prime(self, matcher: NameMatcher) -> None:
+        """Match every application of a batch in one pass over the index."""
+        primed = {needle: [] for needle in (name.lower() for name in matcher.app_names)}
+        offsets = self._offsets
+        last_idx = -1
+        for m in matcher.regex.finditer(self._haystack):
+            idx = bisect_right(offsets, m.start()) - 1
+            if idx == last_idx:
+                continue
+            last_idx = idx
+            for app_name in matcher.match_lowered(self._entry_name(idx)):
+                primed[app_name.lower()].append(idx)
+        self._primed.update(primed)
+
+class ScanIndex(NameIndex):
+    """Name index of every entry below a set of roots, built with one walk.
+
+    Each entry is stored as its basename, the index of its parent entry and a
+    type bit, so a full index of Program Files stays small. The lower-cased
+    names are joined into a single string which makes matching an application
+    name a single substring search instead of another crawl of the disk.
+    """
+
+    DIR = 1
+    FILE = 2
+
+    def __init__(self, roots: List[Path], max_depth: Optional[int] = None):
+        super().__init__()
+        self.roots = [Path(root) for root in roots]
+        self.max_depth = max_depth  # None means the whole tree
+        self._flags = bytearray()
+        self._depths = bytearray()
+
+    @classmethod
+    def build(cls, roots: List[Path], max_depth: Optional[int] = None, workers: int = 1,
+              cache: Optional["ScanCache"] = None) -> "ScanIndex":
+        """Walk the roots once and return the resulting index.
+        
+        With more than one worker the directories are listed by a
+        ParallelWalker first; the index is then assembled in the same order as
+        the serial walk, so both produce identical results. Listings of
+        directories that did not change since the last run come from the
+        scan cache when one is given.
+        """
+        index = cls(roots, max_depth)
+        prune = nested_root_pruner(index.roots)
+        lister = cache.scan_directory if cache else scan_directory
+        list_directory = lister
+        if workers > 1:
+            with PROFILER.span("walk folders", roots=len(index.roots), workers=workers):
+                listings = ParallelWalker(workers, lister=lister).walk(index.roots, max_depth, prune)
+            
+            def list_directory(path: str) -> List[Tuple[str, bool, bool]]:
+                entries = listings.pop(path, None)
+                return lister(path) if entries is None else entries
+        names, parents, flags, depths = index._names, index._parents, index._flags, index._depths
+        for root in index.roots:
+            with PROFILER.span("index folder root", root=str(root)):
+                root_idx = len(names)
+                names.append(str(root))
+                parents.append(-1)
+                flags.append(cls.DIR)
+                depths.append(0)
+                stack = [(root_idx, str(root), 0)]
+                while stack:
+                    parent_idx, path, depth = stack.pop()
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    entries = list_directory(path)
+                    if not entries:
+                        continue
+                    # Append the whole listing at once, entries keep the scandir order
+                    start = len(names)
+                    count = len(entries)
+                    names.extend(name for name, _, _ in entries)
+                    parents.extend([parent_idx] * count)
+                    flags.extend((cls.DIR if is_dir else 0) | (cls.FILE if is_file else 0) for _, is_dir, is_file in entries)
+                    depths.extend([min(depth + 1, 255)] * count)
+                    for i, (name, is_dir, _) in enumerate(entries):
+                        if is_dir:
+                            child_path = os.path.join(path, name)
+                            if not (prune and prune(child_path)):
+                                stack.append((start + i, child_path, depth + 1))
+                            
+        index._finish()
+        logger.debug(f"Indexed {len(index)} filesystem entries under {len(index.roots)} roots")
+        return index
+
+    def path(self, idx: int) -> Path:
+        """Rebuild the full path of an entry from its parent pointers."""
+        parts = []
+        while idx != -1:
+            parts.append(self._names[idx])
+            idx = self._parents[idx]
+        return Path(*reversed(parts))
+
+    def covers_depth(self, depth: Optional[int]) -> bool:
+        """Check whether the index was built deep enough for a query."""
+        if self.max_depth is None:
+            return True
+        return depth is not None and depth <= self.max_depth
+
+    def iter_find(self, name: str, flags: int, max_depth: Optional[int] = None) -> Iterator[Path]:
+        """Yield the paths whose basename contains name (case-insensitive)."""
+        for idx in self._hits(name):
+            depth = self._depths[idx]
+            if depth > 0 and self._flags[idx] & flags and (max_depth is None or depth <= max_depth):
+                yield self.path(idx)
+
+    def find(self, name: str, flags: int, max_depth: Optional[int] = None) -> List[Path]:
+        """Return the paths whose basename contains name (case-insensitive)."""
+        return list(self.iter_find(name, flags, max_depth))
+
+# Where application sizes come from: the EstimatedSize recorded by the setup, or the folders on disk
+SIZE_SOURCES = ["estimated", "disk"]
+
+# Size in bytes from the EstimatedSize value (KB) of an Uninstall entry; None when it is missing
+def estimated_size(app: Dict) -> Optional[int]:
+    value = app.get("EstimatedSize")
+    return value * 1024 if isinstance(value, int) and value > 0 else None
+
+# Size for humans, e.g. "1.5 GB"; empty for an unknown size
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return ""
+    value = float(size)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+class AppSizes:
+    """Sizes of installed applications in bytes, looked up when first asked for.
+
+    The "estimated" source reads EstimatedSize from the Uninstall entry. The
+    "disk" source measures InstallLocation plus the application's folders at
+    the top of the data locations (those an uninstall removes) with a shared
+    DiskUsage, so folders are walked once however often they are asked for.
+    """
+
+    def __init__(self, source: str = "estimated", workers: int = DEFAULT_SCAN_WORKERS,
+                 scan_index: Optional[ScanIndex] = None):
+        self.source = source
+        self.workers = workers
+        self.disk_usage = DiskUsage(workers)
+        self._scan_index = scan_index  # Top level of the data locations, built on first use
+        self._sizes: Dict[str, Optional[int]] = {}  # DisplayName -> bytes
+        self._folders: Dict[str, List[Path]] = {}  # DisplayName -> folders measured
+
+    def folders(self, app: Dict) -> List[Path]:
+        """Return InstallLocation and the leftover folders of an application."""
+        name = app["DisplayName"]
+        if name in self._folders:
+            return self._folders[name]
+        if self._scan_index is None:
+            self._scan_index = ScanIndex.build(get_common_data_locations(), max_depth=1, workers=self.workers)
+        folders = list(self._scan_index.iter_find(name, ScanIndex.DIR, max_depth=1))
+        location = str(app.get("InstallLocation") or "").strip().strip('"')
+        # Skip a location found above already, a drive root, or one that holds a whole
+        # data location (e.g. C:\Program Files)
+        if location and Path(location) != Path(Path(location).anchor) and not PathTrie(folders).covers(location):
+            trie = PathTrie([location])
+            if not any(trie.covers(root) for root in self._scan_index.roots):
+                folders.append(Path(location))
+        self._folders[name] = folders
+        return folders
+
+    def prefetch(self, apps: Iterable[Dict]) -> None:
+        """Measure the folders of several applications in one walk, which keeps every worker busy."""
+        if self.source != "disk":
+            return
+        self.disk_usage.walk(folder for app in apps if app.get("DisplayName") not in self._sizes
+                             for folder in self.folders(app))
+
+    def size(self, app: Dict) -> Optional[int]:
+        """Return the size of an application, None when it is unknown."""
+        name = app.get("DisplayName")
+        if name not in self._sizes:
+            if self.source == "estimated":
+                self._sizes[name] = estimated_size(app)
+            else:
+                folders = self.folders(app)
+                self._sizes[name] = self.disk_usage.measure(folders) if folders else None
+        return self._sizes[name]
+
+    def sort_key(self, app: Dict) -> Tuple[bool, int]:
+        """Key that orders applications from the largest down, unknown sizes last."""
+        size = self.size(app)
+        return size is None, -(size or 0)
+
+# Words that say nothing about which application a folder belongs to
+GENERIC_NAME_WORDS = {
+    "app", "apps", "application", "bit", "cache", "common", "config", "data", "driver", "drivers", "edition",
+    "files", "for", "helper", "installer", "logs", "plugin", "plugins", "program", "programs", "runtime",
+    "service", "services", "settings", "setup", "shared", "software", "temp", "the", "tool", "tools",
+    "update", "updates", "updater", "user", "version", "x64", "x86",
+}
+
+# Company suffixes dropped from the end of publisher names
+PUBLISHER_SUFFIXES = {"ag", "co", "company", "corp", "corporation", "gmbh", "inc", "limited", "llc", "ltd",
+                      "plc", "pty", "sa", "srl"}
+
+# Folders of Windows itself in the data locations; no Uninstall entry claims them
+SYSTEM_FOLDERS = {
+    "common files", "crashdumps", "internet explorer", "microsoft", "microsoft.net", "modifiablewindowsapps",
+    "msbuild", "package cache", "packages", "reference assemblies", "temp", "uninstall information",
+    "windows defender", "windows mail", "windows media player", "windows nt", "windows photo viewer",
+    "windows portable devices", "windows security", "windows sidebar", "windowsapps", "windowspowershell",
+}
+
+# Longest run of words of a name that becomes a key of the OwnerIndex
+OWNER_KEY_WORDS = 4
+
+NAME_WORD = re.compile(r"[^\W_]+")
+
+# Keys of a name: every run of up to OWNER_KEY_WORDS words, joined without spaces
+def name_keys(name: str, suffixes: Set[str] = frozenset()) -> Iterator[str]:
+    """Yield the keys of a name, e.g. "mozilla", "mozillafirefox" and "firefox" for "Mozilla Firefox".
+
+    Runs made of generic words or numbers only, and single words shorter than
+    three letters, are skipped: they would claim folders of other applications.
+    """
+    words = NAME_WORD.findall(name.lower())
+    while words and words[-1] in suffixes:
+        words.pop()
+    specific = [word not in GENERIC_NAME_WORDS and not word.isdigit() for word in words]
+    for i in range(len(words)):
+        key = ""
+        telling = False
+        for j in range(i, min(len(words), i + OWNER_KEY_WORDS)):
+            key += words[j]
+            telling = telling or specific[j]
+            if telling and len(key) >= 3:
+                yield key
+    if len(words) > OWNER_KEY_WORDS and any(specific):
+        yield "".join(words)
+
+class OwnerIndex:
+    """Reverse index from folder names and paths to the applications that claim them.
+
+    Built once from every Uninstall entry: the keys of DisplayName and
+    Publisher (see name_keys), and InstallLocation with all its parents, so
+    "Program Files\\Vendor" is claimed by "Program Files\\Vendor\\App". Finding
+    the owner of a folder is then a few dictionary lookups, and checking every
+    folder costs time linear in the number of folders and applications.
+    """
+
+    def __init__(self):
+        self.keys: Dict[str, str] = {}   # Name key -> DisplayName of the first application with it
+        self.paths: Dict[str, str] = {}  # Normalized install folder or parent -> DisplayName
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.normcase(os.path.normpath(str(path)))
+
+    @classmethod
+    def build(cls, snapshot: Optional[RegistrySnapshot] = None) -> "OwnerIndex":
+        """Index every Uninstall entry of a snapshot, including updates and unnamed entries."""
+        index = cls()
+        keys, paths = index.keys, index.paths
+        for entry in (snapshot or RegistrySnapshot()).iter_entries():
+            values = entry["Values"]
+            display_name = values.get("DisplayName")
+            owner = display_name if isinstance(display_name, str) else entry["Registry"]
+            for field, suffixes in (("DisplayName", frozenset()), ("Publisher", PUBLISHER_SUFFIXES)):
+                if isinstance(values.get(field), str):
+                    for key in name_keys(values[field], suffixes):
+                        keys.setdefault(key, owner)
+            location = values.get("InstallLocation")
+            if isinstance(location, str) and location.strip().strip('"'):
+                path = cls._key(os.path.expandvars(location.strip().strip('"')))
+                while path not in paths:
+                    paths[path] = owner
+                    parent = os.path.dirname(path)
+                    if parent == path:
+                        break
+                    path = parent
+        return index
+
+    def owner(self, path) -> Optional[str]:
+        """Return the application that claims a folder, None for an orphan."""
+        owner = self.paths.get(self._key(path))
+        if owner is not None:
+            return owner
+        for key in name_keys(os.path.basename(str(path))):
+            owner = self.keys.get(key)
+            if owner is not None:
+                return owner
+        return None
+
+# Folders at the top of the data locations that no installed application claims
+def find_orphan_folders(snapshot: Optional[RegistrySnapshot] = None, locations: Optional[List[Path]] = None,
+                        workers: int = DEFAULT_SCAN_WORKERS) -> List[Dict]:
+    """Return {"Path", "Size"} records for the orphaned folders, the largest first.
+
+    The Uninstall entries are indexed once (OwnerIndex) and the top level of
+    every data location is listed once; the sizes of all orphans are then
+    measured by one DiskUsage walk.
+    """
+    locations = locations if locations is not None else get_common_data_locations()
+    with PROFILER.span("index owners"):
+        owners = OwnerIndex.build(snapshot)
+    roots = {OwnerIndex._key(location) for location in locations}
+    orphans = []
+    with PROFILER.span("list data locations", roots=len(locations)):
+        for path, _, entries in iter_directory_listings(locations, max_depth=1, workers=workers):
+            for name, is_dir, _ in entries:
+                folder = os.path.join(path, name)
+                # Nested data locations (the user's Temp folder) are listed as roots of their own
+                if not is_dir or name.lower() in SYSTEM_FOLDERS or OwnerIndex._key(folder) in roots:
+                    continue
+                owner = owners.owner(folder)
+                if owner is None:
+                    orphans.append(folder)
+                else:
+                    logger.debug(f"{folder} belongs to {owner}")
+    logger.info(f"{len(orphans)} folders in {len(locations)} data locations are not claimed by any of "
+                f"{len(owners.keys)} application name keys and {len(owners.paths)} install paths")
+    usage = DiskUsage(workers)
+    usage.walk(orphans)
+    records = [{"Path": folder, "Size": usage.measure([folder])} for folder in orphans]
+    records.sort(key=lambda record: (-record["Size"], record["Path"].lower()))
+    return records
+
+# Roots of the thorough registry scan, as (hive, path)
+DEEP_SCAN_ROOTS = [
+    ("HKEY_CURRENT_USER", "Software"),
+    ("HKEY_LOCAL_MACHINE", "Software"),
+    ("HKEY_CURRENT_USER", "Software\\Classes"),
+    ("HKEY_LOCAL_MACHINE", "Software\\Classes"),
+]
+DEFAULT_DEEP_SCAN_DEPTH = 2
+
+# Subtrees (relative to a root) the thorough scan does not enumerate: system
+# settings, COM registrations whose children are GUIDs rather than product
+# names, and Software\Classes, which is a root of its own
+DEFAULT_DEEP_SCAN_PRUNE = [
+    "Microsoft\\Windows", "Microsoft\\Windows NT", "Classes", "Wow6432Node\\Classes",
+    "CLSID", "Interface", "TypeLib", "Wow6432Node\\CLSID", "Wow6432Node\\Interface", "Wow6432Node\\TypeLib",
+]
+
+class RegistryKeyIndex(NameIndex):
+    """Name index of the registry keys below the deep-scan roots, built once per batch.
+    
+    Only keys whose children are needed are opened; the names of the keys at
+    the depth limit come from EnumKey on their parent. Pruned subtrees are
+    listed as names but never enumerated. Like ScanIndex, the lower-cased
+    names are joined into one string, so matching an application is a
+    substring search over the whole index.
+    """
+
+    def __init__(self, roots: List[Tuple[str, str]], max_depth: int = DEFAULT_DEEP_SCAN_DEPTH):
+        super().__init__()
+        self.roots = list(roots)
+        self.max_depth = max_depth
+        self.handles_opened = 0  # Keys opened while building
+        self.elapsed = 0.0       # Seconds spent building
+        self._depths = bytearray()
+        self._forgotten: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, backend: RegistryBackend, roots: Optional[List[Tuple[str, str]]] = None,
+              max_depth: int = DEFAULT_DEEP_SCAN_DEPTH, prune: Optional[List[str]] = None,
+              workers: int = DEFAULT_REGISTRY_WORKERS) -> "RegistryKeyIndex":
+        """Enumerate the roots concurrently and return the resulting index."""
+        start = time.perf_counter()
+        index = cls(DEEP_SCAN_ROOTS if roots is None else roots, max_depth)
+        pruned = {path.lower() for path in (DEFAULT_DEEP_SCAN_PRUNE if prune is None else prune)}
+        
+        def walk(root: Tuple[str, str]):
+            with PROFILER.span("index registry root", root=f"{root[0]}\\{root[1]}"):
+                return cls._walk_root(backend, root[0], root[1], max_depth, pruned)
+            
+        names, parents, depths = index._names, index._parents, index._depths
+        for root_names, root_parents, root_depths, handles in map_concurrently(walk, index.roots, workers):
+            # Parent indexes are relative to the root, shift them into the merged arrays
+            base = len(names)
+            names.extend(root_names)
+            parents.extend(-1 if parent < 0 else parent + base for parent in root_parents)
+            depths.extend(root_depths)
+            index.handles_opened += handles
+            
+        index._finish()
+        index.elapsed = time.perf_counter() - start
+        logger.debug(f"Indexed {len(index)} registry keys under {len(index.roots)} roots, "
+                     f"{index.handles_opened} keys opened in {index.elapsed:.3f}s")
+        return index
+
+    @staticmethod
+    def _walk_root(backend: RegistryBackend, hive: str, base_path: str, max_depth: int,
+                   pruned: Set[str]) -> Tuple[List[str], List[int], List[int], int]:
+        names, parents, depths = [f"{hive}\\{base_path}"], [-1], [0]
+        handles = 0
+        stack = [(0, "", 0)]  # (entry index, path relative to the root, depth)
+        while stack:
+            idx, relative, depth = stack.pop()
+            try:
+                with backend.open_key(hive, f"{base_path}\\{relative}" if relative else base_path) as key:
+                    handles += 1
+                    children = []
+                    for i in range(backend.query_info_key(key)[0]):
+                        try:
+                            children.append(backend.enum_key(key, i))
+                        except OSError:
+                            break
+            except OSError as e:
+                logger.debug(f"Error accessing registry key {hive}\\{base_path}\\{relative}: {e}")
+                continue
+                
+            first = len(names)
+            names.extend(children)
+            parents.extend([idx] * len(children))
+            depths.extend([min(depth + 1, 255)] * len(children))
+            if depth + 1 >= max_depth:
+                continue  # The children are leaves of the scan, never opened
+            for i, name in enumerate(children):
+                child = f"{relative}\\{name}" if relative else name
+                if child.lower() not in pruned:
+                    stack.append((first + i, child, depth + 1))
+        return names, parents, depths, handles
+
+    def path(self, idx: int) -> str:
+        """Rebuild the full key path of an entry from its parent pointers."""
+        parts = []
+        while idx != -1:
+            parts.append(self._names[idx])
+            idx = self._parents[idx]
+        return "\\".join(reversed(parts))
+
+    def find(self, name: str) -> List[str]:
+        """Return the key paths whose name contains name, without the keys below another match.
+        
+        The roots themselves never match: a root is not an application's key.
+        """
+        return [key_path for key_path, _ in self.find_with_depth(name)]
+
+    def find_with_depth(self, name: str) -> List[Tuple[str, int]]:
+        """Like find(), as (key path, depth below its root) pairs."""
+        with self._lock:
+            hits = [idx for idx in self._hits(name) if self._depths[idx] > 0 and idx not in self._forgotten]
+        matched = set(hits)
+        found = []
+        for idx in hits:
+            parent = self._parents[idx]
+            while parent != -1 and parent not in matched:
+                parent = self._parents[parent]
+            if parent == -1:
+                found.append((self.path(idx), self._depths[idx]))
+        return found
+
+    def forget(self, key_paths: Iterable[str]) -> None:
+        """Drop keys that have been deleted, with everything indexed below them."""
+        removed = {key_path.lower(): key_path.rsplit("\\", 1)[-1] for key_path in key_paths}
+        with self._lock:
+            first = len(self._names)
+            for lowered, name in removed.items():
+                for idx in self._search(name.lower()):
+                    if self._depths[idx] and self.path(idx).lower() == lowered:
+                        self._forgotten.add(idx)
+                        first = min(first, idx)
+            # A key is always stored after its parent, one pass covers the subtrees
+            for idx in range(first, len(self._names)):
+                if self._parents[idx] in self._forgotten:
+                    self._forgotten.add(idx)
+
+class StreamingPipeline:
+    """Push a stream of items through stages that run in their own threads.
+
+    Each stage is a callable that returns the item to hand to the next stage,
+    or None to drop it. Stages are connected by bounded queues, so the
+    producer (usually a finder generator) blocks instead of piling up items
+    when the stages fall behind, and work on early items overlaps with the
+    production of later ones.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stages: List[Callable], maxsize: int = 64):
+        self.stages = stages
+        self.maxsize = maxsize
+
+    def _run_stage(self, stage: Callable, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        while True:
+            item = inbox.get()
+            if item is self._DONE:
+                outbox.put(self._DONE)
+                return
+            try:
+                result = stage(item)
+            except Exception as e:
+                logger.error(f"Error processing {item}: {e}")
+                result = None
+            if result is not None:
+                outbox.put(result)
+
+    def run(self, items: Iterable) -> Tuple[int, int]:
+        """Consume items and return (items produced, items that passed every stage)."""
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        run_stage = in_profile_scope(self._run_stage)
+        threads = [threading.Thread(target=run_stage, args=(stage, queues[i], queues[i + 1]), daemon=True)
+                   for i, stage in enumerate(self.stages)]
+        completed = [0]
+        
+        # Report stage: count what made it through the whole pipeline
+        def report() -> None:
+            while queues[-1].get() is not self._DONE:
+                completed[0] += 1
+                
+        threads.append(threading.Thread(target=report, daemon=True))
+        for thread in threads:
+            thread.start()
+            
+        produced = 0
+        try:
+            for item in items:
+                queues[0].put(item)
+                produced += 1
+        finally:
+            queues[0].put(self._DONE)
+            for thread in threads:
+                thread.join()
+        return produced, completed[0]
+
+# Threads used to delete directory trees; 1 falls back to shutil.rmtree
+DEFAULT_DELETE_WORKERS = 8
+
+class ParallelDeleter:
+    """Deletes a directory tree with a pool of threads.
+    
+    The tree is walked with a ParallelWalker; while it is being listed the
+    files (and links, which are never followed) are unlinked in batches on
+    the pool. Once all files are gone, directories are removed bottom-up,
+    one depth level at a time. A path that cannot be removed because it is
+    read-only gets the attribute cleared and is tried once more; failures
+    are collected as (path, error) instead of stopping the deletion.
+    """
+
+    def __init__(self, workers: int = DEFAULT_DELETE_WORKERS, batch_size: int = 256):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.files_removed = 0
+        self.dirs_removed = 0
+        self._errors: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def _is_link(path: str) -> bool:
+        """Symbolic links and, on Windows, junctions and any other reparse point."""
+        import stat
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return False
+        return stat.S_ISLNK(st.st_mode) or bool(getattr(st, "st_file_attributes", 0) & FILE_ATTRIBUTE_REPARSE_POINT)
+
+    @staticmethod
+    def _is_link_entry(entry: os.DirEntry) -> bool:
+        if entry.is_symlink():
+            return True
+        # Junctions are not symlinks to os.scandir (nor to os.path.isjunction before
+        # Python 3.12); the reparse attribute comes with the listing on Windows
+        return os.name == "nt" and bool(entry.stat(follow_symlinks=False).st_file_attributes
+                                        & FILE_ATTRIBUTE_REPARSE_POINT)
+
+    def _list(self, path: str) -> List[Tuple[str, bool, bool]]:
+        """Like scan_directory, but links (symlinks, junctions) are leaves and listing errors are kept."""
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        # A link is unlinked like a file, never walked into
+                        is_dir = entry.is_dir(follow_symlinks=False) and not self._is_link_entry(entry)
+                    except OSError:
+                        is_dir = False
+                    entries.append((entry.name, is_dir, not is_dir))
+        except OSError as e:
+            self._errors.append((path, str(e)))
+        # One listing, and the link checks of its subdirectories
+        PROFILER.count("scandir")
+        PROFILER.count("stat", sum(1 for _, is_dir, _ in entries if is_dir))
+        return entries
+
+    @classmethod
+    def _remove(cls, remove: Callable[[str], None], path: str) -> None:
+        import stat
+        try:
+            remove(path)
+        except PermissionError:
+            if cls._is_link(path):
+                raise  # chmod would change the target instead
+            # Read-only files and folders: clear the attribute and try again
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD | (stat.S_IEXEC if remove is os.rmdir else 0))
+            remove(path)
+
+    def _remove_all(self, remove: Callable[[str], None], paths: List[str]) -> Tuple[int, List[Tuple[str, str]]]:
+        removed = 0
+        errors = []
+        for path in paths:
+            try:
+                self._remove(remove, path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((path, str(e)))
+        return removed, errors
+
+    def delete_tree(self, root) -> List[Tuple[str, str]]:
+        """Delete root and everything below it; returns the (path, error) of what could not be removed."""
+        root = str(root)
+        self._errors = []
+        if self._is_link(root) or not os.path.isdir(root):
+            removed, errors = self._remove_all(os.unlink, [root])
+            self.files_removed += removed
+            return errors
+        
+        directories: Dict[int, List[str]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            batch: List[str] = []
+            for path, depth, entries in iter_directory_listings([Path(root)], workers=self.workers, lister=self._list):
+                directories.setdefault(depth, []).append(path)
+                for name, is_dir, _ in entries:
+                    if not is_dir:
+                        batch.append(os.path.join(path, name))
+                        if len(batch) >= self.batch_size:
+                            futures.append(pool.submit(self._remove_all, os.unlink, batch))
+                            batch = []
+            if batch:
+                futures.append(pool.submit(self._remove_all, os.unlink, batch))
+            for future in futures:
+                removed, errors = future.result()
+                self.files_removed += removed
+                self._errors.extend(errors)
+            
+            # Deepest directories first; the directories of one level do not depend on each other
+            for depth in sorted(directories, reverse=True):
+                level = directories[depth]
+                step = max(1, len(level) // self.workers + 1)
+                batches = [level[i:i + step] for i in range(0, len(level), step)]
+                for removed, errors in pool.map(lambda paths: self._remove_all(os.rmdir, paths), batches):
+                    self.dirs_removed += removed
+                    self._errors.extend(errors)
+        return self._errors
+
+# Backup modes: plain copies, the deduplicating chunk store, or moving the data itself
+BACKUP_MODES = ["copy", "store", "move"]
+DEFAULT_BACKUP_STORE = "backups/store"
+
+class BackupStore:
+    """Content-addressed, compressed storage for file backups.
+    
+    Files are cut into fixed-size chunks; each chunk is stored once under its
+    SHA-256, compressed with zstd when the zstandard package is installed and
+    zlib otherwise. The store is shared by all uninstalls, so a runtime that
+    several applications ship is kept once. Each uninstall session writes a
+    manifest (one JSON line per file or directory) listing the chunks needed
+    to restore it.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    SAMPLE_SIZE = 64 * 1024
+    # First byte of every chunk file: how the rest is encoded
+    RAW, ZLIB, ZSTD = b"r", b"z", b"s"
+
+    def __init__(self, root=DEFAULT_BACKUP_STORE, level: int = 1):
+        self.root = Path(root)
+        self.level = level
+        self.bytes_read = 0      # Bytes of file content backed up
+        self.bytes_written = 0   # Bytes of new chunk files
+        self.chunks_new = 0
+        self.chunks_reused = 0
+        self._lock = threading.Lock()
+        self._compress = None
+
+    def _codec(self) -> Tuple[bytes, Callable[[bytes], bytes]]:
+        if self._compress is None:
+            try:
+                import zstandard
+                self._compress = (self.ZSTD, zstandard.ZstdCompressor(level=self.level).compress)
+            except ImportError:
+                import zlib
+                self._compress = (self.ZLIB, lambda data: zlib.compress(data, self.level))
+        return self._compress
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def put_chunk(self, data: bytes) -> str:
+        """Store a chunk unless it is already there; returns its SHA-256."""
+        import hashlib
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        PROFILER.count("stat")
+        if path.exists():
+            with self._lock:
+                self.chunks_reused += 1
+            return digest
+        
+        # Already compressed data (media, archives) is stored as is; a sample tells cheaply
+        tag, compress = self._codec()
+        sample = data[:self.SAMPLE_SIZE]
+        if len(data) > self.SAMPLE_SIZE and len(compress(sample)) > len(sample) * 0.95:
+            tag, packed = self.RAW, data
+        else:
+            packed = compress(data)
+            if len(packed) >= len(data):
+                tag, packed = self.RAW, data
+        
+        # Write under a temporary name, so a chunk file is either complete or absent
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(tag)
+            f.write(packed)
+        os.replace(temp, path)
+        with self._lock:
+            self.chunks_new += 1
+            self.bytes_written += len(packed) + 1
+        PROFILER.count("bytes_copied", len(packed) + 1)
+        return digest
+
+    def get_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            tag, packed = f.read(1), f.read()
+        if tag == self.ZLIB:
+            import zlib
+            return zlib.decompress(packed)
+        if tag == self.ZSTD:
+            import zstandard  # Needed to restore chunks written with it
+            return zstandard.ZstdDecompressor().decompress(packed)
+        return packed
+
+    def put_file(self, path: Path) -> List[str]:
+        """Store a file chunk by chunk; returns the chunk digests in order."""
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                with self._lock:
+                    self.bytes_read += len(data)
+                chunks.append(self.put_chunk(data))
+        return chunks
+
+    def backup(self, path: Path, manifest: Path) -> int:
+        """Store a file or directory tree and append its entries to a manifest; returns the entries added."""
+        import json
+        records = []
+        PROFILER.count("stat")
+        if path.is_dir():
+            for directory, dirs, files in os.walk(path):
+                PROFILER.count("scandir")
+                records.append({"path": directory, "type": "dir"})
+                for name in files:
+                    records.append(self._file_record(Path(directory, name)))
+        else:
+            records.append(self._file_record(path))
+        
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(manifest, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return len(records)
+
+    def _file_record(self, path: Path) -> Dict:
+        PROFILER.count("stat")
+        info = path.stat()
+        return {"path": str(path), "type": "file", "size": info.st_size, "mtime_ns": info.st_mtime_ns,
+                "mode": info.st_mode & 0o7777, "chunks": self.put_file(path)}
+
+    def restore(self, manifest: Path, target: Optional[Path] = None) -> int:
+        """Restore the entries of a manifest, chunk by chunk; returns the files written.
+        
+        Entries go back to their original paths, or below `target` (keeping
+        the path without its drive or root) when it is given.
+        """
+        import json
+        count = 0
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                path = Path(record["path"])
+                if target is not None:
+                    path = Path(target) / path.relative_to(path.anchor)
+                if record["type"] == "dir":
+                    path.mkdir(parents=True, exist_ok=True)
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "wb") as out:
+                    for digest in record["chunks"]:
+                        out.write(self.get_chunk(digest))
+                os.chmod(path, record["mode"])
+                os.utime(path, ns=(record["mtime_ns"], record["mtime_ns"]))
+                count += 1
+        return count
+
+# Pieces of a command line: backslashes before a quote, a quote, blanks, plain text, other backslashes
+COMMAND_LINE_CHUNK = re.compile(r'(\\*)"|[ \t]+|[^ \t"\\]+|\\+')
+COMMAND_LINE_WORD = re.compile(r"[^ \t]+")
+
+# Split a command line into arguments the way the Windows C runtime does
+def split_command_line(command: str) -> List[str]:
+    command = command.lstrip(" \t")
+    if not command:
+        return []
+        
+    # The program name ends at the closing quote or the first blank; backslashes are literal
+    if command.startswith('"'):
+        end = command.find('"', 1)
+        if end < 0:
+            return [command[1:]]
+        argv, rest = [command[1:end]], command[end + 1:]
+    else:
+        end = len(command)
+        for blank in " \t":
+            position = command.find(blank)
+            if 0 <= position < end:
+                end = position
+        argv, rest = [command[:end]], command[end:]
+        
+    # Without quotes, backslashes are literal and blanks separate the arguments
+    if '"' not in rest:
+        return argv + COMMAND_LINE_WORD.findall(rest)
+        
+    # 2n backslashes and a quote give n backslashes and toggle quoting, 2n+1 give
+    # n backslashes and a literal quote; "" inside quotes is a literal quote
+    current: List[str] = []
+    in_token = in_quotes = False
+    position = 0
+    while position < len(rest):
+        match = COMMAND_LINE_CHUNK.match(rest, position)
+        position = match.end()
+        backslashes = match.group(1)
+        if backslashes is not None:
+            current.append("\\" * (len(backslashes) // 2))
+            in_token = True
+            if len(backslashes) % 2:
+                current.append('"')
+            elif in_quotes and rest.startswith('"', position):
+                current.append('"')
+                position += 1
+            else:
+                in_quotes = not in_quotes
+        elif match.group(0)[0] in " \t" and not in_quotes:
+            if in_token:
+                argv.append("".join(current))
+                current, in_token = [], False
+        else:
+            current.append(match.group(0))
+            in_token = True
+    if in_token:
+        argv.append("".join(current))
+    return argv
+
+# Unquoted program paths with spaces, e.g. C:\Program Files\App\uninst.exe /S
+UNQUOTED_PROGRAM = re.compile(r"[^\"]*?\.(?:exe|com|bat|cmd)(?=[ \t]|$)", re.IGNORECASE)
+
+# NSIS takes everything after " _?=" as the install folder: unquoted, spaces included, and last
+NSIS_INSTALL_DIR = re.compile(r"[ \t]_\?=")
+# The switch after which cmd.exe runs the rest of its command line, e.g. cmd /s /c "..."
+CMD_SWITCH = re.compile(r"[ \t]+(/[ck])(?=[ \t\"]|$)[ \t]*", re.IGNORECASE)
+
+# The program name of an argument vector, e.g. "msiexec.exe"
+def program_name(argv: List[str]) -> str:
+    return argv[0].replace("/", "\\").lower().rsplit("\\", 1)[-1] if argv else ""
+
+# Split an uninstall string from the registry into arguments
+def split_uninstall_string(uninstall_string: str) -> List[str]:
+    uninstall_string = uninstall_string.strip()
+    nsis = NSIS_INSTALL_DIR.search(uninstall_string)
+    if nsis:
+        return split_uninstall_string(uninstall_string[:nsis.start()]) + [uninstall_string[nsis.start() + 1:]]
+    switch = CMD_SWITCH.search(uninstall_string)
+    if switch:
+        argv = split_command_line(uninstall_string[:switch.start()])
+        if program_name(argv) in ("cmd", "cmd.exe"):
+            # cmd.exe drops the first and the last quote of the rest unless it is a single quoted
+            # program (exactly two quotes, and no /s); the command inside follows the usual rules
+            rest = uninstall_string[switch.end():]
+            if rest.startswith('"') and (rest.count('"') != 2 or "/s" in (arg.lower() for arg in argv[1:])):
+                last = rest.rfind('"')
+                rest = rest[1:last] + rest[last + 1:]
+            return argv + [switch.group(1)] + split_command_line(rest)
+    if not uninstall_string.startswith('"'):
+        # Windows tries the blank-separated prefixes of an unquoted path until one
+        # exists; the registry cannot be checked here, so the first ".exe" wins
+        match = UNQUOTED_PROGRAM.match(uninstall_string)
+        if match and any(blank in match.group(0) for blank in " \t"):
+            return [match.group(0)] + split_command_line("x" + uninstall_string[match.end():])[1:]
+    return split_command_line(uninstall_string)
+
+# Switches that make the uninstaller of each installer technology run unattended.
+# "installshield" setups without a recorded response file exit with an error
+# instead of prompting; ClickOnce and unknown programs have no such switch.
+SILENT_SWITCHES = {
+    "msi": ["/qn", "/norestart"],
+    "nsis": ["/S"],
+    "inno": ["/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART"],
+    "installshield": ["-s"],
+    "wix-burn": ["/quiet", "/norestart"],
+    "squirrel": ["-s"],
+    "clickonce": [],
+    "unknown": [],
+}
+
+# Arguments that already make an uninstaller silent, by the switch they stand for
+SILENT_SWITCH_ALIASES = {
+    "/qn": ["/q", "/qn", "/qn+", "/qb", "/qb-", "/qb!", "/qb-!", "/quiet", "/passive", "-q", "-qn", "-quiet"],
+    "/quiet": ["/quiet", "/passive", "/q", "-quiet", "-passive", "-q"],
+    "/VERYSILENT": ["/verysilent", "/silent"],
+    "-s": ["-s", "/s", "--silent"],
+}
+
+# Guess the installer technology of an uninstall command (see SILENT_SWITCHES)
+def detect_installer(argv: List[str], entry: Optional[Dict] = None) -> str:
+    if not argv:
+        return "unknown"
+    entry = entry or {}
+    program = argv[0].replace("/", "\\").lower()
+    name = program_name(argv)
+    args = [arg.lower() for arg in argv[1:]]
+    
+    if name in ("msiexec", "msiexec.exe"):
+        return "msi"
+    if name in ("rundll32", "rundll32.exe"):
+        # Only the DLL entry point tells; the arguments after it belong to that DLL
+        entry_point = args[0].replace("/", "\\").rsplit("\\", 1)[-1] if args else ""
+        if entry_point.startswith("dfshim"):
+            return "clickonce"
+        if entry_point.startswith("ctor.dll"):
+            return "installshield"
+        return "unknown"
+    if entry.get("BundleCachePath") or "\\package cache\\" in program:
+        return "wix-burn"
+    if (re.fullmatch(r"unins\d{3}\.exe", name) or entry.get("Inno Setup: App Path")
+            or entry.get("Registry", "").lower().endswith("_is1")):
+        return "inno"
+    if name == "update.exe" and "--uninstall" in args:
+        return "squirrel"
+    if "installshield installation information" in program or "-runfromtemp" in args or "-removeonly" in args:
+        return "installshield"
+    if name.startswith(("uninst", "un_", "uninstall")):
+        return "nsis"
+    return "unknown"
+
+# Add the silent switches of a technology that the arguments do not already contain
+def add_silent_switches(argv: List[str], technology: str) -> List[str]:
+    argv = list(argv)
+    if technology == "msi":
+        # /I opens the maintenance dialog of the product; /X removes it
+        for i, arg in enumerate(argv[1:], 1):
+            if arg[:2].lower() in ("/i", "-i") and (len(arg) == 2 or arg[2] == "{"):
+                argv[i] = "/X" + arg[2:]
+                
+    # NSIS only knows the exact /S; the other technologies ignore case
+    present = set(argv[1:]) if technology == "nsis" else {arg.lower() for arg in argv[1:]}
+    # The NSIS install folder must stay the last argument
+    last = [argv.pop()] if technology == "nsis" and len(argv) > 1 and argv[-1].startswith("_?=") else []
+    for switch in SILENT_SWITCHES.get(technology, []):
+        aliases = SILENT_SWITCH_ALIASES.get(switch, [switch if technology == "nsis" else switch.lower()])
+        if not present.intersection(aliases):
+            argv.append(switch)
+    return argv + last
+
+# Build the command that removes an Uninstall entry unattended: (argv, technology).
+# QuietUninstallString is the publisher's own silent command and is used as is.
+# Both are often REG_EXPAND_SZ; no shell runs them, so %SystemRoot% and the
+# like are expanded here, before the string is split.
+def build_uninstall_command(entry: Dict) -> Tuple[List[str], str]:
+    import ntpath
+    if entry.get("QuietUninstallString"):
+        argv = split_uninstall_string(ntpath.expandvars(entry["QuietUninstallString"]))
+        return argv, detect_installer(argv, entry)
+    argv = split_uninstall_string(ntpath.expandvars(entry["UninstallString"]))
+    technology = detect_installer(argv, entry)
+    return add_silent_switches(argv, technology), technology
+
+# Join arguments into a Windows command line; the parts split_uninstall_string()
+# takes verbatim (the NSIS install folder, the command of cmd /c) are not quoted
+def format_command_line(argv: List[str]) -> str:
+    import subprocess
+    if len(argv) > 1 and argv[-1].startswith("_?="):
+        return f"{subprocess.list2cmdline(argv[:-1])} {argv[-1]}"
+    if program_name(argv) in ("cmd", "cmd.exe"):
+        for i, arg in enumerate(argv[1:], 1):
+            if arg.lower() in ("/c", "/k"):
+                # Quoted as a whole, cmd.exe drops exactly these two quotes again
+                return f'{subprocess.list2cmdline(argv[:i + 1])} "{format_command_line(argv[i + 1:])}"'
+    return subprocess.list2cmdline(argv)
+
+# Seconds an official uninstaller may run before its process tree is killed
+DEFAULT_UNINSTALLER_TIMEOUT = 600
+
+# Longest piece of output logged as one line when a program never writes a newline
+UNINSTALLER_MAX_LINE = 64 * 1024
+
+# Kill a process and every process it started
+def kill_process_tree(pid: int) -> None:
+    import subprocess
+    if sys.platform == "win32":
+        PROFILER.count("subprocesses")
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(pid)], capture_output=True)
+        return
+    import signal
+    try:
+        # The process leads its own session, so its group holds all of its children
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+# Log the output of a stream line by line while it is produced
+async def _log_stream_lines(stream, level: int, label: str) -> int:
+    pending = b""
+    count = 0
+    while True:
+        chunk = await stream.read(UNINSTALLER_MAX_LINE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        if len(pending) >= UNINSTALLER_MAX_LINE:
+            lines.append(pending)
+            pending = b""
+        for line in lines:
+            logger.log(level, f"Uninstaller {label}: {line.decode(errors='replace').rstrip()}")
+            count += 1
+    if pending:
+        logger.log(level, f"Uninstaller {label}: {pending.decode(errors='replace').rstrip()}")
+        count += 1
+    return count
+
+# Run a command, streaming its output into the log; the exit code, or None on timeout
+async def run_command_streamed(command, shell: bool = False, timeout: Optional[float] = None) -> Optional[int]:
+    import asyncio
+    options = {"stdin": asyncio.subprocess.DEVNULL, "stdout": asyncio.subprocess.PIPE,
+               "stderr": asyncio.subprocess.PIPE}
+    if sys.platform == "win32":
+        import subprocess
+        options["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options["start_new_session"] = True
+    PROFILER.count("subprocesses")
+    if shell:
+        process = await asyncio.create_subprocess_shell(command, **options)
+    else:
+        process = await asyncio.create_subprocess_exec(*command, **options)
+        
+    readers = asyncio.gather(_log_stream_lines(process.stdout, logging.INFO, "output"),
+                             _log_stream_lines(process.stderr, logging.WARNING, "error"))
+    timed_out = False
+    try:
+        await asyncio.wait_for(process.wait(), timeout or None)
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.error(f"Uninstaller still running after {timeout}s, killing process {process.pid} and its children")
+        kill_process_tree(process.pid)
+        await process.wait()
+        
+    # A child that escaped the kill can keep the pipes open; stop reading after a grace period
+    try:
+        await asyncio.wait_for(readers, 5)
+    except asyncio.TimeoutError:
+        pass
+    return None if timed_out else process.returncode
+
+
 class AppUninstaller:
-    def __init__(self, app_name: str, thorough: bool = False, dry_run: bool = False, backup: bool = True):
+    def __init__(self, app_name: str, thorough: bool = False, dry_run: bool = False, backup: bool = True,
+                 scan_index: Optional[ScanIndex] = None, scan_workers: int = DEFAULT_SCAN_WORKERS,
+                 registry: Optional[RegistrySnapshot] = None, backup_mode: str = "copy",
+                 backup_store: Optional[BackupStore] = None, delete_workers: int = DEFAULT_DELETE_WORKERS,
+                 uninstaller_timeout: Optional[float] = DEFAULT_UNINSTALLER_TIMEOUT,
+                 registry_index: Optional[RegistryKeyIndex] = None):
         self.app_name = app_name
         self.thorough = thorough  # Deep cleaning mode
         self.dry_run = dry_run    # Preview mode without actually deleting
         self.backup = backup      # Create backups of registry and files before deletion
+        self.scan_index = scan_index  # Shared filesystem index for batch runs
+        self.scan_workers = scan_workers  # Threads used to list directories
+        self.registry = registry or RegistrySnapshot()  # Shared Uninstall entries for batch runs
+        self.streaming = True  # Delete while scanning instead of collecting matches first
+        self._removal_roots = PathTrie()  # Directories already scheduled for removal
+        self.pruned = {"directories": 0, "files": 0, "subtrees": 0}
         self.backup_dir = Path("./backups") / f"{app_name}_{time.strftime('%Y%m%d_%H%M%S')}"
-        self.registry_locations = [
-            winreg.HKEY_CURRENT_USER,
-            winreg.HKEY_LOCAL_MACHINE,
-            winreg.HKEY_CLASSES_ROOT
-        ]
-        self.registry_paths = [
-            f"SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall",
-            f"SOFTWARE\\WOW6432Node\\Microsoft\\Windows\\CurrentVersion\\Uninstall"
-        ]
-        self.common_data_locations = [
-            Path(os.environ["APPDATA"]),
-            Path(os.environ["LOCALAPPDATA"]),
-            Path(os.environ["ProgramData"]),
-            Path(os.environ["ProgramFiles"]),
-            Path(os.environ["ProgramFiles(x86)"]),
-            Path("C:/Users") / os.environ["USERNAME"] / "AppData/Local/Temp",
-            Path("C:/Windows/Temp")
-        ]
+        # Every registry key backed up by this uninstall goes to one .reg file
+        self.registry_backup = RegistryBackupFile(self.backup_dir / "registry" / "registry.reg", self.registry.backend)
+        self.delete_workers = delete_workers  # Threads used to delete a directory tree
+        self.backup_mode = backup_mode  # "copy", "store" or "move"
+        self._moved: Set[str] = set()  # Paths moved into the backup, so already gone
+        self.backup_store = backup_store or BackupStore()  # Shared chunk store for the "store" mode
+        self.uninstaller_timeout = uninstaller_timeout  # Seconds before an official uninstaller is killed
+        self.uninstallers_timed_out = 0
+        self.registry_index = registry_index  # Shared key-name index for the thorough registry scan
+        self.common_data_locations = scan_index.roots if scan_index is not None else get_common_data_locations()
         
     def find_uninstall_string(self) -> List[Dict]:
         """Find uninstall strings from registry for the application."""
         uninstall_entries = []
         
-        for hkey in self.registry_locations[:2]:  # Only search HKCU and HKLM
-            for reg_path in self.registry_paths:
-                try:
-                    with winreg.OpenKey(hkey, reg_path) as key:
-                        for i in range(winreg.QueryInfoKey(key)[0]):
-                            try:
-                                subkey_name = winreg.EnumKey(key, i)
-                                with winreg.OpenKey(key, subkey_name) as subkey:
-                                    try:
-                                        display_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                                        # Case-insensitive partial match
-                                        if self.app_name.lower() in display_name.lower():
-                                            entry = {
-                                                "DisplayName": display_name,
-                                                "Registry": f"{hkey}\\{reg_path}\\{subkey_name}"
-                                            }
-                                            
-                                            # Try to get the uninstall string
-                                            try:
-                                                entry["UninstallString"] = winreg.QueryValueEx(subkey, "UninstallString")[0]
-                                            except:
-                                                entry["UninstallString"] = None
-                                                
-                                            # Try to get other useful data
-                                            for value_name in ["InstallLocation", "Publisher", "DisplayVersion"]:
-                                                try:
-                                                    entry[value_name] = winreg.QueryValueEx(subkey, value_name)[0]
-                                                except:
-                                                    pass
-                                                    
-                                            uninstall_entries.append(entry)
-                                    except:
-                                        pass
-                            except:
-                                continue
-                except:
-                    continue
+        for snapshot_entry in self.registry.find(self.app_name):
+            values = snapshot_entry["Values"]
+            entry = {
+                "DisplayName": values["DisplayName"],
+                "Registry": snapshot_entry["Registry"],
+                "UninstallString": values.get("UninstallString")
+            }
+            
+            # Other useful data, and the values that tell how to uninstall silently
+            for value_name in ["InstallLocation", "Publisher", "DisplayVersion", "QuietUninstallString",
+                               "BundleCachePath", "Inno Setup: App Path"]:
+                if value_name in values:
+                    entry[value_name] = values[value_name]
+                    
+            uninstall_entries.append(entry)
         
         return uninstall_entries
     
-    def run_uninstaller(self, uninstall_string: str) -> bool:
-        """Execute the uninstaller program."""
+    async def run_uninstaller_async(self, entry: Dict) -> bool:
+        """Execute the uninstaller of an Uninstall entry, streaming its output into the log.
+        
+        The process tree is killed when it runs longer than uninstaller_timeout.
+        """
+        import subprocess
+        command, technology = build_uninstall_command(entry)
+        command_line = format_command_line(command)
         if self.dry_run:
-            logger.info(f"DRY RUN: Would execute uninstaller: {uninstall_string}")
+            logger.info(f"DRY RUN: Would execute uninstaller ({technology}): {command_line}")
             return True
             
-        logger.info(f"Executing uninstaller: {uninstall_string}")
-        
-        # Handle different uninstaller formats
-        if uninstall_string.startswith('"'):
-            # Format: "C:\path\to\uninstaller.exe" /arguments
-            parts = uninstall_string.split('" ', 1)
-            program = parts[0].strip('"')
-            args = parts[1] if len(parts) > 1 else ""
+        logger.info(f"Executing uninstaller ({technology}): {command_line}")
+        if not entry.get("QuietUninstallString") and not SILENT_SWITCHES.get(technology):
+            logger.warning("No silent switch known for this uninstaller, it may wait for input")
+        try:
+            if sys.platform == "win32" and command_line != subprocess.list2cmdline(command):
+                # Unquoted arguments need the command line as is, which only the shell passes on
+                returncode = await run_command_streamed(command_line, shell=True, timeout=self.uninstaller_timeout)
+            else:
+                returncode = await run_command_streamed(command, timeout=self.uninstaller_timeout)
+        except Exception as e:
+            logger.error(f"Failed to run uninstaller: {e}")
+            return False
             
-            # Add silent flags if not present
-            if "/S" not in args and "/SILENT" not in args and "/VERYSILENT" not in args and "/quiet" not in args:
-                args += " /S"
-                
-            try:
-                if args:
-                    result = subprocess.run([program, args], capture_output=True, text=True)
-                else:
-                    result = subprocess.run([program], capture_output=True, text=True)
-                    
-                logger.info(f"Uninstaller exit code: {result.returncode}")
-                if result.stdout:
-                    logger.debug(f"Uninstaller output: {result.stdout}")
-                if result.stderr:
-                    logger.warning(f"Uninstaller error: {result.stderr}")
-                    
-                return result.returncode == 0
-            except Exception as e:
-                logger.error(f"Failed to run uninstaller: {e}")
-                return False
-        else:
-            # Format: C:\path\to\uninstaller.exe /arguments
+        if returncode is None:
+            self.uninstallers_timed_out += 1
+            return False
+        logger.info(f"Uninstaller exit code: {returncode}")
+        return returncode == 0
+    
+    def run_uninstaller(self, uninstall_string: str) -> bool:
+        """Execute the uninstaller program."""
+        import asyncio
+        return asyncio.run(self.run_uninstaller_async({"UninstallString": uninstall_string}))
+    
+    def prescan(self) -> Tuple[List[Path], List[Path]]:
+        """Find the (directories, files) of the application before anything is removed."""
+        files = self.find_app_files() if self.thorough else []
+        return self.find_app_directories(), files
+    
+    async def run_official_uninstallers(self, entries: List[Dict]) -> Tuple[bool, Tuple[List[Path], List[Path]]]:
+        """Run the official uninstallers of the entries while the filesystem is pre-scanned.
+        
+        Returns (an uninstaller succeeded, result of prescan()). Paths removed by
+        the uninstaller are skipped later, when they are backed up.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        scan = loop.run_in_executor(None, in_profile_scope(self.prescan))
+        executed = False
+        
+        for entry in entries:
+            if not entry.get("UninstallString") and not entry.get("QuietUninstallString"):
+                continue
+            # Wait for the lock in a thread so the event loop keeps streaming output
+            await acquire_thread_lock(OFFICIAL_UNINSTALLER_LOCK)
             try:
-                result = subprocess.run(uninstall_string, shell=True, capture_output=True, text=True)
-                logger.info(f"Uninstaller exit code: {result.returncode}")
-                return result.returncode == 0
-            except Exception as e:
-                logger.error(f"Failed to run uninstaller: {e}")
-                return False
+                if await self.run_uninstaller_async(entry):
+                    executed = True
+            finally:
+                OFFICIAL_UNINSTALLER_LOCK.release()
+                
+        return executed, await scan
+    
+    def _unclaimed_files(self, files: Iterable[Path]) -> Iterator[Path]:
+        """Yield the files that are not inside a directory scheduled for removal."""
+        for path in files:
+            if self._removal_roots.covers(path):
+                self.pruned["files"] += 1
+                continue
+            yield path
     
     def backup_registry_key(self, key_path: str) -> bool:
-        """Backup a registry key to a file."""
+        """Backup a registry key (with its subkeys) to the consolidated .reg file."""
         if not self.backup:
             return True
             
-        # Create the backup directory if it doesn't exist
-        os.makedirs(self.backup_dir / "registry", exist_ok=True)
-        
-        # Generate a safe filename from the registry path
-        key_filename = key_path.replace("\\", "_").replace("/", "_") + ".reg"
-        backup_file = self.backup_dir / "registry" / key_filename
+        backup_file = self.registry_backup.path
         
         if self.dry_run:
             logger.info(f"DRY RUN: Would backup registry key {key_path} to {backup_file}")
             return True
             
         try:
-            # Use reg export to backup the key
-            cmd = f'reg export "{key_path}" "{backup_file}" /y'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                logger.info(f"Successfully backed up registry key to {backup_file}")
-                return True
-            else:
-                logger.warning(f"Failed to backup registry key {key_path}: {result.stderr}")
-                return False
-        except Exception as e:
-            logger.error(f"Error backing up registry key {key_path}: {e}")
+            count = self.registry_backup.export(key_path)
+            logger.info(f"Successfully backed up registry key {key_path} ({count} keys) to {backup_file}")
+            return True
+        except OSError as e:
+            logger.warning(f"Failed to backup registry key {key_path}: {e}")
             return False
     
     def backup_file_or_directory(self, path: Path) -> bool:
         """Backup a file or directory before deletion."""
+        PROFILER.count("stat")
         if not self.backup or not path.exists():
             return True
             
+        if self.backup_mode == "store":
+            return self._backup_to_store(path)
+            
         # Create the backup directory if it doesn't exist
         backup_path = self.backup_dir / "files" / path.relative_to(path.anchor)
         os.makedirs(backup_path.parent, exist_ok=True)
         
         if self.dry_run:
-            logger.info(f"DRY RUN: Would backup {path} to {backup_path}")
+            action = "move" if self.backup_mode == "move" else "backup"
+            logger.info(f"DRY RUN: Would {action} {path} to {backup_path}")
+            return True
+            
+        if self.backup_mode == "move" and self._same_volume(path, backup_path.parent):
+            if self._backup_by_move(path, backup_path):
+                return True
+                
+        # Different volume, or the data could not be moved or linked: copy it
+        return self._backup_by_copy(path, backup_path)
+    
+    def _backup_by_copy(self, path: Path, backup_path: Path) -> bool:
+        import shutil
+        copy = self._counting_copy if PROFILER.enabled else shutil.copy2
+        try:
+            PROFILER.count("stat")
+            if path.is_file():
+                copy(path, backup_path)
+            else:
+                shutil.copytree(path, backup_path, copy_function=copy)
+                
+            logger.info(f"Successfully backed up {path} to {backup_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error backing up {path}: {e}")
+            return False
+    
+    @staticmethod
+    def _counting_copy(source, target):
+        import shutil
+        PROFILER.count("bytes_copied", os.path.getsize(source))
+        return shutil.copy2(source, target)
+    
+    @staticmethod
+    def _same_volume(path: Path, directory: Path) -> bool:
+        PROFILER.count("stat", 2)
+        try:
+            return os.lstat(path).st_dev == os.stat(directory).st_dev
+        except OSError:
+            return False
+    
+    def _backup_by_move(self, path: Path, backup_path: Path) -> bool:
+        """Backup without copying data: rename the path into the backup, or hardlink its files.
+        
+        A rename takes the path away, so its deletion is then skipped. Files
+        that are open can make the rename fail on Windows; hardlinks keep the
+        data in the backup while the originals are deleted as usual.
+        """
+        import shutil
+        PROFILER.count("stat")
+        if backup_path.exists():
+            return False  # Never merge into, or clean up, an earlier backup
+            
+        try:
+            os.replace(path, backup_path)
+            self._moved.add(str(path))
+            logger.info(f"Successfully moved {path} to backup {backup_path}")
+            return True
+        except OSError as e:
+            logger.debug(f"Could not move {path} to {backup_path}: {e}")
+            
+        try:
+            if path.is_dir():
+                for directory, _, files in os.walk(path):
+                    PROFILER.count("scandir")
+                    target = backup_path / os.path.relpath(directory, path)
+                    target.mkdir(parents=True, exist_ok=True)
+                    for name in files:
+                        os.link(os.path.join(directory, name), target / name)
+            else:
+                os.link(path, backup_path)
+            logger.info(f"Successfully backed up {path} to {backup_path} (hardlinks)")
+            return True
+        except OSError as e:
+            logger.debug(f"Could not hardlink {path} into {backup_path}: {e}")
+            # Drop the partial links; the originals are untouched
+            if backup_path.is_dir():
+                shutil.rmtree(backup_path, ignore_errors=True)
+            elif backup_path.exists():
+                backup_path.unlink()
+            return False
+    
+    def _backup_to_store(self, path: Path) -> bool:
+        """Backup a file or directory into the chunk store, listed in this session's manifest."""
+        manifest = self.backup_dir / "manifest.jsonl"
+        if self.dry_run:
+            logger.info(f"DRY RUN: Would backup {path} to {self.backup_store.root} (manifest {manifest})")
             return True
             
         try:
-            if path.is_file():
-                shutil.copy2(path, backup_path)
-            else:
-                shutil.copytree(path, backup_path)
-                
-            logger.info(f"Successfully backed up {path} to {backup_path}")
+            entries = self.backup_store.backup(path, manifest)
+            logger.info(f"Successfully backed up {path} ({entries} entries) to {self.backup_store.root}")
             return True
-        except Exception as e:
+        except OSError as e:
             logger.error(f"Error backing up {path}: {e}")
             return False
     
     def remove_registry_entries(self, entries: List[Dict]) -> int:
         """Remove registry entries related to the application."""
-        count = 0
-        
-        for entry in entries:
-            reg_path = entry["Registry"]
-            
+        return self.delete_registry_keys([entry["Registry"] for entry in entries])
+    
+    def delete_registry_keys(self, key_paths: List[str], label: str = "registry key") -> int:
+        """Back up and delete registry keys in one native batch; returns the number removed."""
+        for key_path in key_paths:
             # Backup the registry key before deletion
             if self.backup:
-                self.backup_registry_key(reg_path)
-                
-            if self.dry_run:
-                logger.info(f"DRY RUN: Would delete registry key: {reg_path}")
+                self.backup_registry_key(key_path)
+        
+        if self.dry_run:
+            for key_path in key_paths:
+                logger.info(f"DRY RUN: Would delete {label}: {key_path}")
+            return len(key_paths)
+        
+        count = 0
+        for key_path, error in RegistryDeleter(self.registry.backend).delete(key_paths).items():
+            if error is None:
+                logger.info(f"Successfully deleted {label}: {key_path}")
                 count += 1
-                continue
-                
-            try:
-                # Parse the registry path to get the root key and subkey path
-                parts = reg_path.split("\\", 1)
-                if len(parts) != 2:
-                    logger.warning(f"Invalid registry path format: {reg_path}")
-                    continue
-                    
-                root_str, subkey = parts
-                
-                # Convert string representation to actual HKEY constant
-                root_key = None
-                if "HKEY_CURRENT_USER" in root_str:
-                    root_key = winreg.HKEY_CURRENT_USER
-                elif "HKEY_LOCAL_MACHINE" in root_str:
-                    root_key = winreg.HKEY_LOCAL_MACHINE
-                elif "HKEY_CLASSES_ROOT" in root_str:
-                    root_key = winreg.HKEY_CLASSES_ROOT
-                else:
-                    logger.warning(f"Unsupported registry root key: {root_str}")
-                    continue
-                
-                # Use reg delete command to remove the key
-                cmd = f'reg delete "{reg_path}" /f'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    logger.info(f"Successfully deleted registry key: {reg_path}")
-                    count += 1
-                else:
-                    logger.warning(f"Failed to delete registry key {reg_path}: {result.stderr}")
-            except Exception as e:
-                logger.error(f"Error deleting registry key {reg_path}: {e}")
-                
+            else:
+                logger.warning(f"Failed to delete {label} {key_path}: {error}")
         return count
     
-    def find_app_directories(self) -> List[Path]:
-        """Find directories related to the application."""
-        app_dirs = []
-        pattern = re.compile(rf"{re.escape(self.app_name)}", re.IGNORECASE)
+    def iter_app_directories(self) -> Iterator[Path]:
+        """Yield directories related to the application as they are found."""
+        if self.scan_index is not None and self.scan_index.covers_depth(1):
+            yield from self.scan_index.iter_find(self.app_name, ScanIndex.DIR, max_depth=1)
+            return
+            
+        matcher = NameMatcher([self.app_name])
         
         for location in self.common_data_locations:
             if not location.exists():
                 continue
                 
+            PROFILER.count("scandir")
             for path in location.glob("*"):
-                if pattern.search(path.name) and path.is_dir():
-                    app_dirs.append(path)
-                    
-        return app_dirs
+                if matcher.match(path.name) and path.is_dir():
+                    yield path
+    
+    def find_app_directories(self) -> List[Path]:
+        """Find directories related to the application."""
+        return list(self.iter_app_directories())
+    
+    def iter_app_files(self) -> Iterator[Path]:
+        """Yield files related to the application as they are found."""
+        # Files inside a directory that is already being removed are skipped
+        if self.scan_index is not None and self.scan_index.covers_depth(None):
+            for path in self.scan_index.iter_find(self.app_name, ScanIndex.FILE):
+                if self._removal_roots.covers(path):
+                    self.pruned["files"] += 1
+                    continue
+                yield path
+            return
+            
+        # No shared index: walk the locations for this application only,
+        # without descending into directories scheduled for removal
+        nested_root = nested_root_pruner(self.common_data_locations)
+        
+        def prune(path: str) -> bool:
+            if nested_root and nested_root(path):
+                return True
+            if self._removal_roots.covers(path):
+                self.pruned["subtrees"] += 1
+                return True
+            return False
+            
+        matcher = NameMatcher([self.app_name])
+        for directory, _, entries in iter_directory_listings(self.common_data_locations, workers=self.scan_workers,
+                                                             prune=prune):
+            for name, _, is_file in entries:
+                if is_file and matcher.match(name):
+                    yield Path(directory) / name
     
     def find_app_files(self) -> List[Path]:
         """Find files related to the application."""
-        app_files = []
-        pattern = re.compile(rf"{re.escape(self.app_name)}", re.IGNORECASE)
-        
-        for location in self.common_data_locations:
-            if not location.exists():
-                continue
-                
-            for path in location.rglob("*"):
-                if pattern.search(path.name) and path.is_file():
-                    app_files.append(path)
-                    
-        return app_files
+        return list(self.iter_app_files())
+    
+    def _schedule_directory(self, directory: Path) -> Optional[Path]:
+        """Reserve a directory for removal; None if an enclosing one already is."""
+        if not self._removal_roots.add(directory):
+            self.pruned["directories"] += 1
+            return None
+        return directory
+    
+    def _backup_before_removal(self, path: Path) -> Optional[Path]:
+        """Backup a path that is about to be removed; None if it is already gone."""
+        PROFILER.count("stat")
+        if not path.exists():
+            return None
+            
+        if self.backup:
+            self.backup_file_or_directory(path)
+            
+        return path
+    
+    def _delete_directory(self, directory: Path) -> Optional[Path]:
+        """Delete a single directory tree; None if it could not be removed."""
+        import shutil
+        if self.dry_run:
+            logger.info(f"DRY RUN: Would remove directory: {directory}")
+            return directory
+            
+        if str(directory) in self._moved:
+            return directory  # Already moved into the backup
+            
+        if self.delete_workers > 1:
+            errors = ParallelDeleter(self.delete_workers).delete_tree(directory)
+            for path, error in errors:
+                logger.error(f"Error removing {path}: {error}")
+            if errors:
+                logger.error(f"Error removing directory {directory}: {len(errors)} paths could not be removed")
+                return None
+            logger.info(f"Successfully removed directory: {directory}")
+            return directory
+            
+        try:
+            shutil.rmtree(directory)
+            logger.info(f"Successfully removed directory: {directory}")
+            return directory
+        except Exception as e:
+            logger.error(f"Error removing directory {directory}: {e}")
+            return None
+    
+    def _delete_file(self, file_path: Path) -> Optional[Path]:
+        """Delete a single file; None if it could not be removed."""
+        if self.dry_run:
+            logger.info(f"DRY RUN: Would remove file: {file_path}")
+            return file_path
+            
+        if str(file_path) in self._moved:
+            return file_path  # Already moved into the backup
+            
+        try:
+            file_path.unlink()
+            logger.info(f"Successfully removed file: {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Error removing file {file_path}: {e}")
+            return None
     
     def remove_directories(self, directories: List[Path]) -> int:
         """Remove directories related to the application."""
         count = 0
         
-        for directory in directories:
-            if not directory.exists():
-                continue
-                
-            # Backup directory before deletion
-            if self.backup:
-                self.backup_file_or_directory(directory)
-                
-            if self.dry_run:
-                logger.info(f"DRY RUN: Would remove directory: {directory}")
-                count += 1
-                continue
-                
-            try:
-                shutil.rmtree(directory)
-                logger.info(f"Successfully removed directory: {directory}")
+        roots = PathTrie.minimal_roots(directories)
+        self.pruned["directories"] += len(directories) - len(roots)
+        
+        for directory in roots:
+            if (self._schedule_directory(directory) and self._backup_before_removal(directory)
+                    and self._delete_directory(directory)):
                 count += 1
-            except Exception as e:
-                logger.error(f"Error removing directory {directory}: {e}")
                 
         return count
     
@@ -387,100 +3018,102 @@ class AppUninstaller:
         count = 0
         
         for file_path in files:
-            if not file_path.exists():
-                continue
-                
-            # Backup file before deletion
-            if self.backup:
-                self.backup_file_or_directory(file_path)
-                
-            if self.dry_run:
-                logger.info(f"DRY RUN: Would remove file: {file_path}")
-                count += 1
+            if self._removal_roots.covers(file_path):
+                self.pruned["files"] += 1
                 continue
                 
-            try:
-                file_path.unlink()
-                logger.info(f"Successfully removed file: {file_path}")
+            if self._backup_before_removal(file_path) and self._delete_file(file_path):
                 count += 1
-            except Exception as e:
-                logger.error(f"Error removing file {file_path}: {e}")
                 
         return count
     
+    def stream_removal(self, candidates: Iterable[Path], delete: Callable[[Path], Optional[Path]]) -> Tuple[int, int]:
+        """Backup and delete candidates while they are still being found.
+        
+        Returns (candidates found, candidates removed). In dry-run mode backup
+        and delete share one stage so the log reads exactly like the batch path.
+        """
+        if self.dry_run:
+            stages = [lambda path: self._backup_before_removal(path) and delete(path)]
+        else:
+            stages = [self._backup_before_removal, delete]
+        return StreamingPipeline(stages).run(candidates)
+    
     def clean_registry(self) -> int:
         """Clean registry entries that might contain references to the app."""
-        count = 0
-        pattern = re.compile(rf"{re.escape(self.app_name)}", re.IGNORECASE)
-        
         if not self.thorough:
             return 0
-            
-        # Additional registry locations to check for thorough cleaning
-        locations = [
-            (winreg.HKEY_CURRENT_USER, "Software"),
-            (winreg.HKEY_LOCAL_MACHINE, "Software"),
-            (winreg.HKEY_CURRENT_USER, "Software\\Classes"),
-            (winreg.HKEY_LOCAL_MACHINE, "Software\\Classes")
-        ]
-        
-        for hkey, base_path in locations:
-            try:
-                with winreg.OpenKey(hkey, base_path) as key:
-                    self._scan_registry_recursively(hkey, base_path, pattern, depth=0)
-            except Exception as e:
-                logger.debug(f"Error accessing registry key {hkey}\\{base_path}: {e}")
-                
-        return count
+        return self.apply_registry_cleanup(self.plan_registry_cleanup())
     
-    def _scan_registry_recursively(self, hkey, path, pattern, depth=0, max_depth=2):
-        """Scan registry recursively for app references."""
-        if depth > max_depth:
-            return 0
-            
-        count = 0
+    def plan_registry_cleanup(self) -> List[Dict]:
+        """Find the registry keys the thorough scan would delete, without changing anything.
         
-        try:
-            with winreg.OpenKey(hkey, path) as key:
-                # Check if the current key name matches the pattern
-                if pattern.search(path.split("\\")[-1]):
-                    # Found a matching key
-                    full_path = f"{hkey}\\{path}"
-                    
-                    # Backup the registry key before deletion
-                    if self.backup:
-                        self.backup_registry_key(full_path)
-                        
-                    if self.dry_run:
-                        logger.info(f"DRY RUN: Would delete registry key (deep scan): {full_path}")
-                        return 1
-                        
-                    try:
-                        cmd = f'reg delete "{full_path}" /f'
-                        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                        
-                        if result.returncode == 0:
-                            logger.info(f"Successfully deleted registry key (deep scan): {full_path}")
-                            return 1
-                        else:
-                            logger.warning(f"Failed to delete registry key {full_path}: {result.stderr}")
-                    except Exception as e:
-                        logger.error(f"Error deleting registry key {full_path}: {e}")
-                
-                # Enumerate subkeys
-                subkey_count = winreg.QueryInfoKey(key)[0]
-                for i in range(subkey_count):
-                    try:
-                        subkey_name = winreg.EnumKey(key, i)
-                        subpath = f"{path}\\{subkey_name}"
-                        count += self._scan_registry_recursively(hkey, subpath, pattern, depth + 1, max_depth)
-                    except WindowsError:
-                        continue
-        except Exception as e:
-            logger.debug(f"Error accessing registry key {hkey}\\{path}: {e}")
+        Returns one {"hive", "path", "depth", "reason"} dict per key; depth
+        counts the levels below the scanned root (Software or Software\\Classes).
+        """
+        # The batch shares one index; a single uninstall builds its own
+        index = self.registry_index
+        shared = index is not None
+        if index is None:
+            index = self.registry_index = RegistryKeyIndex.build(self.registry.backend, workers=self.registry.workers)
+        logger.info(f"Deep registry scan: {len(index)} keys indexed, {index.handles_opened} keys opened "
+                    f"in {index.elapsed:.3f}s{' (shared by the batch)' if shared else ''}")
+        
+        matches = index.find_with_depth(self.app_name)
+        if shared:
+            # Official uninstallers and earlier uninstalls remove keys after the index is built
+            existing = set(self._existing_keys([key_path for key_path, _ in matches]))
+            matches = [(key_path, depth) for key_path, depth in matches if key_path in existing]
             
+        plan = []
+        for key_path, depth in matches:
+            hive, _, path = key_path.partition("\\")
+            name = path.rsplit("\\", 1)[-1]
+            how = "is" if name.lower() == self.app_name.lower() else "contains"
+            plan.append({"hive": hive, "path": path, "depth": depth, "reason": f"key name {how} '{self.app_name}'"})
+        return plan
+    
+    def apply_registry_cleanup(self, plan: List[Dict]) -> int:
+        """Back up and delete the keys of a plan in one batch; returns the number removed."""
+        if not plan:
+            return 0
+        key_paths = [f"{entry['hive']}\\{entry['path']}" for entry in plan]
+        count = self.delete_registry_keys(key_paths, label="registry key (deep scan)")
+        if not self.dry_run and self.registry_index is not None:
+            self.registry_index.forget(key_paths)
         return count
     
+    def _existing_keys(self, key_paths: List[str]) -> List[str]:
+        """Return the key paths that are still in the registry."""
+        backend = self.registry.backend
+        existing = []
+        for key_path in key_paths:
+            hive, _, sub_key = key_path.partition("\\")
+            try:
+                with backend.open_key(hive, sub_key):
+                    existing.append(key_path)
+            except OSError:
+                logger.debug(f"Registry key already removed: {key_path}")
+        return existing
+    
+    def _scan_registry_recursively(self, hkey, path, matcher, depth=0, max_depth=2) -> List[str]:
+        """Scan registry recursively for app references; returns the matching key paths."""
+        index = RegistryKeyIndex.build(self.registry.backend, [(hkey, path)], max_depth=max_depth - depth, workers=1)
+        index.prime(matcher)
+        found = []
+        for app_name in matcher.app_names:
+            found.extend(index.find(app_name))
+        return list(dict.fromkeys(found))
+    
+    def claimed_paths(self) -> List[str]:
+        """Registry keys and paths this uninstall is going to delete (used to schedule batches)."""
+        claims = [entry["Registry"] for entry in self.find_uninstall_string()]
+        claims.extend(str(path) for path in self.find_app_directories())
+        if self.thorough:
+            claims.extend(str(path) for path in self.find_app_files())
+            claims.extend(f"{entry['hive']}\\{entry['path']}" for entry in self.plan_registry_cleanup())
+        return claims
+    
     def uninstall(self) -> Dict:
         """Perform the complete uninstallation process."""
         results = {
@@ -489,55 +3122,118 @@ class AppUninstaller:
             "files_removed": 0,
             "uninstaller_executed": False
         }
+        prescanned = None
+        phases = {}  # Step name -> seconds, with --profile
         
-        # Step 1: Find uninstall entries in registry
-        logger.info(f"Searching for {self.app_name} in Windows registry...")
-        uninstall_entries = self.find_uninstall_string()
-        
-        if not uninstall_entries:
-            logger.warning(f"No uninstall entries found for {self.app_name}")
-        else:
-            logger.info(f"Found {len(uninstall_entries)} uninstall entries")
+        # Counters of this application alone, also when others of the batch run alongside
+        with PROFILER.span("uninstall", app=self.app_name) as uninstall_span, PROFILER.scope() as counters:
+            # Step 1: Find uninstall entries in registry
+            logger.info(f"Searching for {self.app_name} in Windows registry...")
+            with PROFILER.span("registry lookup", app=self.app_name) as span:
+                uninstall_entries = self.find_uninstall_string()
+            phases["registry lookup"] = span.elapsed
             
-            # Step 2: Run the uninstaller if found
-            for entry in uninstall_entries:
-                logger.info(f"Found application: {entry.get('DisplayName', 'Unknown')}")
+            if not uninstall_entries:
+                logger.warning(f"No uninstall entries found for {self.app_name}")
+            else:
+                logger.info(f"Found {len(uninstall_entries)} uninstall entries")
+                
+                for entry in uninstall_entries:
+                    logger.info(f"Found application: {entry.get('DisplayName', 'Unknown')}")
+                    
+                # Step 2: Run the uninstaller if found, pre-scanning the filesystem meanwhile
+                if any(entry.get("UninstallString") or entry.get("QuietUninstallString") for entry in uninstall_entries):
+                    import asyncio
+                    with PROFILER.span("official uninstaller", app=self.app_name) as span:
+                        results["uninstaller_executed"], prescanned = asyncio.run(
+                            self.run_official_uninstallers(uninstall_entries))
+                    phases["official uninstaller"] = span.elapsed
+                    
+            # Step 3: Remove registry entries
+            if uninstall_entries:
+                with PROFILER.span("registry delete", app=self.app_name) as span:
+                    results["registry_entries_removed"] = self.remove_registry_entries(uninstall_entries)
+                phases["registry delete"] = span.elapsed
+                
+                # These entries are handled now (or removed by the official uninstaller),
+                # so later applications of the batch must not match them again
+                if not self.dry_run:
+                    for entry in uninstall_entries:
+                        self.registry.forget(entry["Registry"])
                 
-                if "UninstallString" in entry and entry["UninstallString"]:
-                    if self.run_uninstaller(entry["UninstallString"]):
-                        results["uninstaller_executed"] = True
-                        
-        # Step 3: Remove registry entries
-        if uninstall_entries:
-            results["registry_entries_removed"] = self.remove_registry_entries(uninstall_entries)
-            
-        # Step 4: Find and remove application directories
-        logger.info(f"Searching for {self.app_name} directories...")
-        app_dirs = self.find_app_directories()
-        
-        if app_dirs:
-            logger.info(f"Found {len(app_dirs)} directories")
-            results["directories_removed"] = self.remove_directories(app_dirs)
+            # Step 4: Find and remove application directories
+            logger.info(f"Searching for {self.app_name} directories...")
+            with PROFILER.span("directories", app=self.app_name) as span:
+                self._remove_app_directories(prescanned, results)
+            phases["directories"] = span.elapsed
+                
+            # Step 5: Find and remove application files
+            if self.thorough:
+                logger.info(f"Searching for {self.app_name} files (thorough mode)...")
+                with PROFILER.span("files", app=self.app_name) as span:
+                    self._remove_app_files(prescanned, results)
+                phases["files"] = span.elapsed
+                    
+            # Step 6: Clean registry (thorough mode)
+            if self.thorough:
+                logger.info(f"Scanning registry for additional {self.app_name} entries (thorough mode)...")
+                with PROFILER.span("deep registry plan", app=self.app_name) as span:
+                    plan = self.plan_registry_cleanup()
+                results["registry_plan_seconds"] = phases["deep registry plan"] = span.elapsed
+                with PROFILER.span("deep registry apply", app=self.app_name, keys=len(plan)) as span:
+                    results["registry_keys_applied"] = self.apply_registry_cleanup(plan)
+                results["registry_apply_seconds"] = phases["deep registry apply"] = span.elapsed
+                results["registry_cleanup_plan"] = plan
+                results["registry_scan_keys"] = len(self.registry_index)
+                results["registry_scan_handles"] = self.registry_index.handles_opened
+                results["registry_scan_seconds"] = self.registry_index.elapsed
+                
+            if PROFILER.enabled:
+                uninstall_span.args.update(counters)
+                
+        results["pruned_directories"] = self.pruned["directories"]
+        results["pruned_files"] = self.pruned["files"]
+        results["pruned_subtrees"] = self.pruned["subtrees"]
+        results["uninstallers_timed_out"] = self.uninstallers_timed_out
+        if PROFILER.enabled:
+            results["profile_phases"] = phases
+            results["profile_counters"] = {name: value for name, value in counters.items() if value}
+        return results
+    
+    def _remove_app_directories(self, prescanned: Optional[Tuple[List[Path], List[Path]]], results: Dict) -> None:
+        directories = prescanned[0] if prescanned else self.iter_app_directories()
+        if self.streaming:
+            scheduled = filter(None, map(self._schedule_directory, directories))
+            found, results["directories_removed"] = self.stream_removal(scheduled, self._delete_directory)
+            if found:
+                logger.info(f"Found {found} directories")
+            else:
+                logger.info(f"No directories found for {self.app_name}")
         else:
-            logger.info(f"No directories found for {self.app_name}")
+            app_dirs = list(directories)
             
-        # Step 5: Find and remove application files
-        if self.thorough:
-            logger.info(f"Searching for {self.app_name} files (thorough mode)...")
-            app_files = self.find_app_files()
+            if app_dirs:
+                logger.info(f"Found {len(app_dirs)} directories")
+                results["directories_removed"] = self.remove_directories(app_dirs)
+            else:
+                logger.info(f"No directories found for {self.app_name}")
+    
+    def _remove_app_files(self, prescanned: Optional[Tuple[List[Path], List[Path]]], results: Dict) -> None:
+        if self.streaming:
+            files = self._unclaimed_files(prescanned[1]) if prescanned else self.iter_app_files()
+            found, results["files_removed"] = self.stream_removal(files, self._delete_file)
+            if found:
+                logger.info(f"Found {found} files")
+            else:
+                logger.info(f"No files found for {self.app_name}")
+        else:
+            app_files = prescanned[1] if prescanned else self.find_app_files()
             
             if app_files:
                 logger.info(f"Found {len(app_files)} files")
                 results["files_removed"] = self.remove_files(app_files)
             else:
                 logger.info(f"No files found for {self.app_name}")
-                
-        # Step 6: Clean registry (thorough mode)
-        if self.thorough:
-            logger.info(f"Scanning registry for additional {self.app_name} entries (thorough mode)...")
-            self.clean_registry()
-            
-        return results
     
     def generate_report(self, results: Dict) -> str:
         """Generate a detailed report of the uninstallation process."""
@@ -554,12 +3250,45 @@ class AppUninstaller:
             f"- Directories Removed: {results['directories_removed']}",
             f"- Files Removed: {results['files_removed']}",
             f"- Official Uninstaller Executed: {'Yes' if results['uninstaller_executed'] else 'No'}",
+        ]
+        if 'registry_scan_keys' in results:
+            plan = results['registry_cleanup_plan']
+            report.extend([
+                f"- Deep Registry Scan: {results['registry_scan_keys']} keys indexed, "
+                f"{results['registry_scan_handles']} keys opened in {results['registry_scan_seconds']:.2f}s",
+                f"- Deep Scan Registry Keys: {len(plan)} planned in {results['registry_plan_seconds']:.2f}s, "
+                f"{results['registry_keys_applied']} removed in {results['registry_apply_seconds']:.2f}s",
+            ])
+            for entry in plan:
+                report.append(f"    {entry['hive']}\\{entry['path']} (depth {entry['depth']}, {entry['reason']})")
+        if results.get('uninstallers_timed_out'):
+            report.append(f"- Official Uninstallers Killed After {self.uninstaller_timeout}s: "
+                          f"{results['uninstallers_timed_out']}")
+        
+        # Paths that were skipped because an enclosing directory was removed
+        pruned_paths = results.get('pruned_directories', 0) + results.get('pruned_files', 0)
+        if pruned_paths or results.get('pruned_subtrees', 0):
+            report.extend([
+                f"- Paths Skipped Inside Removed Folders: {results.get('pruned_directories', 0)} directories, "
+                f"{results.get('pruned_files', 0)} files",
+                f"- Removed Folders Not Rescanned: {results.get('pruned_subtrees', 0)}",
+            ])
+            
+        # Step times and operation counts, with --profile
+        if 'profile_phases' in results:
+            report.append("- Step Times: " + ", ".join(f"{phase} {seconds:.3f}s"
+                                                     for phase, seconds in results['profile_phases'].items()))
+            for name, label in Profiler.COUNTERS.items():
+                report.append(f"- {label}: {results['profile_counters'].get(name, 0)}")
+            
+        report.extend([
             "",
             "Summary:",
-        ]
+        ])
         
         # Calculate total items removed
         total_removed = (results['registry_entries_removed'] + 
+                          results.get('registry_keys_applied', 0) +
                           results['directories_removed'] + 
                           results['files_removed'])
         
@@ -582,31 +3311,452 @@ class AppUninstaller:
         ])
         
         if self.backup:
-            report.extend([
-                f"Backup location: {os.path.abspath(str(self.backup_dir))}",
-                "==============================================",
-            ])
+            report.append(f"Backup location: {os.path.abspath(str(self.backup_dir))}")
+            if self.backup_mode == "store":
+                store = self.backup_store
+                report.append(f"File backups: {os.path.abspath(str(store.root))} "
+                              f"({store.chunks_new} new chunks, {store.chunks_reused} reused, "
+                              f"{store.bytes_written} bytes written for {store.bytes_read} bytes backed up in this run)")
+            report.append("==============================================")
             
         return "\n".join(report)
 
+# Official uninstallers run one at a time, whatever the number of jobs:
+# Windows Installer allows a single install or uninstall per machine
+OFFICIAL_UNINSTALLER_LOCK = threading.Lock()
+
+# Wait for a threading lock without blocking the event loop. Every job has an event
+# loop of its own, so an asyncio.Lock could not be shared; when the wait is cancelled
+# (Ctrl-C, a cancelled job) the waiting thread hands the lock back once it gets it.
+async def acquire_thread_lock(lock: threading.Lock) -> None:
+    import asyncio
+    pool = ThreadPoolExecutor(max_workers=1)
+    acquired = pool.submit(lock.acquire)
+    pool.shutdown(wait=False)
+    try:
+        await asyncio.wrap_future(acquired)
+    except asyncio.CancelledError:
+        acquired.add_done_callback(lambda future: future.cancelled() or lock.release())
+        raise
+
+class UninstallScheduler:
+    """Runs the uninstalls of a batch concurrently where they cannot interfere.
+    
+    Before anything is removed, every uninstaller reports the registry keys
+    and paths it will delete (claimed_paths()). Two applications conflict
+    when a claim of one is equal to, inside, or above a claim of the other,
+    or when one name contains the other (their thorough scans would match
+    the same leftovers). An application starts once every conflicting
+    application before it in the batch has finished, on up to `jobs`
+    threads; independent ones run side by side. The official uninstallers
+    stay serialized by OFFICIAL_UNINSTALLER_LOCK. With a single job the
+    batch simply runs in order and no claims are collected.
+    
+    Uninstallers are duck-typed (app_name, claimed_paths(), uninstall(),
+    generate_report()), so fakes can stand in for AppUninstaller.
+    """
+
+    def __init__(self, uninstallers: List, jobs: int = 1):
+        self.uninstallers = uninstallers
+        self.jobs = max(1, jobs)
+        self.waits_for: Optional[List[List[int]]] = None  # Earlier conflicting applications, per application
+        self.results: Dict[str, Dict] = {}
+        self.errors: Dict[str, str] = {}
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _claim_parts(claim: str) -> Tuple[str, ...]:
+        return tuple(part for part in claim.replace("/", "\\").lower().split("\\") if part)
+
+    def plan(self) -> List[List[int]]:
+        """Find, for every application, the earlier applications whose claims overlap its own."""
+        claims = []
+        for uninstaller in self.uninstallers:
+            parts = {self._claim_parts(str(claim)) for claim in uninstaller.claimed_paths()}
+            prefixes = {claim[:i] for claim in parts for i in range(1, len(claim) + 1)}
+            claims.append((uninstaller.app_name.lower(), parts, prefixes))
+            
+        def conflict(a, b) -> bool:
+            name_a, parts_a, prefixes_a = a
+            name_b, parts_b, prefixes_b = b
+            if name_a in name_b or name_b in name_a:
+                return True
+            # A claim of one is a prefix of (inside or equal to) a claim of the other
+            return any(claim in prefixes_b for claim in parts_a) or any(claim in prefixes_a for claim in parts_b)
+            
+        self.waits_for = [[j for j in range(i) if conflict(claims[i], claims[j])] for i in range(len(claims))]
+        return self.waits_for
+
+    def _run_one(self, uninstaller) -> Tuple[object, Optional[Dict], Optional[str]]:
+        try:
+            return uninstaller, uninstaller.uninstall(), None
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while uninstalling {uninstaller.app_name}: {e}")
+            return uninstaller, None, str(e)
+
+    def run(self) -> Iterator[Tuple[object, Optional[Dict], Optional[str]]]:
+        """Uninstall everything; yields (uninstaller, results or None, error or None) as each one finishes."""
+        start = time.perf_counter()
+        # One job runs the batch in order, so the claims are not needed
+        if self.waits_for is None and self.jobs > 1:
+            self.plan()
+        try:
+            if self.jobs == 1:
+                for uninstaller in self.uninstallers:
+                    outcome = self._run_one(uninstaller)
+                    self._record(outcome)
+                    yield outcome
+                return
+                
+            waiting = list(range(len(self.uninstallers)))
+            finished: Set[int] = set()
+            running = {}
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                try:
+                    while waiting or running:
+                        # Start, in batch order, whatever no longer waits for an unfinished application
+                        for i in list(waiting):
+                            if len(running) >= self.jobs:
+                                break
+                            if all(j in finished for j in self.waits_for[i]):
+                                waiting.remove(i)
+                                running[pool.submit(self._run_one, self.uninstallers[i])] = i
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            finished.add(running.pop(future))
+                            outcome = future.result()
+                            self._record(outcome)
+                            yield outcome
+                finally:
+                    for future in running:
+                        future.cancel()
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _record(self, outcome) -> None:
+        uninstaller, results, error = outcome
+        if error is None:
+            self.results[uninstaller.app_name] = results
+        else:
+            self.errors[uninstaller.app_name] = error
+
+    def generate_report(self) -> str:
+        """Aggregate the results of the batch."""
+        totals = {"registry_entries_removed": 0, "registry_keys_applied": 0, "directories_removed": 0,
+                  "files_removed": 0}
+        planned = 0
+        executed = 0
+        lines = [
+            "==============================================",
+            f"Batch Uninstallation Report ({len(self.uninstallers)} applications)",
+            "==============================================",
+            f"Jobs: {self.jobs}, ordered pairs: {sum(map(len, self.waits_for or []))}, wall time: {self.elapsed:.1f}s",
+            "",
+            "Applications:",
+        ]
+        for uninstaller in self.uninstallers:
+            name = uninstaller.app_name
+            if name in self.errors:
+                lines.append(f"- {name}: FAILED ({self.errors[name]})")
+                continue
+            results = self.results.get(name)
+            if results is None:
+                lines.append(f"- {name}: not processed")
+                continue
+            for key in totals:
+                totals[key] += results.get(key, 0)
+            executed += bool(results.get("uninstaller_executed"))
+            planned += len(results.get("registry_cleanup_plan", []))
+            lines.append(f"- {name}: {results.get('registry_entries_removed', 0)} registry entries, "
+                         + (f"{results['registry_keys_applied']} deep-scan registry keys, "
+                            if "registry_keys_applied" in results else "") +
+                         f"{results.get('directories_removed', 0)} directories, "
+                         f"{results.get('files_removed', 0)} files"
+                         + (", official uninstaller executed" if results.get("uninstaller_executed") else ""))
+        lines.extend([
+            "",
+            "Totals:",
+            f"- Registry Entries Removed: {totals['registry_entries_removed']}",
+            f"- Deep Scan Registry Keys: {planned} planned, {totals['registry_keys_applied']} removed",
+            f"- Directories Removed: {totals['directories_removed']}",
+            f"- Files Removed: {totals['files_removed']}",
+            f"- Official Uninstallers Executed: {executed}",
+            f"- Failed: {len(self.errors)}",
+        ])
+        if PROFILER.enabled:
+            lines.extend(f"- {label}: {PROFILER.counters.get(name, 0)}" for name, label in Profiler.COUNTERS.items())
+        lines.append("==============================================")
+        return "\n".join(lines)
+
 def parse_arguments():
+    import argparse
     parser = argparse.ArgumentParser(description="Advanced Application Uninstaller and Cleaner")
     parser.add_argument("--app-name", help="Name of the application to uninstall (optional)")
     parser.add_argument("--thorough", "-t", action="store_true", help="Enable thorough cleaning mode")
     parser.add_argument("--dry-run", "-d", action="store_true", help="Preview changes without actually deleting anything")
     parser.add_argument("--no-backup", "-n", action="store_true", help="Disable backup creation")
     parser.add_argument("--list-only", "-l", action="store_true", help="Only list installed applications without uninstalling")
+    parser.add_argument("--format", choices=["text", "jsonl", "json", "csv"], default="text",
+                        help="Output format of --list-only (default: text); jsonl, json and csv stream unsorted records")
+    parser.add_argument("--fields", type=lambda value: [field.strip() for field in value.split(",") if field.strip()],
+                        metavar="NAMES",
+                        help=f"Comma-separated fields for jsonl/json/csv output (default: {','.join(APPLICATION_FIELDS)}); "
+                             "any registry value name can be used")
+    parser.add_argument("--find-orphans", action="store_true",
+                        help="List the folders at the top of the data locations that no installed application "
+                             "claims, with their sizes (output format as in --format)")
+    parser.add_argument("--size", choices=SIZE_SOURCES,
+                        help="Show the size of every application: the EstimatedSize recorded by its setup, or its "
+                             "install folder plus leftover folders measured on disk (slower)")
+    parser.add_argument("--sort", choices=["name", "size"], default="name",
+                        help="Order of --list-only and the selection menu (default: name); "
+                             "size lists the largest first, using --size (estimated when not given)")
+    parser.add_argument("--scan-workers", type=int, default=DEFAULT_SCAN_WORKERS, metavar="N",
+                        help=f"Number of threads used to scan folders (default: {DEFAULT_SCAN_WORKERS}, 1 disables parallel scanning)")
+    parser.add_argument("--scan-cache", default=DEFAULT_SCAN_CACHE, metavar="PATH",
+                        help=f"File used to cache folder listings between runs (default: {DEFAULT_SCAN_CACHE})")
+    parser.add_argument("--scan-cache-max-mb", type=int, default=DEFAULT_SCAN_CACHE_MAX_MB, metavar="MB",
+                        help=f"Maximum size of the scan cache file (default: {DEFAULT_SCAN_CACHE_MAX_MB})")
+    parser.add_argument("--no-scan-cache", action="store_true", help="Do not read or write the scan cache")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="Number of applications cleaned up concurrently (default: 1); "
+                             "official uninstallers always run one at a time")
+    parser.add_argument("--delete-workers", type=int, default=DEFAULT_DELETE_WORKERS, metavar="N",
+                        help=f"Number of threads used to delete a folder tree (default: {DEFAULT_DELETE_WORKERS}, 1 uses shutil.rmtree)")
+    parser.add_argument("--uninstaller-timeout", type=float, default=DEFAULT_UNINSTALLER_TIMEOUT, metavar="SECONDS",
+                        help=f"Kill an official uninstaller and its child processes after this many seconds "
+                             f"(default: {DEFAULT_UNINSTALLER_TIMEOUT}, 0 waits forever)")
+    parser.add_argument("--registry-depth", type=int, default=DEFAULT_DEEP_SCAN_DEPTH, metavar="N",
+                        help=f"Levels of subkeys the thorough registry scan looks at below Software and "
+                             f"Software\\Classes (default: {DEFAULT_DEEP_SCAN_DEPTH})")
+    parser.add_argument("--registry-include", action="append", default=[], metavar="KEY",
+                        help="Scan a subtree the thorough registry scan skips by default, e.g. CLSID or "
+                             "Microsoft\\Windows (can be repeated)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Time every step and count file system, registry and process operations; "
+                             "writes a Chrome trace-event JSON file (open it in chrome://tracing or ui.perfetto.dev)")
+    parser.add_argument("--backup-mode", choices=BACKUP_MODES, default="copy",
+                        help="How files are backed up: plain copies, a deduplicating compressed chunk store, "
+                             "or moving them into the backup folder when it is on the same volume (default: copy)")
+    parser.add_argument("--backup-store", default=DEFAULT_BACKUP_STORE, metavar="PATH",
+                        help=f"Chunk store shared by all uninstalls in store mode (default: {DEFAULT_BACKUP_STORE})")
     return parser.parse_args()
 
-def display_app_selection_menu(apps: List[Dict]) -> List[int]:
-    """Display a menu of installed applications and return the selected indices."""
+# Fields the search of the selection menu looks at
+MENU_SEARCH_FIELDS = ["DisplayName", "Publisher", "DisplayVersion"]
+
+class AppSearchIndex:
+    """Type-to-filter search over the applications of the selection menu.
+
+    The lower-cased DisplayName, Publisher and DisplayVersion of every
+    application are joined into one search text when the menu opens, and
+    every trigram of the texts points to the applications containing it. An
+    application matches when its text contains the query; the trigrams narrow
+    the texts that have to be checked. Applications that only share most of
+    the query's trigrams (a typo, or the start of several words) are ranked
+    after them as fuzzy matches. The results of the previous keystrokes are
+    kept, so each key press only rechecks the matches of the longest query
+    typed before.
+    """
+
+    FUZZY_MIN_LENGTH = 3  # Shorter queries share a trigram with almost everything
+    FUZZY_THRESHOLD = 0.5  # Share of the query's trigrams a fuzzy match must contain
+
+    def __init__(self, apps: List[Dict]):
+        self.names = [str(app.get("DisplayName", "")).lower() for app in apps]
+        # Spaces around the fields, so words start and end with a trigram of their own
+        self.texts = [" " + " \0 ".join(str(app.get(field, "")).lower() for field in MENU_SEARCH_FIELDS) + " "
+                      for app in apps]
+        postings = defaultdict(list)
+        slices = [slice(i, i + 3) for i in range(max(map(len, self.texts), default=0))]
+        for idx, text in enumerate(self.texts):
+            for trigram in set(map(text.__getitem__, slices[:len(text) - 2])):
+                postings[trigram].append(idx)
+        self.trigrams: Dict[str, List[int]] = dict(postings)
+        # The padding puts a character after every pair of characters, so the trigrams
+        # starting with a pair lead to all texts containing it
+        self._bigrams: Dict[str, List[str]] = {}
+        for trigram in self.trigrams:
+            self._bigrams.setdefault(trigram[:2], []).append(trigram)
+        # Sorted names and name words, so prefix matches are a bisect away
+        tokens = sorted((token, idx) for idx, name in enumerate(self.names) for token in re.findall(r"[^\W_]+", name))
+        self._tokens = [token for token, _ in tokens]
+        self._token_apps = [idx for _, idx in tokens]
+        self._name_apps = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self._sorted_names = [self.names[idx] for idx in self._name_apps]
+        self._posting_sets: Dict[str, Set[int]] = {}  # Trigrams of fuzzy queries found in many texts
+        everything = list(range(len(self.names)))
+        # Query -> (substring matches, ranked result), for the prefixes of the last query
+        self._cache: Dict[str, Tuple[List[int], List[int]]] = {"": (everything, everything)}
+
+    def search(self, query: str) -> List[int]:
+        """Return the indices of the matching applications, best match first."""
+        query = query.strip().lower()
+        cached = self._cache.get(query)
+        if cached is None:
+            cached = self._narrow(query)
+            self._cache = {key: value for key, value in self._cache.items() if query.startswith(key)}
+            self._cache[query] = cached
+        return cached[1]
+
+    def substring_matches(self, query: str) -> List[int]:
+        """Return the indices of the applications that contain the query, without the fuzzy ones."""
+        self.search(query)
+        return self._cache[query.strip().lower()][0]
+
+    def _narrow(self, query: str) -> Tuple[List[int], List[int]]:
+        if len(query) == 2:
+            hits = sorted(set().union(*(self.trigrams[trigram] for trigram in self._bigrams.get(query, ()))))
+        else:
+            # Every match of the query also matches its longest cached prefix; the rarest
+            # trigram may narrow further
+            prefix = next(query[:k] for k in range(len(query) - 1, -1, -1) if query[:k] in self._cache)
+            candidates = self._cache[prefix][0]
+            if len(query) >= 3:
+                rarest = min((self.trigrams.get(query[i:i + 3], []) for i in range(len(query) - 2)), key=len)
+                if len(rarest) < len(candidates):
+                    candidates = rarest
+            texts = self.texts
+            hits = [idx for idx in candidates if query in texts[idx]]
+        
+        fuzzy = self._fuzzy(query, set(hits)) if len(query) >= self.FUZZY_MIN_LENGTH else []
+        return hits, self._rank(query, hits) + fuzzy
+
+    def _fuzzy(self, query: str, exclude: Set[int]) -> List[int]:
+        """Applications sharing most trigrams of the query, the most similar first."""
+        padded = f" {query} "
+        postings = self.trigrams
+        trigrams = sorted({padded[i:i + 3] for i in range(len(padded) - 2)}, key=lambda t: len(postings.get(t, ())))
+        needed = math.ceil(self.FUZZY_THRESHOLD * len(trigrams))
+        # A match contains at least one of the rarest len - needed + 1 trigrams; the other,
+        # common ones are only looked up for the applications found that way
+        split = len(trigrams) - needed + 1
+        shared = Counter()
+        for trigram in trigrams[:split]:
+            shared.update(postings.get(trigram, ()))
+        for trigram in trigrams[split:]:
+            common = self._posting_sets.get(trigram)
+            if common is None:
+                common = self._posting_sets[trigram] = set(postings.get(trigram, ()))
+            shared.update(common.intersection(shared))
+        scored = sorted((-count, idx) for idx, count in shared.items() if count >= needed and idx not in exclude)
+        return [idx for _, idx in scored]
+
+    def _rank(self, query: str, hits: List[int]) -> List[int]:
+        """Order substring matches: name starts with the query, a word of the name does, the name
+        contains it, only the publisher or version does; otherwise in menu order."""
+        if not query:
+            return hits
+        end = query + "\uffff"
+        starts = set(self._name_apps[bisect_left(self._sorted_names, query):bisect_left(self._sorted_names, end)])
+        # Names starting with the query, and names with a word starting with it, always contain it
+        if len(query) == 1:
+            # A single letter is in almost every text: only the names starting with it go first
+            return sorted(starts) + list(filterfalse(starts.__contains__, hits))
+        words = set(self._token_apps[bisect_left(self._tokens, query):bisect_left(self._tokens, end)])
+        ranked = sorted(starts) + sorted(words - starts)
+        words |= starts
+        names = self.names
+        rest = list(filterfalse(words.__contains__, hits))
+        in_name = [query in names[idx] for idx in rest]
+        ranked += compress(rest, in_name)
+        ranked += compress(rest, map(operator.not_, in_name))
+        return ranked
+
+# Read single key presses from the console; None when stdin is not one
+def console_key_reader() -> Optional[Callable[[], str]]:
+    if not sys.stdin.isatty():
+        return None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+    if msvcrt is not None:
+        def read_key() -> str:
+            key = msvcrt.getwch()
+            if key in ("\x00", "\xe0"):  # Arrow and function keys send a second code
+                msvcrt.getwch()
+                return ""
+            return key
+        return read_key
+    try:
+        import termios
+        import tty
+    except ImportError:
+        return None
+    
+    def read_key() -> str:
+        fd = sys.stdin.fileno()
+        settings = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            return sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, settings)
+    return read_key
+
+# Let the Windows console interpret the escape sequences that redraw the live search
+def enable_console_escapes() -> None:
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # Standard output
+        mode = ctypes.c_ulong()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        pass
+
+# Narrow the menu with every key press; returns the final query, or None when cancelled with Esc
+def live_search(index: AppSearchIndex, rows: List[str], header: str, read_key: Callable[[], str],
+                query: str = "", page_size: int = 20) -> Optional[str]:
+    enable_console_escapes()
+    while True:
+        matches = index.search(query)
+        lines = [f"{idx + 1:<4} {rows[idx]}" for idx in matches[:page_size]]
+        more = f" (showing {page_size})" if len(matches) > page_size else ""
+        sys.stdout.write("\x1b[H\x1b[J" + header + "\n" + "\n".join(lines) +
+                         f"\n\n{len(matches)} matches{more}. Enter: keep this filter, Esc: cancel\nSearch: {query}")
+        sys.stdout.flush()
+        
+        key = read_key()
+        if key in ("\r", "\n"):
+            print()
+            return query
+        if key == "\x1b":
+            print()
+            return None
+        if key == "\x03":
+            raise KeyboardInterrupt
+        if key in ("\x08", "\x7f"):
+            query = query[:-1]
+        elif key.isprintable():
+            query += key
+
+# Cut a value to a menu column, ending with "..." when it does not fit
+def fit_column(value, width: int) -> str:
+    text = str(value)
+    return text[:width - 3] + "..." if len(text) > width else text
+
+def display_app_selection_menu(apps: List[Dict], sizes: Optional[AppSizes] = None,
+                               sort_by_size: bool = False) -> List[int]:
+    """Display a menu of installed applications and return the selected indices.
+    
+    With sizes a Size column is shown; sizes are only looked up for the rows
+    on screen, unless the menu is sorted by size.
+    """
     # Sort applications by name
     sorted_apps = apps.copy()
+    names = [str(app.get("DisplayName", "Unknown")) for app in sorted_apps]
+    versions = [str(app.get("DisplayVersion", "")) for app in sorted_apps]
+    publishers = [str(app.get("Publisher", "")) for app in sorted_apps]
     
     # Calculate the maximum width needed for each column
-    max_name_len = max(len(app.get("DisplayName", "Unknown")[:50]) for app in sorted_apps)
-    max_version_len = max(len(str(app.get("DisplayVersion", ""))) for app in sorted_apps)
-    max_publisher_len = max(len(str(app.get("Publisher", ""))) for app in sorted_apps)
+    max_name_len = max(len(name[:50]) for name in names)
+    max_version_len = max(map(len, versions))
+    max_publisher_len = max(map(len, publishers))
     
     # Make sure column widths are at least the header length
     max_name_len = max(max_name_len, len("Application Name"))
@@ -625,7 +3775,8 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
         terminal_width = 100  # Default if we can't determine terminal width
     
     # Adjust column widths to fit terminal
-    total_width = 4 + max_name_len + 2 + max_version_len + 2 + max_publisher_len
+    size_width = 10
+    total_width = 4 + max_name_len + 2 + max_version_len + 2 + max_publisher_len + (size_width + 1 if sizes else 0)
     if total_width > terminal_width:
         # Reduce columns proportionally
         excess = total_width - terminal_width + 5  # Add some margin
@@ -637,10 +3788,28 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
         max_version_len = max(8, int(max_version_len - excess * version_ratio))
         max_publisher_len = max(10, int(max_publisher_len - excess * publisher_ratio))
     
+    # Every row is rendered once; pages and search results only pick rows
+    rows = [f"{fit_column(name, max_name_len):<{max_name_len}} {fit_column(version, max_version_len):<{max_version_len}} "
+            f"{fit_column(publisher, max_publisher_len):<{max_publisher_len}}"
+            for name, version, publisher in zip(names, versions, publishers)]
+    search_index = AppSearchIndex(sorted_apps)
+    read_key = console_key_reader()
+    
     # Display the header with pretty formatting
     header_line = f"{'#':<4} {'Application Name':<{max_name_len}} {'Version':<{max_version_len}} {'Publisher':<{max_publisher_len}}"
+    if sort_by_size and sizes is None:
+        sizes = AppSizes("estimated")
+    if sizes is not None:
+        header_line += f" {'Size':>{size_width}}"
     separator = "-" * len(header_line)
     
+    # Sizes are looked up for every application only to sort by them
+    def order(indices: List[int]) -> List[int]:
+        if not sort_by_size:
+            return indices
+        sizes.prefetch(sorted_apps[i] for i in indices)
+        return sorted(indices, key=lambda i: sizes.sort_key(sorted_apps[i]))
+    
     print("\n" + "=" * len(header_line))
     print("INSTALLED APPLICATIONS")
     print("=" * len(header_line))
@@ -649,24 +3818,30 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
     
     # Display applications in groups of 20 with pagination
     page_size = 20
-    total_pages = (len(sorted_apps) + page_size - 1) // page_size
+    query = ""  # Current search filter
+    view = order(list(range(len(sorted_apps))))  # Indices shown, in display order
+    total_pages = (len(view) + page_size - 1) // page_size
     current_page = 1
     
     while True:
         # Calculate start and end indices for the current page
         start_idx = (current_page - 1) * page_size
-        end_idx = min(start_idx + page_size, len(sorted_apps))
+        end_idx = min(start_idx + page_size, len(view))
         
-        # Display the applications for the current page
-        for i in range(start_idx, end_idx):
-            app = sorted_apps[i]
-            
-            # Truncate long values to fit columns
-            name = (app.get("DisplayName", "Unknown")[:max_name_len-3] + "...") if len(app.get("DisplayName", "Unknown")) > max_name_len else app.get("DisplayName", "Unknown")
-            version = (str(app.get("DisplayVersion", ""))[:max_version_len-3] + "...") if len(str(app.get("DisplayVersion", ""))) > max_version_len else app.get("DisplayVersion", "")
-            publisher = (str(app.get("Publisher", ""))[:max_publisher_len-3] + "...") if len(str(app.get("Publisher", ""))) > max_publisher_len else app.get("Publisher", "")
-            
-            print(f"{i+1:<4} {name:<{max_name_len}} {version:<{max_version_len}} {publisher:<{max_publisher_len}}")
+        # Display the applications for the current page (numbers stay those of the full list)
+        if sizes is not None:
+            sizes.prefetch(sorted_apps[i] for i in view[start_idx:end_idx])
+        for i in view[start_idx:end_idx]:
+            if sizes is not None:
+                print(f"{i+1:<4} {rows[i]} {format_size(sizes.size(sorted_apps[i])):>{size_width}}")
+            else:
+                print(f"{i+1:<4} {rows[i]}")
+        
+        if query:
+            exact = len(search_index.substring_matches(query))
+            similar = f" and {len(view) - exact} similar names" if len(view) > exact else ""
+            print(f"\nFilter '{query}': {exact} matches{similar} of {len(sorted_apps)} applications "
+                  f"(/ to change, // to clear)")
         
         # Show pagination info if needed
         if total_pages > 1:
@@ -676,13 +3851,49 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
         # Prompt for selection
         print("\nEnter the numbers of applications you want to uninstall (comma-separated) or 'all' for all apps:")
         print("Examples: 1,3,5 or 5-10 or all")
-        print("Commands: q/quit/exit to exit, help for help")
+        print("Commands: /text to search, s to sort by size/name, q/quit/exit to exit, help for help")
         
         if total_pages > 1:
             selection = input(f"[Page {current_page}/{total_pages}] > ").strip().lower()
         else:
             selection = input("> ").strip().lower()
         
+        # Handle search commands
+        if selection.startswith('/'):
+            if selection == '//':
+                new_query = ""
+            elif selection == '/' and read_key is not None:
+                new_query = live_search(search_index, rows, header_line, read_key, query, page_size)
+            elif selection == '/':
+                new_query = input("Search: ")
+            else:
+                new_query = selection[1:]
+            if new_query is not None:
+                query = new_query.strip().lower()
+                view = order(search_index.search(query))
+                total_pages = max(1, (len(view) + page_size - 1) // page_size)
+                current_page = 1
+                if not view:
+                    print(f"\nNo applications match '{query}'.")
+            print()
+            print(header_line)
+            print(separator)
+            continue
+        
+        # Toggle between name and size order; the first sort by size also adds the Size column
+        if selection == 's':
+            sort_by_size = not sort_by_size
+            if sizes is None:
+                sizes = AppSizes("estimated")
+                header_line += f" {'Size':>{size_width}}"
+                separator = "-" * len(header_line)
+            view = order(search_index.search(query))
+            current_page = 1
+            print()
+            print(header_line)
+            print(separator)
+            continue
+        
         # Handle pagination commands
         if selection == 'n' and current_page < total_pages:
             current_page += 1
@@ -696,7 +3907,10 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
             print("\nHelp:")
             print("  - Enter numbers separated by commas (e.g., 1,3,5)")
             print("  - Enter a range with a dash (e.g., 5-10)")
-            print("  - Type 'all' to select all applications")
+            print("  - Type 'all' to select all applications (while a filter is set: the names containing it, "
+                  "not the similar ones)")
+            print("  - Type '/' to search as you type, '/text' to filter by name, publisher or version, '//' to clear")
+            print("  - Type 's' to sort by size (largest first) and again to sort by name")
             print("  - Type 'n' for the next page, 'p' for the previous page")
             print("  - Type 'q', 'quit', or 'exit' to exit")
             print("  - Type 'help' to see this help message")
@@ -704,7 +3918,8 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
         elif selection in ('q', 'quit', 'exit'):
             return []
         elif selection == 'all':
-            return list(range(len(sorted_apps)))
+            # Similar names are listed to catch typos, but only real matches are selected in bulk
+            return sorted(search_index.substring_matches(query))
             
         # Parse user selection
         try:
@@ -753,22 +3968,98 @@ def display_app_selection_menu(apps: List[Dict]) -> List[int]:
         except ValueError:
             print("Invalid input. Please enter comma-separated numbers or 'all'.")
 
+# Print the installed applications (the --list-only mode)
+def list_installed_applications(registry: Optional[RegistrySnapshot] = None, fmt: str = "text",
+                                fields: Optional[List[str]] = None, sizes: Optional[AppSizes] = None,
+                                sort: str = "name"):
+    if sort == "size" and sizes is None:
+        sizes = AppSizes("estimated")
+    if fmt != "text":
+        # Machine-readable output: stream the records unsorted (sorting by size needs them all first),
+        # nothing else on stdout
+        fields = fields or APPLICATION_FIELDS
+        if sizes is None:
+            write_inventory(iter_installed_applications(registry, fields), fmt, fields)
+            return
+        # A Size column (bytes); the values sizes are computed from are read even when not shown
+        output_fields = fields + ["Size"] if "Size" not in fields else fields
+        read_fields = output_fields + [field for field in ["DisplayName", "InstallLocation", "EstimatedSize"]
+                                       if field not in output_fields]
+        records = iter_installed_applications(registry, read_fields)
+        if sort == "size":
+            records = list(records)
+            sizes.prefetch(records)
+            records.sort(key=sizes.sort_key)
+        write_inventory(({field: sizes.size(record) if field == "Size" else record.get(field)
+                          for field in output_fields} for record in records), fmt, output_fields)
+        return
+    
+    print("\nScanning for installed applications...")
+    installed_apps = get_installed_applications(registry)
+    if sizes is not None:
+        sizes.prefetch(installed_apps)
+    if sort == "size":
+        installed_apps.sort(key=sizes.sort_key)
+    print(f"\nFound {len(installed_apps)} installed applications:")
+    for i, app in enumerate(installed_apps, 1):
+        line = f"{i:3}. {app.get('DisplayName', 'Unknown')} ({app.get('DisplayVersion', 'Unknown Version')})"
+        if sizes is not None:
+            line += f" - {format_size(sizes.size(app)) or 'size unknown'}"
+        print(line)
+
+# Print the folders no installed application claims (the --find-orphans mode)
+def report_orphan_folders(registry: Optional[RegistrySnapshot] = None, fmt: str = "text",
+                          workers: int = DEFAULT_SCAN_WORKERS):
+    if fmt != "text":
+        write_inventory(find_orphan_folders(registry, workers=workers), fmt, ["Path", "Size"])
+        return
+    
+    print("\nLooking for folders no installed application claims...")
+    orphans = find_orphan_folders(registry, workers=workers)
+    total = sum(record["Size"] for record in orphans)
+    print(f"\nFound {len(orphans)} orphaned folders ({format_size(total)} in total):")
+    for i, record in enumerate(orphans, 1):
+        print(f"{i:3}. {format_size(record['Size']):>10}  {record['Path']}")
+
 def main():
+    configure_logging()
+    
     # Check if running on Windows
     if not sys.platform.startswith('win'):
         logger.error("This script only supports Windows systems")
         sys.exit(1)
     
+    # Fast path for the plain inventory call: no argument parsing, admin check or banner
+    if sys.argv[1:] in (["--list-only"], ["-l"]):
+        list_installed_applications()
+        sys.exit(0)
+    
     # Keep running until user chooses to exit
     while True:
         # Parse command line arguments
         args = parse_arguments()
         
-        # Skip admin check for list-only mode
-        need_admin = not args.list_only
+        # Spans and counters of this round, written to --profile at the end
+        if args.profile:
+            enable_profiling()
+        
+        # List-only mode needs neither admin privileges nor the banner
+        if args.list_only:
+            sizes = AppSizes(args.size, workers=args.scan_workers) if args.size else None
+            list_installed_applications(fmt=args.format, fields=args.fields, sizes=sizes, sort=args.sort)
+            if args.profile:
+                PROFILER.export(args.profile)
+            sys.exit(0)
+        
+        # Orphan detection only reads, like list-only
+        if args.find_orphans:
+            report_orphan_folders(fmt=args.format, workers=args.scan_workers)
+            if args.profile:
+                PROFILER.export(args.profile)
+            sys.exit(0)
         
-        # Request admin privileges if needed (except for list-only mode)
-        if need_admin and not is_admin():
+        # Request admin privileges if needed
+        if not is_admin():
             logger.info("Requesting administrator privileges...")
             request_admin()
         
@@ -783,14 +4074,9 @@ def main():
         
         # Get list of installed applications
         print("\nScanning for installed applications...")
-        installed_apps = get_installed_applications()
-        
-        if args.list_only:
-            print(f"\nFound {len(installed_apps)} installed applications:")
-            for i, app in enumerate(installed_apps, 1):
-                print(f"{i:3}. {app.get('DisplayName', 'Unknown')} "
-                    f"({app.get('DisplayVersion', 'Unknown Version')})")
-            sys.exit(0)
+        with PROFILER.span("load Uninstall entries"):
+            registry = RegistrySnapshot().load()
+        installed_apps = get_installed_applications(registry)
         
         # If app_name is specified, use it; otherwise, show selection menu
         if args.app_name:
@@ -800,7 +4086,8 @@ def main():
             dry_run = args.dry_run
             backup = not args.no_backup
         else:
-            selected_indices = display_app_selection_menu(installed_apps)
+            sizes = AppSizes(args.size, workers=args.scan_workers) if args.size else None
+            selected_indices = display_app_selection_menu(installed_apps, sizes, sort_by_size=args.sort == "size")
             if not selected_indices:
                 print("No applications selected. Exiting.")
                 sys.exit(0)
@@ -863,47 +4150,95 @@ def main():
                 # Continue the loop to start over
                 continue
         
-        # Process each selected application
-        for app_name in app_names:
-            print(f"\n{'='*60}")
-            print(f"Processing: {app_name}")
-            print(f"{'='*60}")
-            
-            # Initialize and run the uninstaller
-            uninstaller = AppUninstaller(
+        # Walk the data locations once for the whole batch; thorough mode needs
+        # the full tree, otherwise only the top-level folders are matched
+        print("\nIndexing application data folders...")
+        scan_cache = None
+        if not args.no_scan_cache:
+            scan_cache = ScanCache.load(args.scan_cache, args.scan_cache_max_mb * 1024 * 1024)
+        with PROFILER.span("index folders"):
+            scan_index = ScanIndex.build(get_common_data_locations(), max_depth=None if thorough else 1,
+                                         workers=args.scan_workers, cache=scan_cache)
+        if scan_cache:
+            logger.info(f"Scan cache: {scan_cache.hits} folders reused, {scan_cache.misses} rescanned")
+            scan_cache.save()
+        scan_index.prime(NameMatcher(app_names))
+        backup_store = BackupStore(args.backup_store)
+        
+        # Thorough mode also enumerates the Software keys once for the whole batch
+        registry_index = None
+        if thorough:
+            print("Indexing registry keys...")
+            included = {path.strip("\\").lower() for path in args.registry_include}
+            prune = [path for path in DEFAULT_DEEP_SCAN_PRUNE if path.lower() not in included]
+            with PROFILER.span("index registry keys"):
+                registry_index = RegistryKeyIndex.build(registry.backend, max_depth=args.registry_depth, prune=prune,
+                                                        workers=registry.workers)
+            registry_index.prime(NameMatcher(app_names))
+            logger.info(f"Registry index: {len(registry_index)} keys, {registry_index.handles_opened} keys opened "
+                        f"in {registry_index.elapsed:.3f}s")
+        
+        # Process the selected applications; with --jobs, independent ones run concurrently
+        uninstallers = [
+            AppUninstaller(
                 app_name,
                 thorough=thorough,
                 dry_run=dry_run,
-                backup=backup
+                backup=backup,
+                scan_index=scan_index,
+                scan_workers=args.scan_workers,
+                registry=registry,
+                backup_mode=args.backup_mode,
+                backup_store=backup_store,
+                delete_workers=args.delete_workers,
+                uninstaller_timeout=args.uninstaller_timeout,
+                registry_index=registry_index
             )
-            
-            print(f"\nStarting uninstallation process for {app_name}...")
-            print(f"Mode: {'Dry Run (no actual changes)' if dry_run else 'Real Uninstallation'}")
-            print(f"Thorough cleaning: {'Enabled' if thorough else 'Disabled'}")
-            print(f"Backup creation: {'Disabled' if not backup else 'Enabled'}")
-            
-            try:
-                # Perform the uninstallation
-                results = uninstaller.uninstall()
+            for app_name in app_names
+        ]
+        scheduler = UninstallScheduler(uninstallers, jobs=args.jobs)
+        
+        print(f"\nStarting uninstallation process for {len(app_names)} application(s)...")
+        print(f"Mode: {'Dry Run (no actual changes)' if dry_run else 'Real Uninstallation'}")
+        print(f"Thorough cleaning: {'Enabled' if thorough else 'Disabled'}")
+        print(f"Backup creation: {'Disabled' if not backup else 'Enabled'}")
+        
+        try:
+            for uninstaller, results, error in scheduler.run():
+                app_name = uninstaller.app_name
+                print(f"\n{'='*60}")
+                print(f"Processed: {app_name}")
+                print(f"{'='*60}")
                 
+                if error is not None:
+                    print(f"\nAn unexpected error occurred while uninstalling {app_name}: {error}")
+                    continue
+                    
                 # Generate and display the report
                 report = uninstaller.generate_report(results)
                 print("\n" + report)
                 
                 # Save the report to a file
-                report_file = f"uninstall_report_{app_name.replace(' ', '_').replace('/', '_').replace('\\', '_')}.txt"
+                safe_name = app_name.replace(' ', '_').replace('/', '_').replace('\\', '_')
+                report_file = f"uninstall_report_{safe_name}.txt"
                 with open(report_file, "w") as f:
                     f.write(report)
                     
                 print(f"\nDetailed report saved to: {os.path.abspath(report_file)}")
-                
-            except KeyboardInterrupt:
-                print("\nOperation cancelled by user")
-                break
-            except Exception as e:
-                logger.error(f"An unexpected error occurred while uninstalling {app_name}: {e}")
-                print(f"\nAn unexpected error occurred while uninstalling {app_name}: {e}")
-                continue
+        except KeyboardInterrupt:
+            print("\nOperation cancelled by user")
+            
+        # One report for the whole batch
+        if len(uninstallers) > 1:
+            batch_report = scheduler.generate_report()
+            print("\n" + batch_report)
+            with open("uninstall_report_batch.txt", "w") as f:
+                f.write(batch_report)
+            print(f"\nBatch report saved to: {os.path.abspath('uninstall_report_batch.txt')}")
+        
+        if args.profile:
+            PROFILER.export(args.profile)
+            print(f"\nProfile (Chrome trace format) saved to: {os.path.abspath(args.profile)}")
         
         print("\nAll selected applications have been processed.")
         